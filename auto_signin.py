@@ -17,13 +17,26 @@
 import time
 import random
 import os
-import cv2
-import numpy as np
-import pyautogui
-import pyperclip
-import requests
+import json
+import hashlib
 import urllib.parse
-from PIL import ImageGrab
+
+from autotask.lazy import lazy_import
+from autotask import trace
+from autotask.trace import span, traced
+from autotask.screen import get_screen
+from autotask.inputs import get_input
+from autotask.clock import get_clock
+from autotask.clipboard import ClipboardWatcher
+from autotask.checkpoint import Checkpoint, RetryPolicy
+from autotask import templates
+
+# 重量级依赖延迟到首次使用时导入，定时任务冷启动不必全部加载
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+pyautogui = lazy_import('pyautogui')
+requests = lazy_import('requests')
+ImageGrab = lazy_import('PIL.ImageGrab')
 
 # OCR相关
 OCR_READER = None
@@ -35,7 +48,8 @@ def get_ocr_reader():
         try:
             import easyocr
             print("  [OCR] 正在加载OCR模型（首次加载较慢）...")
-            OCR_READER = easyocr.Reader(['ch_sim', 'en'], gpu=False)
+            with span('ocr_load_model', 'ocr'):
+                OCR_READER = easyocr.Reader(['ch_sim', 'en'], gpu=False)
             print("  [OCR] 模型加载完成")
         except Exception as e:
             print(f"  [OCR] 加载失败: {e}")
@@ -74,13 +88,57 @@ CONFIG = {
         'success_message': 'images/success_message.png',   # 兑换成功提示
     },
 
+    # 协议签到（快速通道）：先直接请求签到和兑换接口，失败时回退到浏览器流程
+    # cookies 为登录后从浏览器开发者工具复制的 Cookie（'a=1; b=2'），之后会自动保存到 tasks/.cookies
+    # 接口地址请按开发者工具"网络"面板中看到的实际请求填写；离线测试见 autotask/mocksite.py
+    'http': {
+        'enabled': False,
+        'spin_url': 'https://qd.x666.me/api/spin',
+        'redeem_url': 'https://x666.me/api/user/topup',
+        'cookies': '',
+        'user_id': None,   # new-api 系站点需要的 New-Api-User 请求头
+        'timeout': 10,
+    },
+
+    # 浏览器：path 为浏览器程序（如 chrome、msedge 或完整路径），profile 为独立的用户数据目录；
+    # 都不设置时用系统默认浏览器打开。多账号批量签到时每个账号使用自己的 profile
+    'browser': {
+        'path': None,
+        'profile': None,
+    },
+
     'confidence': 0.8,
+    # 兑换码格式（正则），剪贴板中出现符合格式的新内容才视为兑换码；None 表示任意非空内容
+    'redeem_code_pattern': r'^[A-Za-z0-9_-]{6,64}$',
     'wait_time': {
         'page_load': 5,
         'cf_verify': 8,
         'after_click': 2,
-        'wheel_spin': 10,      # 转盘转动等待（8秒+缓冲）
-        'clipboard_wait': 2,   # 等待剪贴板
+        'wheel_spin': 15,      # 转盘转动最长等待（检测到转盘停止会提前结束）
+        'clipboard_wait': 10,  # 等待兑换码出现在剪贴板的最长时间（出现后立即继续）
+    },
+
+    # 步骤重试策略（见 autotask/checkpoint.py）：default 为所有步骤的默认值，数字为单个步骤
+    # 失败后可用模式 6 从失败的步骤继续，已获取的兑换码会保留
+    'retry': {
+        'default': {'attempts': 1},
+        4: {'attempts': 2, 'delay': 3},      # 签到入口
+        9: {'attempts': 2, 'delay': 3},      # 兑换码输入框
+        10: {'attempts': 2, 'delay': 2},     # 兑换按钮
+    },
+
+    # 转盘停止检测：按 fps 截取转盘区域，缩小为灰度小图比较相邻帧，
+    # 平均差值连续 quiet 秒低于 threshold（0-255）视为已停止
+    # region 为 None 时以点击的「开始转动」按钮为中心取 size×size 的区域（按钮一般在转盘中央）；
+    # 不检测整个屏幕：转盘只占屏幕一小部分，缩小后的差值会低于阈值，转动中也被判定为停止。
+    # 两者都没有（如从断点继续）时固定等待 wheel_spin 秒
+    'wheel_motion': {
+        'region': None,     # 如 {'x': 700, 'y': 250, 'width': 500, 'height': 500}
+        'size': 500,
+        'fps': 5,
+        'threshold': 2.0,
+        'quiet': 1.0,
+        'min_spin': 1.5,    # 点击后至少等待的时间，避免转盘还没开始转就判定为停止
     },
 
     # 弹窗区域配置（用于OCR识别）
@@ -98,31 +156,115 @@ CONFIG = {
 class ImageFinder:
     """图像识别类"""
 
+    # 模板缓存：路径 -> (修改时间, 图像)，模板库引用 -> (None, 图像)；同一进程内每个模板只解码一次
+    _template_cache = {}
+    # 最近一帧：(原始截图, BGR 图像, {模板路径: 匹配结果})
+    # 屏幕来源返回同一个图像对象（固定画面、回放停在最后一帧）时直接复用转换和匹配结果
+    _last_frame = (None, None, {})
+
+    @staticmethod
+    def load_template(template_path):
+        """读取模板图片（带缓存），文件不存在或无法解码时返回 None
+
+        template_path 可以是模板库引用（tpl:哈希/名称）：内容不会变化，按哈希缓存，
+        不同名称引用同一模板时只解码一次
+        """
+        ref = templates.parse_ref(template_path)
+        key = ref[0] if ref else template_path
+        path = templates.template_file(template_path)
+        cached = ImageFinder._template_cache.get(key)
+        if cached and ref:
+            return cached[1]
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with span('decode_template', 'vision', template=os.path.basename(template_path)):
+            template = templates.read_image(path)
+        if template is not None:
+            ImageFinder._template_cache[key] = (None if ref else mtime, template)
+        return template
+
+    @staticmethod
+    @traced('capture', 'vision')
+    def grab_screen():
+        """截取全屏，返回 BGR 图像"""
+        screenshot = get_screen().grab()
+        get_clock().charge('capture')
+        image, bgr, _ = ImageFinder._last_frame
+        if screenshot is image:
+            return bgr
+        bgr = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
+        ImageFinder._last_frame = (screenshot, bgr, {})
+        return bgr
+
+    @staticmethod
+    def locate(template_path, screenshot=None):
+        """在截图中匹配模板（不输出日志），返回 (中心坐标, 匹配度)；模板无效时返回 (None, 0.0)"""
+        template = ImageFinder.load_template(template_path)
+        if template is None:
+            return None, 0.0
+        if screenshot is None:
+            screenshot = ImageFinder.grab_screen()
+        get_clock().charge('match')
+        _, bgr, matches = ImageFinder._last_frame
+        if screenshot is bgr and template_path in matches:
+            return matches[template_path]
+
+        with span('match', 'vision', template=os.path.basename(template_path)) as sp:
+            h, w = template.shape[:2]
+            result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            sp.set(score=round(max_val, 4))
+        found = (max_loc[0] + w // 2, max_loc[1] + h // 2), max_val
+        if screenshot is bgr:
+            matches[template_path] = found
+        return found
+
+    @staticmethod
+    def probe(template_paths, confidence=0.8, timeout=0.0, interval=0.2, sleep=None):
+        """用同一帧截图依次匹配多个模板，返回第一个匹配的 (序号, 中心坐标)，都未匹配返回 (None, None)
+
+        confidence 可以是每个模板各自的阈值列表。
+        timeout 为 0 时只截一次图；大于 0 时在该时间内重复截图，直到有模板匹配。
+        不存在的模板直接跳过，可选的弹窗不出现时只花一次截图和匹配的时间。
+        """
+        if isinstance(confidence, (int, float)):
+            confidence = [confidence] * len(template_paths)
+        paths = [(i, p) for i, p in enumerate(template_paths)
+                 if p and ImageFinder.load_template(p) is not None]
+        if not paths:
+            return None, None
+        end = get_clock().time() + timeout
+        with span('probe', 'vision', templates=len(paths)):
+            while True:
+                screenshot = ImageFinder.grab_screen()
+                for i, path in paths:
+                    pos, score = ImageFinder.locate(path, screenshot)
+                    if score >= confidence[i]:
+                        return i, pos
+                if get_clock().time() + interval > end:
+                    return None, None
+                (sleep or get_clock().sleep)(interval)
+
     @staticmethod
     def find_on_screen(template_path, confidence=0.8):
         """在屏幕上查找图片"""
-        if not os.path.exists(template_path):
+        if not templates.exists(template_path):
             print(f"  [!] 图片文件不存在: {template_path}")
             return None
 
-        screenshot = ImageGrab.grab()
-        screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-
-        # 使用 numpy 读取图片以支持中文路径
-        template = cv2.imdecode(np.fromfile(template_path, dtype=np.uint8), cv2.IMREAD_COLOR)
-        if template is None:
+        if ImageFinder.load_template(template_path) is None:
             print(f"  [!] 无法读取图片: {template_path}")
             return None
 
-        h, w = template.shape[:2]
-        result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        pos, max_val = ImageFinder.locate(template_path)
 
         if max_val >= confidence:
-            center_x = max_loc[0] + w // 2
-            center_y = max_loc[1] + h // 2
             print(f"  [√] 找到 {os.path.basename(template_path)} (匹配度: {max_val:.1%})")
-            return (center_x, center_y)
+            return pos
         else:
             print(f"  [x] 未找到 {os.path.basename(template_path)} (最高: {max_val:.1%})")
             return None
@@ -130,48 +272,74 @@ class ImageFinder:
     @staticmethod
     def wait_for_image(template_path, timeout=30, confidence=0.8, interval=0.5, silent=False):
         """等待图片出现"""
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            if not os.path.exists(template_path):
+        start_time = get_clock().time()
+        while get_clock().time() - start_time < timeout:
+            if not templates.exists(template_path):
                 if not silent:
                     print(f"  [!] 图片不存在: {template_path}")
                 return None
 
-            screenshot = ImageGrab.grab()
-            screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-
-            # 使用 numpy 读取图片以支持中文路径
-            template = cv2.imdecode(np.fromfile(template_path, dtype=np.uint8), cv2.IMREAD_COLOR)
-            if template is None:
+            if ImageFinder.load_template(template_path) is None:
                 if not silent:
                     print(f"  [!] 无法读取图片: {template_path}")
                 return None
 
-            h, w = template.shape[:2]
-            result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            pos, max_val = ImageFinder.locate(template_path)
 
             if max_val >= confidence:
-                center_x = max_loc[0] + w // 2
-                center_y = max_loc[1] + h // 2
                 if not silent:
                     print(f"  [√] 找到 {os.path.basename(template_path)} (匹配度: {max_val:.1%})")
-                return (center_x, center_y)
+                return pos
 
-            time.sleep(interval)
+            get_clock().sleep(interval)
 
         if not silent:
             print(f"  [x] 等待超时: {os.path.basename(template_path)}")
         return None
 
+    @staticmethod
+    def wait_until_still(bbox=None, timeout=15, fps=5, threshold=2.0, quiet=1.0, min_wait=0.0, width=64):
+        """等待画面静止，返回 (是否静止, 已等待秒数)
+
+        每秒截取 fps 次区域画面，转为灰度并缩小到 width 像素宽后与上一帧比较，
+        平均差值连续 quiet 秒低于 threshold 即视为静止；超过 timeout 仍在变化返回 (False, 已等待秒数)
+        """
+        clock = get_clock()
+        interval = 1.0 / max(fps, 0.1)
+        start = clock.time()
+        last_motion = start
+        previous = None
+        with span('wait_still', 'vision', timeout=timeout) as sp:
+            while True:
+                frame = get_screen().grab(bbox=bbox)
+                clock.charge('capture')
+                gray = cv2.cvtColor(np.array(frame), cv2.COLOR_RGB2GRAY)
+                h, w = gray.shape
+                if w > width:
+                    gray = cv2.resize(gray, (width, max(1, h * width // w)), interpolation=cv2.INTER_AREA)
+                now = clock.time()
+                if previous is not None and float(cv2.absdiff(gray, previous).mean()) >= threshold:
+                    last_motion = now
+                previous = gray
+
+                elapsed = now - start
+                if elapsed >= min_wait and now - last_motion >= quiet:
+                    sp.set(still=True, elapsed=round(elapsed, 2))
+                    return True, elapsed
+                if elapsed >= timeout:
+                    sp.set(still=False, elapsed=round(elapsed, 2))
+                    return False, elapsed
+                clock.sleep(interval)
+
 
 class HumanMouse:
     """模拟人类鼠标行为"""
 
     @staticmethod
+    @traced('mouse_move', 'input')
     def move_to(x, y):
         """人性化移动鼠标"""
-        current_x, current_y = pyautogui.position()
+        current_x, current_y = get_input().position()
 
         x += random.randint(-3, 3)
         y += random.randint(-3, 3)
@@ -190,43 +358,49 @@ class HumanMouse:
             bx = (1-t)**2 * current_x + 2*(1-t)*t * ctrl_x + t**2 * x
             by = (1-t)**2 * current_y + 2*(1-t)*t * ctrl_y + t**2 * y
 
-            pyautogui.moveTo(int(bx), int(by), duration=0)
-            time.sleep(duration / steps)
+            get_input().move_to(int(bx), int(by))
+            get_clock().sleep(duration / steps)
 
     @staticmethod
+    @traced('click', 'input')
     def click(x=None, y=None):
         """人性化点击"""
         if x is not None and y is not None:
             HumanMouse.move_to(x, y)
 
-        time.sleep(random.uniform(0.1, 0.3))
-        pyautogui.mouseDown()
-        time.sleep(random.uniform(0.05, 0.12))
-        pyautogui.mouseUp()
+        get_clock().sleep(random.uniform(0.1, 0.3))
+        get_input().mouse_down()
+        get_clock().sleep(random.uniform(0.05, 0.12))
+        get_input().mouse_up()
 
 
 class WxPush:
     """微信推送"""
 
+    @staticmethod
+    def _build_params(title, content, config):
+        return {
+            'token': config['token'],
+            'title': title,
+            'content': content
+        }
+
     @staticmethod
     def send(title, content, config):
-        """发送微信推送"""
+        """发送微信推送（同步，等待服务器返回）"""
         if not config.get('enabled'):
             print("  [跳过] 微信推送未启用")
             return False
 
         try:
             url = config['url']
-            params = {
-                'token': config['token'],
-                'title': title,
-                'content': content
-            }
+            params = WxPush._build_params(title, content, config)
 
             full_url = f"{url}?{urllib.parse.urlencode(params)}"
             print(f"  [推送] 发送微信通知...")
 
-            response = requests.get(full_url, timeout=30)
+            with span('wx_push', 'http', title=title):
+                response = requests.get(full_url, timeout=30)
 
             print(f"  [推送] 状态码: {response.status_code}")
             print(f"  [推送] 返回: {response.text[:100] if response.text else '空'}")
@@ -237,16 +411,68 @@ class WxPush:
             print(f"  [推送] 失败: {e}")
             return False
 
+    @staticmethod
+    def send_async(title, content, config, urgent=False):
+        """发送微信推送（异步，写入发件箱后立即返回，由后台线程发送和重试）
+
+        摘要模式开启时，非紧急推送先进入缓冲，最后合并为一条发送；
+        urgent=True（如错误通知）始终立即发送。
+        """
+        if not config.get('enabled'):
+            print("  [跳过] 微信推送未启用")
+            return False
+
+        try:
+            from autotask import push
+            params = WxPush._build_params(title, content, config)
+            with span('push_enqueue', 'push', title=title, urgent=urgent):
+                digest = push.get_digest()
+                if digest is not None and not urgent:
+                    digest.add(config['url'], params)
+                    print(f"  [推送] 已加入摘要: {title}")
+                else:
+                    push.get_dispatcher().enqueue(config['url'], params)
+                    print(f"  [推送] 已加入发送队列: {title}")
+            return True
+        except Exception as e:
+            print(f"  [推送] 加入队列失败: {e}")
+            return False
+
+    @staticmethod
+    def begin_digest(title='任务汇总', max_items=10, max_wait=600):
+        """开启摘要模式：缓冲之后的推送，达到条数/时间阈值或结束时合并发送"""
+        from autotask import push
+        push.begin_digest(title, max_items, max_wait)
+
+    @staticmethod
+    def end_digest():
+        """结束摘要模式，立即合并发送剩余缓冲"""
+        from autotask import push
+        push.end_digest()
+
 
 class AutoSignIn:
     """自动签到主类"""
 
-    def __init__(self, config):
+    def __init__(self, config, on_event=None, name='signin'):
+        """name: 账号名称，用于区分断点文件（多账号批量签到时每个账号一个）"""
         self.config = config
+        self.name = name
+        self.on_event = on_event
         self.finder = ImageFinder()
         self.mouse = HumanMouse()
         self.redeem_code = None
         self.result_message = None
+        self.clicked = {}       # 图片名 -> 最近一次点击的位置
+        self.checkpoint = Checkpoint.for_name(name, self._checkpoint_key())
+        self.clipboard = ClipboardWatcher(config.get('redeem_code_pattern'))
+
+    def _emit(self, event, **data):
+        if self.on_event:
+            try:
+                self.on_event(event, data)
+            except Exception as e:
+                print(f"  [!] 事件回调异常: {e}")
 
     def log(self, step, message):
         """格式化日志输出"""
@@ -260,7 +486,7 @@ class AutoSignIn:
             print(f"  [跳过] 未配置: {image_key}")
             return False
 
-        if not os.path.exists(image_path):
+        if not templates.exists(image_path):
             print(f"  [跳过] 图片不存在: {image_path}")
             return False
 
@@ -274,16 +500,17 @@ class AutoSignIn:
 
         if pos:
             self.mouse.click(pos[0], pos[1])
-            time.sleep(self.config['wait_time']['after_click'])
+            self.clicked[image_key] = pos
+            get_clock().sleep(self.config['wait_time']['after_click'])
             return True
         return False
 
     def open_url(self, url):
         """打开URL"""
-        import webbrowser
         print(f"  打开: {url}")
-        webbrowser.open(url)
-        time.sleep(self.config['wait_time']['page_load'])
+        browser = self.config.get('browser', {})
+        get_input().open_url(url, browser=browser.get('path'), profile=browser.get('profile'))
+        get_clock().sleep(self.config['wait_time']['page_load'])
 
     def step1_open_main_site(self):
         """步骤1: 打开主站"""
@@ -295,18 +522,18 @@ class AutoSignIn:
         self.log(2, "检测CloudFlare验证")
 
         cf_image = self.config['images'].get('cf_checkbox')
-        if not cf_image or not os.path.exists(cf_image):
+        if not templates.exists(cf_image):
             print("  [跳过] 未配置CF验证图片")
             return True
 
-        pos = self.finder.wait_for_image(cf_image, timeout=10,
-                                         confidence=self.config['confidence'],
-                                         silent=True)
-        if pos:
+        # CF验证框和签到入口在同一帧截图中一起检测：页面直接加载完成时不必等满超时
+        found, pos = self.finder.probe([cf_image, self.config['images'].get('signin_entry')],
+                                       confidence=self.config['confidence'], timeout=10)
+        if found == 0:
             print("  [!] 检测到CF验证框")
             self.mouse.click(pos[0], pos[1])
             print("  等待验证完成...")
-            time.sleep(self.config['wait_time']['cf_verify'])
+            get_clock().sleep(self.config['wait_time']['cf_verify'])
         else:
             print("  [√] 未检测到CF验证，已自动通过")
 
@@ -317,17 +544,17 @@ class AutoSignIn:
         self.log(3, "关闭公告弹窗")
 
         # 等待公告出现
-        time.sleep(2)
+        get_clock().sleep(2)
 
         if self.find_and_click('announcement_close', '公告关闭按钮', wait=False):
             print("  [√] 公告已关闭")
-            time.sleep(1)
+            get_clock().sleep(1)
             return True
 
         # 尝试按ESC
         print("  尝试按ESC关闭...")
-        pyautogui.press('escape')
-        time.sleep(1)
+        get_input().press('escape')
+        get_clock().sleep(1)
 
         print("  [√] 公告处理完成")
         return True
@@ -338,7 +565,7 @@ class AutoSignIn:
 
         if self.find_and_click('signin_entry', '签到入口按钮', wait=True, timeout=15):
             print("  [√] 已点击签到入口，等待跳转到签到页面...")
-            time.sleep(self.config['wait_time']['page_load'])
+            get_clock().sleep(self.config['wait_time']['page_load'])
             return True
 
         print("  [!] 未找到签到入口")
@@ -349,7 +576,7 @@ class AutoSignIn:
         self.log(5, "开始转动转盘")
 
         # 等待签到页面加载
-        time.sleep(3)
+        get_clock().sleep(3)
 
         if self.find_and_click('spin_button', '开始转动按钮', wait=True, timeout=15):
             print("  [√] 已点击开始转动")
@@ -362,50 +589,67 @@ class AutoSignIn:
         """步骤6: 点击转盘结果确定按钮"""
         self.log(6, "等待转盘结果，点击确定")
 
-        spin_time = self.config['wait_time']['wheel_spin']
-        print(f"  等待转盘转动 ({spin_time}秒)...")
+        # 记下剪贴板当前内容，步骤7只接受之后新复制的兑换码
+        self.clipboard.arm()
 
-        # 等待转动
-        for i in range(spin_time):
-            print(f"  {spin_time - i}秒...", end='\r')
-            time.sleep(1)
-        print(" " * 20, end='\r')
+        # 检测转盘区域的画面变化，停止转动后立即查找确定按钮；检测不到停止时最多等待 wheel_spin 秒
+        spin_time = self.config['wait_time']['wheel_spin']
+        motion = self.config.get('wheel_motion', {})
+        bbox = self._wheel_bbox(motion)
+        if bbox is None:
+            print(f"  [!] 不知道转盘位置，固定等待 {spin_time}秒...")
+            get_clock().sleep(spin_time)
+        else:
+            print(f"  等待转盘停止 (最长 {spin_time}秒)...")
+            still, waited = self.finder.wait_until_still(
+                bbox, timeout=spin_time, fps=motion.get('fps', 5), threshold=motion.get('threshold', 2.0),
+                quiet=motion.get('quiet', 1.0), min_wait=motion.get('min_spin', 1.5))
+            if still:
+                print(f"  [√] 转盘已停止 ({waited:.1f}秒)")
+            else:
+                print(f"  [!] {spin_time}秒内未检测到停止，继续查找确定按钮")
 
         # 点击转盘结果确定按钮
         if self.find_and_click('wheel_confirm', '转盘确定按钮', wait=True, timeout=10):
             print("  [√] 已点击确定")
-            time.sleep(2)
+            get_clock().sleep(2)
             return True
 
         # 尝试按回车
         print("  尝试按回车确认...")
-        pyautogui.press('enter')
-        time.sleep(2)
+        get_input().press('enter')
+        get_clock().sleep(2)
 
         return True
 
+    def _wheel_bbox(self, motion):
+        """转盘检测区域 (左, 上, 右, 下)：配置的 region，否则以点击的开始按钮为中心；都没有返回 None"""
+        region = motion.get('region')
+        if region:
+            return (region['x'], region['y'], region['x'] + region['width'], region['y'] + region['height'])
+        pos = self.clicked.get('spin_button')
+        if pos is None:
+            return None
+        half = int(motion.get('size', 500)) // 2
+        width, height = get_screen().size()
+        return (max(0, pos[0] - half), max(0, pos[1] - half),
+                min(width, pos[0] + half), min(height, pos[1] + half))
+
     def step7_wait_and_get_code(self):
         """步骤7: 获取兑换码"""
         self.log(7, "获取兑换码")
 
-        # 等待剪贴板
-        print("  等待兑换码复制到剪贴板...")
-        time.sleep(self.config['wait_time']['clipboard_wait'])
-
-        # 获取剪贴板内容
-        try:
-            self.redeem_code = pyperclip.paste()
-            if self.redeem_code and len(self.redeem_code) > 0:
-                print(f"  [√] 获取到兑换码: {self.redeem_code}")
-                return True
-            else:
-                print("  [!] 剪贴板为空")
-        except Exception as e:
-            print(f"  [!] 获取剪贴板失败: {e}")
+        timeout = self.config['wait_time']['clipboard_wait']
+        print(f"  等待兑换码复制到剪贴板 (最长 {timeout}秒)...")
+        code = self.clipboard.wait(timeout=timeout)
+        if code:
+            self.redeem_code = code
+            print(f"  [√] 获取到兑换码: {self.redeem_code}")
+            return True
 
-        # 手动输入
-        self.redeem_code = input("  请手动输入兑换码: ").strip()
-        return bool(self.redeem_code)
+        print(f"  [!] {timeout}秒内剪贴板中没有出现兑换码")
+        print("  可手动复制兑换码后，选择模式 6 从步骤7继续")
+        return False
 
     def step8_goto_topup_page(self):
         """步骤8: 前往充值页面"""
@@ -413,16 +657,15 @@ class AutoSignIn:
         self.open_url(self.config['topup_url'])
 
         # 可能需要再次处理CF
-        time.sleep(2)
+        get_clock().sleep(2)
         cf_image = self.config['images'].get('cf_checkbox')
-        if cf_image and os.path.exists(cf_image):
-            pos = self.finder.wait_for_image(cf_image, timeout=5,
-                                             confidence=self.config['confidence'],
-                                             silent=True)
-            if pos:
+        if templates.exists(cf_image):
+            found, pos = self.finder.probe([cf_image, self.config['images'].get('redeem_input')],
+                                           confidence=self.config['confidence'], timeout=5)
+            if found == 0:
                 print("  [!] 检测到CF验证框")
                 self.mouse.click(pos[0], pos[1])
-                time.sleep(self.config['wait_time']['cf_verify'])
+                get_clock().sleep(self.config['wait_time']['cf_verify'])
 
         return True
 
@@ -435,17 +678,17 @@ class AutoSignIn:
             return False
 
         # 确保兑换码在剪贴板
-        pyperclip.copy(self.redeem_code)
+        get_input().copy(self.redeem_code)
 
         # 找到输入框并点击
         if self.find_and_click('redeem_input', '兑换码输入框', wait=True, timeout=15):
-            time.sleep(0.5)
+            get_clock().sleep(0.5)
 
             # 清空并粘贴
-            pyautogui.hotkey('ctrl', 'a')
-            time.sleep(0.1)
-            pyautogui.hotkey('ctrl', 'v')
-            time.sleep(0.5)
+            get_input().hotkey('ctrl', 'a')
+            get_clock().sleep(0.1)
+            get_input().hotkey('ctrl', 'v')
+            get_clock().sleep(0.5)
 
             print(f"  [√] 已粘贴兑换码: {self.redeem_code}")
             return True
@@ -459,7 +702,7 @@ class AutoSignIn:
 
         if self.find_and_click('redeem_button', '兑换按钮', wait=True, timeout=10):
             print("  [√] 已点击兑换")
-            time.sleep(2)
+            get_clock().sleep(2)
             return True
 
         print("  [!] 未找到兑换按钮")
@@ -470,7 +713,7 @@ class AutoSignIn:
         self.log(11, "获取兑换结果并点击确定")
 
         # 等待弹窗出现
-        time.sleep(1)
+        get_clock().sleep(1)
 
         # 方法1: 使用OCR识别弹窗内容
         print("  使用OCR识别弹窗内容...")
@@ -481,7 +724,7 @@ class AutoSignIn:
         else:
             # 方法2: 尝试识别成功消息图片
             success_img = self.config['images'].get('success_message')
-            if success_img and os.path.exists(success_img):
+            if templates.exists(success_img):
                 pos = self.finder.find_on_screen(success_img, 0.7)
                 if pos:
                     self.result_message = "兑换成功"
@@ -496,13 +739,13 @@ class AutoSignIn:
         print("  点击确定按钮...")
         if self.find_and_click('confirm_button', '确定按钮', wait=True, timeout=10):
             print("  [√] 已点击确定")
-            time.sleep(1)
+            get_clock().sleep(1)
             return True
 
         # 尝试按回车确认
         print("  尝试按回车确认...")
-        pyautogui.press('enter')
-        time.sleep(1)
+        get_input().press('enter')
+        get_clock().sleep(1)
 
         return True
 
@@ -517,12 +760,13 @@ class AutoSignIn:
             height = region.get('height', 150)
 
             # 截取弹窗区域
-            screenshot = ImageGrab.grab(bbox=(x, y, x + width, y + height))
+            screenshot = get_screen().grab(bbox=(x, y, x + width, y + height))
 
-            # 保存截图用于调试
-            debug_path = 'images/dialog_debug.png'
-            screenshot.save(debug_path)
-            print(f"  [OCR] 弹窗截图已保存: {debug_path}")
+            # 保存截图用于调试（模拟运行时不覆盖）
+            if not get_clock().simulated:
+                debug_path = 'images/dialog_debug.png'
+                screenshot.save(debug_path)
+                print(f"  [OCR] 弹窗截图已保存: {debug_path}")
 
             # 转换为numpy数组
             img_array = np.array(screenshot)
@@ -534,7 +778,9 @@ class AutoSignIn:
                 return None
 
             # 执行OCR
-            results = reader.readtext(img_array)
+            with span('ocr', 'ocr'):
+                results = reader.readtext(img_array)
+            get_clock().charge('ocr')
 
             # 提取文本
             texts = []
@@ -560,14 +806,16 @@ class AutoSignIn:
     def ocr_screen_region(self, x, y, width, height):
         """OCR识别指定屏幕区域"""
         try:
-            screenshot = ImageGrab.grab(bbox=(x, y, x + width, y + height))
+            screenshot = get_screen().grab(bbox=(x, y, x + width, y + height))
             img_array = np.array(screenshot)
 
             reader = get_ocr_reader()
             if reader is None:
                 return None
 
-            results = reader.readtext(img_array)
+            with span('ocr', 'ocr'):
+                results = reader.readtext(img_array)
+            get_clock().charge('ocr')
             texts = [text for (_, text, prob) in results if prob > 0.5]
             return ' '.join(texts) if texts else None
 
@@ -581,74 +829,157 @@ class AutoSignIn:
 
         # 构建推送内容
         title = "签到结果通知"
+        if self.config.get('account'):
+            title += f" ({self.config['account']})"
         content = f"兑换码: {self.redeem_code}\n结果: {self.result_message}\n时间: {time.strftime('%Y-%m-%d %H:%M:%S')}"
 
         print(f"  推送内容:")
         print(f"    标题: {title}")
         print(f"    内容: {content}")
 
-        # 推送到微信
-        WxPush.send(title, content, self.config['wx_push'])
+        # 推送到微信（后台发送，失败自动重试）
+        WxPush.send_async(title, content, self.config['wx_push'])
 
         return True
 
-    def run(self):
-        """执行完整签到流程"""
+    # 签到流程：(步骤号, 方法名, 失败时的提示；None 表示失败也继续)
+    STEPS = [
+        (1, 'step1_open_main_site', None),
+        (2, 'step2_handle_cloudflare', None),
+        (3, 'step3_close_announcement', None),
+        (4, 'step4_click_signin_entry', "无法进入签到页面"),
+        (5, 'step5_spin_wheel', "无法开始转盘"),
+        (6, 'step6_click_wheel_confirm', None),
+        (7, 'step7_wait_and_get_code', "无法获取兑换码"),
+        (8, 'step8_goto_topup_page', None),
+        (9, 'step9_paste_redeem_code', "无法粘贴兑换码"),
+        (10, 'step10_click_redeem', "无法点击兑换"),
+        (11, 'step11_get_result_and_confirm', None),
+        (12, 'step12_push_result', None),
+    ]
+
+    def run(self, resume=False):
+        """执行完整签到流程（设置环境变量 AUTOTASK_TRACE 时导出追踪文件）
+
+        resume=True 时从上次失败的步骤继续，已获取的兑换码不会重新获取
+        """
+        target = trace.trace_target(self.config)
+        if target is None or trace.enabled():
+            return self._run(resume)
+        trace.enable()
+        try:
+            with span('signin', 'task'):
+                return self._run(resume)
+        finally:
+            for path in trace.save(trace.disable(), target, name='signin'):
+                print(f"[追踪] 已导出: {path}")
+
+    def _checkpoint_key(self):
+        """断点键：日期 + 配置内容，跨天或修改配置后旧断点自动失效（兑换码只当天有效）"""
+        data = json.dumps(self.config, ensure_ascii=False, default=str)
+        digest = hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+        return f"{time.strftime('%Y-%m-%d')}-{digest}"
+
+    def _save_checkpoint(self, step, failed=False):
+        """保存断点，返回是否已写入（模拟运行时不写入）"""
+        return self.checkpoint.save(step=step, redeem_code=self.redeem_code,
+                                    result_message=self.result_message, failed=failed)
+
+    def _run_step(self, number, method):
+        """按 CONFIG['retry'] 中的策略执行一个步骤，返回是否成功"""
+        retry = self.config.get('retry', {})
+        policy = RetryPolicy.from_settings(retry.get('default'), retry.get(number))
+        self._emit('step_start', index=number, step_type=method)
+        start = get_clock().time()
+        ok = False
+        try:
+            for attempt in range(1, policy.attempts + 1):
+                # 没有返回值的步骤视为成功
+                if getattr(self, method)() is not False:
+                    ok = True
+                    return True
+                if attempt < policy.attempts:
+                    delay = policy.delay_for(attempt)
+                    print(f"  [重试] {delay:.1f}秒后第 {attempt + 1}/{policy.attempts} 次尝试步骤{number}")
+                    get_clock().sleep(delay)
+            return False
+        finally:
+            self._emit('step_end', index=number, step_type=method,
+                       duration=get_clock().time() - start, result=ok, error=None)
+
+    def _run_http(self):
+        """协议签到，成功返回 True；拿到兑换码但兑换失败时保留兑换码供浏览器流程使用"""
+        from autotask.signin_http import SignInClient, SignInApiError
+        client = SignInClient(self.config['http'], name=self.name)
+        print("\n[协议] 尝试直接请求签到接口...")
+        self._emit('step_start', index=0, step_type='http_signin')
+        start = get_clock().time()
+        ok = False
+        try:
+            with span('http_signin', 'task'):
+                if not self.redeem_code:
+                    self.redeem_code = client.spin()
+                    print(f"  [√] 获取到兑换码: {self.redeem_code}")
+                    self._save_checkpoint(8)
+                self.result_message = client.redeem(self.redeem_code)
+            print(f"  [√] 兑换结果: {self.result_message}")
+            ok = True
+        except SignInApiError as e:
+            print(f"  [协议] 失败: {e}，改用浏览器流程")
+        finally:
+            try:
+                client.save_cookies()
+            except OSError as e:
+                print(f"  [协议] Cookie 保存失败: {e}")
+            client.close()
+            self._emit('step_end', index=0, step_type='http_signin',
+                       duration=get_clock().time() - start, result=ok, error=None)
+        return ok
+
+    def _run(self, resume=False):
         print("=" * 60)
         print("           自动签到脚本启动")
         print("=" * 60)
+        if self.config.get('account'):
+            print(f"账号: {self.config['account']}")
         print(f"主站: {self.config['main_url']}")
         print(f"签到: {self.config['signin_url']}")
         print(f"充值: {self.config['topup_url']}")
         print("=" * 60)
 
-        try:
-            # 步骤1: 打开主站
-            self.step1_open_main_site()
-
-            # 步骤2: 处理CF验证
-            self.step2_handle_cloudflare()
-
-            # 步骤3: 关闭公告
-            self.step3_close_announcement()
-
-            # 步骤4: 点击签到入口
-            if not self.step4_click_signin_entry():
-                print("\n[失败] 无法进入签到页面")
-                return False
-
-            # 步骤5: 点击转盘
-            if not self.step5_spin_wheel():
-                print("\n[失败] 无法开始转盘")
-                return False
-
-            # 步骤6: 等待转盘结果，点击确定
-            self.step6_click_wheel_confirm()
-
-            # 步骤7: 获取兑换码
-            if not self.step7_wait_and_get_code():
-                print("\n[失败] 无法获取兑换码")
-                return False
-
-            # 步骤8: 前往充值页面
-            self.step8_goto_topup_page()
-
-            # 步骤9: 粘贴兑换码
-            if not self.step9_paste_redeem_code():
-                print("\n[失败] 无法粘贴兑换码")
-                return False
-
-            # 步骤10: 点击兑换
-            if not self.step10_click_redeem():
-                print("\n[失败] 无法点击兑换")
-                return False
-
-            # 步骤11: 获取兑换结果并点击确定
-            self.step11_get_result_and_confirm()
-
-            # 步骤12: 推送结果到微信
-            self.step12_push_result()
+        first = 1
+        if resume:
+            state = self.checkpoint.load()
+            if state:
+                first = state['step']
+                self.redeem_code = state.get('redeem_code') or self.redeem_code
+                self.result_message = state.get('result_message')
+                print(f"[断点] 从步骤{first} 继续（断点时间 {state['updated']}，兑换码 {self.redeem_code or '无'}）")
+
+        if self.config.get('http', {}).get('enabled') and first < 10:
+            if self._run_http():
+                self._run_step(12, 'step12_push_result')
+                self.checkpoint.clear()
+                print("\n[协议] 签到流程完成！")
+                return True
+            if self.redeem_code:
+                # 已拿到兑换码，浏览器流程直接从前往充值页面开始
+                first = max(first, 8)
 
+        current = first
+        try:
+            for number, method, fail_message in self.STEPS:
+                if number < first:
+                    continue
+                current = number
+                if not self._run_step(number, method) and fail_message:
+                    print(f"\n[失败] {fail_message}")
+                    if self._save_checkpoint(number, failed=True):
+                        print(f"[断点] 已保存，可从步骤{number} 继续")
+                    return False
+                self._save_checkpoint(number + 1)
+
+            self.checkpoint.clear()
             print("\n" + "=" * 60)
             print("           签到流程完成！")
             print("=" * 60)
@@ -656,13 +987,15 @@ class AutoSignIn:
 
         except KeyboardInterrupt:
             print("\n[中断] 用户取消操作")
+            self._save_checkpoint(current, failed=True)
         except Exception as e:
             print(f"\n[错误] {e}")
+            self._save_checkpoint(current, failed=True)
             import traceback
             traceback.print_exc()
 
             # 推送错误信息
-            WxPush.send("签到失败", f"错误: {str(e)}", self.config['wx_push'])
+            WxPush.send_async("签到失败", f"错误: {str(e)}", self.config['wx_push'], urgent=True)
 
         return False
 
@@ -842,6 +1175,8 @@ if __name__ == "__main__":
 ║  3. 测试微信推送                                          ║
 ║  4. 校准弹窗区域（OCR用）                                 ║
 ║  5. 测试OCR识别                                           ║
+║  6. 从上次失败的步骤继续                                  ║
+║  7. 多账号批量签到（tasks/accounts.json）                 ║
 ║  0. 退出                                                  ║
 ╚══════════════════════════════════════════════════════════╝
     """)
@@ -859,5 +1194,11 @@ if __name__ == "__main__":
         calibrate_dialog_region()
     elif choice == '5':
         test_ocr_current_screen()
+    elif choice == '6':
+        auto = AutoSignIn(CONFIG)
+        auto.run(resume=True)
+    elif choice == '7':
+        from autotask.accounts import main as run_accounts
+        run_accounts([])
     else:
         print("退出")
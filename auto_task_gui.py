@@ -5,514 +5,17 @@
 """
 
 import customtkinter as ctk
-import json
 import os
-import uuid
-import subprocess
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Optional, Callable
-from tkinter import filedialog, messagebox
-
-# ==================== 数据模型 ====================
-
-# 步骤类型定义
-STEP_TYPES = {
-    'click_image': {'icon': '📌', 'name': '点击图片', 'params': ['image_path', 'confidence', 'timeout']},
-    'wait_image': {'icon': '⏳', 'name': '等待图片', 'params': ['image_path', 'confidence', 'timeout']},
-    'long_press': {'icon': '👆', 'name': '长按', 'params': ['duration', 'x', 'y']},
-    'mouse_drag': {'icon': '🖱️', 'name': '鼠标拖动', 'params': ['start_x', 'start_y', 'end_x', 'end_y', 'duration']},
-    'input_text': {'icon': '⌨️', 'name': '输入文本', 'params': ['text', 'clear_first']},
-    'wait_time': {'icon': '⏱️', 'name': '等待时间', 'params': ['seconds']},
-    'open_url': {'icon': '🌐', 'name': '打开URL', 'params': ['url']},
-    'open_app': {'icon': '🚀', 'name': '打开程序', 'params': ['app_path']},
-    'close_app': {'icon': '❌', 'name': '关闭程序', 'params': ['process_name']},
-    'close_browser': {'icon': '🔒', 'name': '关闭浏览器', 'params': ['browser_type']},
-    'paste': {'icon': '📋', 'name': '粘贴', 'params': []},
-    'clipboard_set': {'icon': '📋', 'name': '设置剪贴板', 'params': ['content']},
-    'ocr_region': {'icon': '🔤', 'name': 'OCR识别', 'params': ['x1', 'y1', 'x2', 'y2', 'var_name', 'retry_count', 'retry_interval']},
-    'press_key': {'icon': '⌨️', 'name': '按键操作', 'params': ['key', 'modifiers']},
-    'wx_push': {'icon': '📱', 'name': '微信推送', 'params': ['title', 'content', 'token']},
-    'loop_start': {'icon': '🔁', 'name': '循环开始', 'params': ['loop_count']},
-    'loop_end': {'icon': '🔚', 'name': '循环结束', 'params': []},
-}
-
-# 参数默认值
-PARAM_DEFAULTS = {
-    'image_path': '', 'confidence': 0.8, 'timeout': 30,
-    'text': '', 'clear_first': True, 'seconds': 3,
-    'url': 'https://', 'var_name': 'result', 'content': '',
-    'x': 0, 'y': 0, 'width': 200, 'height': 100,
-    'x1': 0, 'y1': 0, 'x2': 200, 'y2': 100,
-    'start_x': 0, 'start_y': 0, 'end_x': 100, 'end_y': 100,
-    'key': 'enter', 'modifiers': '',
-    'title': '通知', 'token': '',
-    'duration': 1.0,
-    'app_path': '',
-    'loop_count': 3,
-    'process_name': '',
-    'browser_type': 'all',
-    'retry_count': 10,
-    'retry_interval': 2,
-}
-
-# 参数中文名称
-PARAM_LABELS = {
-    'image_path': '图片路径',
-    'confidence': '置信度',
-    'timeout': '超时(秒)',
-    'text': '文本内容',
-    'clear_first': '先清空',
-    'seconds': '秒数',
-    'url': '网址',
-    'app_path': '程序路径',
-    'var_name': '变量名',
-    'content': '内容',
-    'x': 'X坐标',
-    'y': 'Y坐标',
-    'width': '宽度',
-    'height': '高度',
-    'x1': '起始X',
-    'y1': '起始Y',
-    'x2': '结束X',
-    'y2': '结束Y',
-    'start_x': '起点X',
-    'start_y': '起点Y',
-    'end_x': '终点X',
-    'end_y': '终点Y',
-    'key': '按键',
-    'modifiers': '组合键',
-    'title': '标题',
-    'token': '令牌',
-    'duration': '时长(秒)',
-    'loop_count': '循环次数',
-    'process_name': '进程名',
-    'browser_type': '浏览器类型',
-    'retry_count': '重试次数',
-    'retry_interval': '重试间隔(秒)',
-}
-
-
-@dataclass
-class Step:
-    """步骤数据类"""
-    id: str = field(default_factory=lambda: str(uuid.uuid4())[:8])
-    step_type: str = ''
-    params: Dict = field(default_factory=dict)
-    enabled: bool = True
-
-    def to_dict(self):
-        return asdict(self)
-
-    @classmethod
-    def from_dict(cls, data):
-        return cls(**data)
-
-
-class StepManager:
-    """步骤管理器"""
-    def __init__(self):
-        self.steps: List[Step] = []
-        self._on_change: Optional[Callable] = None
-
-    def set_on_change(self, callback):
-        self._on_change = callback
-
-    def _notify(self):
-        if self._on_change:
-            self._on_change()
-
-    def add_step(self, step_type: str, insert_after_id: str = None) -> Step:
-        params = {p: PARAM_DEFAULTS.get(p, '') for p in STEP_TYPES[step_type]['params']}
-        step = Step(step_type=step_type, params=params)
-
-        # 如果指定了插入位置，则插入到该位置之后
-        if insert_after_id:
-            for i, s in enumerate(self.steps):
-                if s.id == insert_after_id:
-                    self.steps.insert(i + 1, step)
-                    self._notify()
-                    return step
-
-        # 默认添加到末尾
-        self.steps.append(step)
-        self._notify()
-        return step
-
-    def remove_step(self, step_id: str):
-        self.steps = [s for s in self.steps if s.id != step_id]
-        self._notify()
-
-    def move_step(self, step_id: str, direction: int):
-        for i, s in enumerate(self.steps):
-            if s.id == step_id:
-                new_idx = i + direction
-                if 0 <= new_idx < len(self.steps):
-                    self.steps[i], self.steps[new_idx] = self.steps[new_idx], self.steps[i]
-                    self._notify()
-                break
-
-    def move_step_to(self, step_id: str, target_idx: int):
-        """移动步骤到指定位置（从1开始）"""
-        target_idx = target_idx - 1  # 转换为0索引
-        for i, s in enumerate(self.steps):
-            if s.id == step_id:
-                if i == target_idx or target_idx < 0 or target_idx >= len(self.steps):
-                    return
-                step = self.steps.pop(i)
-                self.steps.insert(target_idx, step)
-                self._notify()
-                break
-
-    def update_step(self, step_id: str, params: Dict):
-        for s in self.steps:
-            if s.id == step_id:
-                s.params.update(params)
-                self._notify()
-                break
-
-    def toggle_step(self, step_id: str):
-        for s in self.steps:
-            if s.id == step_id:
-                s.enabled = not s.enabled
-                self._notify()
-                break
-
-    def get_step(self, step_id: str) -> Optional[Step]:
-        for s in self.steps:
-            if s.id == step_id:
-                return s
-        return None
-
-    def clear(self):
-        self.steps = []
-        self._notify()
-
-    def to_list(self):
-        return [s.to_dict() for s in self.steps]
-
-    def from_list(self, data):
-        self.steps = [Step.from_dict(d) for d in data]
-        self._notify()
-
-
-class TaskConfig:
-    """任务配置"""
-    def __init__(self):
-        self.name = "未命名任务"
-        self.description = ""
-        self.settings = {'default_confidence': 0.8, 'default_timeout': 30}
-        self.step_manager = StepManager()
-
-    def save(self, filepath: str):
-        data = {
-            'name': self.name,
-            'description': self.description,
-            'settings': self.settings,
-            'steps': self.step_manager.to_list()
-        }
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-
-    def load(self, filepath: str):
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        self.name = data.get('name', '未命名任务')
-        self.description = data.get('description', '')
-        self.settings = data.get('settings', {})
-        self.step_manager.from_list(data.get('steps', []))
-
-
-# ==================== 代码生成器 ====================
-
-class CodeGenerator:
-    """代码生成器"""
-
-    IMPORTS = '''# -*- coding: utf-8 -*-
-"""自动生成的任务脚本"""
+import sys
+import threading
 import time
-import webbrowser
-import pyautogui
-import pyperclip
-from auto_signin import ImageFinder, HumanMouse, WxPush, get_ocr_reader
-from PIL import ImageGrab
-import numpy as np
-'''
-
-    TEMPLATES = {
-        'click_image': '''
-def step_{idx}_click_image():
-    """点击图片: {image_path}"""
-    finder = ImageFinder()
-    mouse = HumanMouse()
-    pos = finder.wait_for_image("{image_path}", timeout={timeout}, confidence={confidence})
-    if pos:
-        mouse.click(pos[0], pos[1])
-        return True
-    return False
-''',
-        'wait_image': '''
-def step_{idx}_wait_image():
-    """等待图片: {image_path}"""
-    finder = ImageFinder()
-    pos = finder.wait_for_image("{image_path}", timeout={timeout}, confidence={confidence})
-    return pos is not None
-''',
-        'input_text': '''
-def step_{idx}_input_text():
-    """输入文本"""
-    {clear_code}
-    text = "{text}"
-    # 使用剪贴板方式输入，支持中文
-    pyperclip.copy(text)
-    pyautogui.hotkey("ctrl", "v")
-    time.sleep(0.2)
-''',
-        'wait_time': '''
-def step_{idx}_wait_time():
-    """等待 {seconds} 秒"""
-    time.sleep({seconds})
-''',
-        'open_url': '''
-def step_{idx}_open_url():
-    """打开URL: {url}"""
-    webbrowser.open("{url}")
-    time.sleep(3)
-''',
-        'long_press': '''
-def step_{idx}_long_press():
-    """长按 {duration} 秒"""
-    import pyautogui
-    x, y = {x}, {y}
-    if x == 0 and y == 0:
-        x, y = pyautogui.position()
-    pyautogui.mouseDown(x, y)
-    time.sleep({duration})
-    pyautogui.mouseUp()
-''',
-        'paste': '''
-def step_{idx}_paste():
-    """粘贴剪贴板内容"""
-    pyautogui.hotkey("ctrl", "v")
-    time.sleep(0.3)
-''',
-        'open_app': '''
-def step_{idx}_open_app():
-    """打开程序: {app_path}"""
-    import subprocess
-    import os
-    app_path = r"{app_path}"
-    if os.path.exists(app_path):
-        subprocess.Popen(app_path, shell=True)
-        print(f"  [√] 已启动: {{app_path}}")
-        time.sleep(2)
-    else:
-        print(f"  [!] 程序不存在: {{app_path}}")
-''',
-        'clipboard_set': '''
-def step_{idx}_clipboard_set():
-    """设置剪贴板内容"""
-    pyperclip.copy("{content}")
-''',
-        'ocr_region': '''
-def step_{idx}_ocr_region():
-    """OCR识别区域 ({x1},{y1}) - ({x2},{y2}) - 使用Umi-OCR (重试{retry_count}次)"""
-    global {var_name}
-    import os
-    import base64
-    import io
-    import requests
-
-    retry_count = {retry_count}
-    retry_interval = {retry_interval}
-
-    for attempt in range(retry_count):
-        screenshot = ImageGrab.grab(bbox=({x1}, {y1}, {x2}, {y2}))
-        # 保存截图用于调试
-        debug_path = "images/_ocr_debug_{idx}.png"
-        os.makedirs("images", exist_ok=True)
-        screenshot.save(debug_path)
-        print(f"  [OCR] 第 {{attempt + 1}}/{{retry_count}} 次尝试, 截图区域: ({x1},{y1}) - ({x2},{y2})")
-
-        # 转换为base64
-        buffer = io.BytesIO()
-        screenshot.save(buffer, format='PNG')
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
-
-        # 调用Umi-OCR HTTP API
-        try:
-            resp = requests.post(
-                "http://127.0.0.1:1224/api/ocr",
-                json={{"base64": img_base64, "options": {{"data.format": "text"}}}},
-                timeout=30
-            )
-            data = resp.json()
-            if data.get("code") == 100:
-                result_text = data.get("data", "").strip()
-                if result_text:  # 识别成功且有内容
-                    {var_name} = result_text
-                    print(f"  [OCR] 识别成功: {{{var_name}}}")
-                    return {var_name}
-                else:
-                    print(f"  [OCR] 识别结果为空，等待 {{retry_interval}} 秒后重试...")
-            else:
-                print(f"  [OCR] 识别失败: {{data.get('msg', '未知错误')}}，等待 {{retry_interval}} 秒后重试...")
-        except Exception as e:
-            print(f"  [OCR] 请求失败: {{e}}")
-            print("  [OCR] 请确保Umi-OCR已启动并开启HTTP服务(端口1224)")
-
-        if attempt < retry_count - 1:
-            time.sleep(retry_interval)
-
-    # 所有重试都失败
-    {var_name} = ""
-    print(f"  [OCR] 重试 {{retry_count}} 次后仍然失败!")
-    return {var_name}
-''',
-        'press_key': '''
-def step_{idx}_press_key():
-    """按键: {key}"""
-    {key_code}
-''',
-        'wx_push': '''
-def step_{idx}_wx_push():
-    """微信推送"""
-    config = {{'enabled': True, 'url': 'https://xiaoxi.qxbl.de5.net/wxsend', 'token': '{token}'}}
-    # 支持变量引用，如 {{result}} 会被替换为变量值
-    title = "{title}"
-    content = "{content}"
-    # 尝试替换变量
-    for var_name in ['result', 'redeem_code', 'ocr_result']:
-        if var_name in globals():
-            content = content.replace('{{' + var_name + '}}', str(globals()[var_name]))
-            title = title.replace('{{' + var_name + '}}', str(globals()[var_name]))
-    WxPush.send(title, content, config)
-''',
-        'mouse_drag': '''
-def step_{idx}_mouse_drag():
-    """鼠标拖动: ({start_x},{start_y}) -> ({end_x},{end_y})"""
-    import pyautogui
-    pyautogui.moveTo({start_x}, {start_y})
-    time.sleep(0.1)
-    pyautogui.drag({end_x} - {start_x}, {end_y} - {start_y}, duration={duration})
-''',
-        'loop_start': '''
-def step_{idx}_loop_start():
-    """循环开始: {loop_count} 次"""
-    pass  # 循环逻辑在main中处理
-''',
-        'loop_end': '''
-def step_{idx}_loop_end():
-    """循环结束"""
-    pass  # 循环逻辑在main中处理
-''',
-        'close_app': '''
-def step_{idx}_close_app():
-    """关闭程序: {process_name}"""
-    import subprocess
-    process_name = "{process_name}"
-    try:
-        subprocess.run(f'taskkill /F /IM {{process_name}}', shell=True, capture_output=True)
-        print(f"  [√] 已关闭: {{process_name}}")
-    except Exception as e:
-        print(f"  [!] 关闭失败: {{e}}")
-''',
-        'close_browser': '''
-def step_{idx}_close_browser():
-    """关闭浏览器: {browser_type}"""
-    import subprocess
-    browser_type = "{browser_type}"
-    browsers = {{
-        'chrome': ['chrome.exe', 'chromedriver.exe'],
-        'edge': ['msedge.exe', 'msedgedriver.exe'],
-        'firefox': ['firefox.exe', 'geckodriver.exe'],
-        'all': ['chrome.exe', 'msedge.exe', 'firefox.exe', 'chromedriver.exe', 'msedgedriver.exe', 'geckodriver.exe']
-    }}
-    targets = browsers.get(browser_type, browsers['all'])
-    for proc in targets:
-        try:
-            subprocess.run(f'taskkill /F /IM {{proc}}', shell=True, capture_output=True)
-        except:
-            pass
-    print(f"  [√] 已关闭浏览器: {{browser_type}}")
-''',
-    }
-
-    MAIN_TEMPLATE = '''
-
-def main():
-    """执行所有步骤"""
-    print("=" * 50)
-    print("开始执行自动化任务")
-    print("=" * 50)
-{step_calls}
-    print("=" * 50)
-    print("任务执行完成")
-    print("=" * 50)
-
-if __name__ == "__main__":
-    main()
-'''
-
-    def generate(self, step_manager: StepManager) -> str:
-        code = self.IMPORTS
-        step_calls = []
-        indent_level = 1  # 基础缩进级别
-        loop_stack = []  # 循环栈，存储循环次数
-
-        for idx, step in enumerate(step_manager.steps, 1):
-            if not step.enabled:
-                continue
-
-            template = self.TEMPLATES.get(step.step_type, '')
-            params = step.params.copy()
-            params['idx'] = idx
-
-            # 补充缺失的默认参数（兼容旧配置文件）
-            step_info = STEP_TYPES.get(step.step_type, {})
-            for param_name in step_info.get('params', []):
-                if param_name not in params:
-                    params[param_name] = PARAM_DEFAULTS.get(param_name, '')
-
-            # 特殊处理
-            if step.step_type == 'input_text':
-                params['clear_code'] = 'pyautogui.hotkey("ctrl", "a")\n    ' if params.get('clear_first') else ''
-            elif step.step_type == 'press_key':
-                mods = params.get('modifiers', '').strip()
-                key = params.get('key', 'enter')
-                if mods:
-                    # 支持逗号分隔的修饰键
-                    mod_list = [m.strip() for m in mods.replace('+', ',').split(',') if m.strip()]
-                    key_list = [k.strip() for k in key.split(',') if k.strip()]
-                    all_keys = mod_list + key_list
-                    keys_str = '", "'.join(all_keys)
-                    params['key_code'] = f'pyautogui.hotkey("{keys_str}")'
-                else:
-                    params['key_code'] = f'pyautogui.press("{key}")'
-
-            code += template.format(**params)
-
-            # 处理循环逻辑
-            base_indent = '    ' * indent_level
-            if step.step_type == 'loop_start':
-                loop_count = params.get('loop_count', 3)
-                loop_stack.append(loop_count)
-                step_calls.append(f'{base_indent}print("步骤{idx}: 循环开始 ({loop_count}次)")')
-                step_calls.append(f'{base_indent}for _loop_i_{len(loop_stack)} in range({loop_count}):')
-                step_calls.append(f'{base_indent}    print(f"  第 {{_loop_i_{len(loop_stack)} + 1}}/{loop_count} 次循环")')
-                indent_level += 1
-            elif step.step_type == 'loop_end':
-                if loop_stack:
-                    loop_stack.pop()
-                    indent_level = max(1, indent_level - 1)
-                    base_indent = '    ' * indent_level
-                step_calls.append(f'{base_indent}print("步骤{idx}: 循环结束")')
-            else:
-                step_calls.append(f'{base_indent}print("步骤{idx}: {STEP_TYPES[step.step_type]["name"]}")')
-                step_calls.append(f'{base_indent}step_{idx}_{step.step_type}()')
-
-        code += self.MAIN_TEMPLATE.format(step_calls='\n'.join(step_calls))
-        return code
+from tkinter import filedialog, messagebox
 
+# 数据模型和代码生成器位于无 GUI 依赖的 autotask 包，这里导出以兼容旧的运行脚本
+from autotask import (
+    STEP_TYPES, PARAM_DEFAULTS, PARAM_LABELS,
+    Step, StepDiff, StepManager, TaskConfig, CodeGenerator,
+)
 
 # ==================== GUI 组件 ====================
 
@@ -533,60 +36,198 @@ class StepTypePanel(ctk.CTkScrollableFrame):
             btn.pack(pady=3, padx=5, fill="x")
 
 
-class StepListPanel(ctk.CTkScrollableFrame):
-    """步骤列表面板"""
+class StepListPanel(ctk.CTkFrame):
+    """步骤列表面板（虚拟列表）
+
+    只创建填满可见区域所需的行控件，滚动时把这些行重新绑定到对应的步骤，
+    行控件数量和刷新耗时与步骤总数无关；每行记下当前显示的文字和高亮，没有变化时不重新配置。
+    点击步骤后可用 ↑/↓、PageUp/PageDown、Home/End 切换选中；运行时正在执行的步骤另用颜色标出
+    """
+    ROW_HEIGHT = 32     # 行距（按钮高 28 + 上下间隔）
+    COLORS = {'running': "#2b5d34", 'selected': "gray25", None: "transparent"}
+
     def __init__(self, master, step_manager: StepManager, on_select, **kwargs):
         super().__init__(master, **kwargs)
         self.step_manager = step_manager
         self.on_select = on_select
         self.selected_id = None
-        self.step_frames = {}
+        self.running_id = None  # 运行监视中正在执行的步骤
+        self._top = 0           # 可见区域顶部在整个列表中的位置
+        self._rows = []         # 行按钮池
+        self._row_ids = []      # 每行当前绑定的步骤 id（None 表示未使用）
+        self._row_state = []    # 每行当前的 (文字, 是否选中)
+
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self._viewport = ctk.CTkFrame(self, fg_color="transparent", corner_radius=0)
+        self._viewport.grid(row=0, column=0, sticky="nsew", padx=(3, 0), pady=3)
+        self._scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self._scrollbar.grid(row=0, column=1, sticky="ns", pady=3)
+        self._viewport.bind("<Configure>", lambda e: self.refresh())
+        self._bind_wheel(self._viewport)
 
         step_manager.set_on_change(self.refresh)
 
-    def refresh(self):
-        for w in self.winfo_children():
-            w.destroy()
-        self.step_frames = {}
-
-        for idx, step in enumerate(self.step_manager.steps, 1):
-            frame = ctk.CTkFrame(self, fg_color="gray25" if step.id == self.selected_id else "transparent")
-            frame.pack(fill="x", pady=2, padx=2)
-
-            info = STEP_TYPES.get(step.step_type, {})
-            status = "☑" if step.enabled else "☐"
-            text = f"{status} {idx}. [{info.get('name', '')}]"
-
-            # 显示关键参数
-            if step.step_type in ['open_url', 'click_image', 'wait_image']:
-                key_param = step.params.get('url') or step.params.get('image_path', '')
-                if key_param:
-                    text += f" {key_param[:20]}..."
-            elif step.step_type == 'wait_time':
-                text += f" {step.params.get('seconds', 0)}秒"
-            elif step.step_type == 'loop_start':
-                text += f" {step.params.get('loop_count', 3)}次"
-            elif step.step_type == 'mouse_drag':
-                text += f" ({step.params.get('start_x', 0)},{step.params.get('start_y', 0)})->({step.params.get('end_x', 0)},{step.params.get('end_y', 0)})"
-            elif step.step_type == 'close_app':
-                text += f" {step.params.get('process_name', '')}"
-            elif step.step_type == 'close_browser':
-                text += f" {step.params.get('browser_type', 'all')}"
+    @staticmethod
+    def step_text(idx: int, step: Step) -> str:
+        """步骤在列表中显示的文字"""
+        info = STEP_TYPES.get(step.step_type, {})
+        status = "☑" if step.enabled else "☐"
+        text = f"{status} {idx}. [{info.get('name', '')}]"
+
+        # 显示关键参数
+        if step.step_type in ['open_url', 'click_image', 'wait_image', 'if_image', 'case']:
+            key_param = step.params.get('url') or step.params.get('image_path', '')
+            if key_param:
+                text += f" {key_param[:20]}..."
+        elif step.step_type == 'wait_time':
+            text += f" {step.params.get('seconds', 0)}秒"
+        elif step.step_type == 'loop_start':
+            text += f" {step.params.get('loop_count', 3)}次"
+        elif step.step_type == 'mouse_drag':
+            text += f" ({step.params.get('start_x', 0)},{step.params.get('start_y', 0)})->({step.params.get('end_x', 0)},{step.params.get('end_y', 0)})"
+        elif step.step_type == 'close_app':
+            text += f" {step.params.get('process_name', '')}"
+        elif step.step_type == 'close_browser':
+            text += f" {step.params.get('browser_type', 'all')}"
+        return text
+
+    # ---------- 尺寸和滚动 ----------
+
+    def _view_height(self):
+        """可见区域高度（未缩放的逻辑像素）"""
+        height = self._viewport.winfo_height()
+        if height <= 1:     # 尚未显示
+            height = self._viewport.winfo_reqheight()
+        return max(int(height / self._get_widget_scaling()), self.ROW_HEIGHT)
+
+    def _max_top(self):
+        return max(0, len(self.step_manager.steps) * self.ROW_HEIGHT - self._view_height())
+
+    def scroll_to(self, top):
+        top = min(max(0, int(top)), self._max_top())
+        if top != self._top:
+            self._top = top
+            self._render()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == 'moveto':
+            self.scroll_to(float(value) * len(self.step_manager.steps) * self.ROW_HEIGHT)
+        elif unit == 'pages':
+            self.scroll_to(self._top + int(value) * self._view_height())
+        else:
+            self.scroll_to(self._top + int(value) * self.ROW_HEIGHT)
 
-            btn = ctk.CTkButton(
-                frame, text=text, anchor="w",
-                fg_color="transparent", hover_color="gray30",
-                command=lambda s=step: self._select(s)
-            )
-            btn.pack(side="left", fill="x", expand=True)
+    def _on_wheel(self, event):
+        if sys.platform.startswith("win"):
+            rows = -event.delta / 40
+        elif sys.platform == "darwin":
+            rows = -event.delta
+        else:
+            rows = -3 if event.num == 4 else 3
+        self.scroll_to(self._top + rows * self.ROW_HEIGHT)
 
-            self.step_frames[step.id] = frame
+    def _bind_wheel(self, widget):
+        if sys.platform.startswith("linux"):
+            widget.bind("<Button-4>", self._on_wheel)
+            widget.bind("<Button-5>", self._on_wheel)
+        else:
+            widget.bind("<MouseWheel>", self._on_wheel)
+
+    def scroll_into_view(self, index):
+        """滚动使第 index 个步骤（从 0 开始）完整可见"""
+        y = index * self.ROW_HEIGHT
+        if y < self._top:
+            self.scroll_to(y)
+        elif y + self.ROW_HEIGHT > self._top + self._view_height():
+            self.scroll_to(y + self.ROW_HEIGHT - self._view_height())
+
+    # ---------- 渲染 ----------
+
+    def refresh(self, diff: StepDiff = None):
+        if diff is not None and not (diff.reset or diff.added or diff.removed or diff.moved) \
+                and not set(diff.updated) & set(self._row_ids):
+            return  # 只修改了不在可见区域的步骤
+        if self.selected_id and self.step_manager.get_step(self.selected_id) is None:
+            self.selected_id = None
+        self._top = min(self._top, self._max_top())
+        self._render()
+
+    def _new_row(self):
+        btn = ctk.CTkButton(self._viewport, text="", anchor="w", height=self.ROW_HEIGHT - 4,
+                            fg_color="transparent", hover_color="gray30")
+        slot = len(self._rows)
+        btn.configure(command=lambda k=slot: self._click_row(k))
+        self._bind_wheel(btn)
+        for key in ("Up", "Down", "Prior", "Next", "Home", "End"):
+            btn.bind(f"<{key}>", lambda e, k=key: self._on_key(k))
+        self._rows.append(btn)
+        self._row_ids.append(None)
+        self._row_state.append(None)
+
+    def _render(self):
+        steps = self.step_manager.steps
+        total = len(steps) * self.ROW_HEIGHT
+        height = self._view_height()
+        first, offset = divmod(self._top, self.ROW_HEIGHT)
+        count = min(len(steps) - first, height // self.ROW_HEIGHT + 2)
+        while len(self._rows) < count:
+            self._new_row()
+
+        for slot, btn in enumerate(self._rows):
+            idx = first + slot
+            if slot >= count:
+                if self._row_ids[slot] is not None:
+                    btn.place_forget()
+                    self._row_ids[slot] = self._row_state[slot] = None
+                continue
+            step = steps[idx]
+            mark = 'running' if step.id == self.running_id else 'selected' if step.id == self.selected_id else None
+            state = (self.step_text(idx + 1, step), mark)
+            if state != self._row_state[slot]:
+                btn.configure(text=state[0], fg_color=self.COLORS[mark])
+                self._row_state[slot] = state
+            self._row_ids[slot] = step.id
+            btn.place(x=0, y=slot * self.ROW_HEIGHT - offset + 2, relwidth=1)
+
+        if total > height:
+            self._scrollbar.set(self._top / total, (self._top + height) / total)
+        else:
+            self._scrollbar.set(0, 1)
+
+    # ---------- 选中 ----------
+
+    def _click_row(self, slot):
+        step = self.step_manager.get_step(self._row_ids[slot])
+        if step is not None:
+            self._rows[slot].focus_set()
+            self._select(step)
+
+    def _on_key(self, key):
+        steps = self.step_manager.steps
+        if not steps:
+            return
+        index = self.step_manager.index_of(self.selected_id) if self.selected_id else -1
+        page = max(1, self._view_height() // self.ROW_HEIGHT - 1)
+        target = {'Up': index - 1, 'Down': index + 1, 'Prior': index - page, 'Next': index + page,
+                  'Home': 0, 'End': len(steps) - 1}[key]
+        target = min(max(target, 0), len(steps) - 1)
+        self.scroll_into_view(target)
+        self._select(steps[target])
 
     def _select(self, step: Step):
         self.selected_id = step.id
-        self.refresh()
+        self._render()
         self.on_select(step)
 
+    def set_running(self, step_id):
+        """标出正在执行的步骤并滚动到该步骤，None 取消标记"""
+        self.running_id = step_id
+        index = self.step_manager.index_of(step_id) if step_id else -1
+        if index >= 0:
+            self.scroll_into_view(index)
+        self._render()
+
 
 class PropertyEditor(ctk.CTkFrame):
     """属性编辑器"""
@@ -641,13 +282,16 @@ class PropertyEditor(ctk.CTkFrame):
                 entry.pack(side="left", padx=5)
                 ctk.CTkButton(row, text="浏览", width=50,
                               command=lambda e=entry: self._browse_image(e)).pack(side="left")
+                if 'confidence' in info['params']:
+                    ctk.CTkButton(row, text="预览", width=50,
+                                  command=self._preview_match).pack(side="left", padx=(3, 0))
             elif param == 'app_path':
                 entry = ctk.CTkEntry(row, width=150)
                 entry.insert(0, str(value))
                 entry.pack(side="left", padx=5)
                 ctk.CTkButton(row, text="浏览", width=50,
                               command=lambda e=entry: self._browse_app(e)).pack(side="left")
-            elif param == 'clear_first':
+            elif param in ('clear_first', 'click_match'):
                 var = ctk.BooleanVar(value=bool(value))
                 cb = ctk.CTkCheckBox(row, text="", variable=var)
                 cb.pack(side="left", padx=5)
@@ -681,9 +325,23 @@ class PropertyEditor(ctk.CTkFrame):
             filetypes=[("PNG", "*.png"), ("All", "*.*")]
         )
         if path:
+            # 导入模板库，任务中保存「哈希/名称」引用，复制到其它电脑也不用改路径
+            from autotask.templates import DEFAULT_STORE
+            try:
+                path = DEFAULT_STORE.add_file(path)
+            except (ValueError, OSError) as e:
+                messagebox.showwarning("提示", f"无法导入模板库，使用原路径: {e}", parent=self)
             entry.delete(0, "end")
             entry.insert(0, path)
 
+    def _preview_match(self):
+        """打开匹配预览，调整好的阈值写回「匹配度」输入框"""
+        entry = self.entries.get('image_path')
+        if not entry or not entry.get().strip():
+            messagebox.showwarning("提示", "请先选择图片", parent=self)
+            return
+        MatchPreviewWindow(self, entry.get().strip(), self.entries.get('confidence'))
+
     def _browse_app(self, entry):
         path = filedialog.askopenfilename(
             filetypes=[("可执行文件", "*.exe"), ("All", "*.*")]
@@ -795,11 +453,7 @@ class PropertyEditor(ctk.CTkFrame):
         from tkinter import simpledialog
         total = len(self.step_manager.steps)
         # 获取当前位置
-        current_idx = 0
-        for i, s in enumerate(self.step_manager.steps):
-            if s.id == self.current_step.id:
-                current_idx = i + 1
-                break
+        current_idx = self.step_manager.index_of(self.current_step.id) + 1
         target = simpledialog.askinteger(
             "移动到",
             f"当前位置: {current_idx}\n输入目标位置 (1-{total}):",
@@ -822,8 +476,7 @@ class PropertyEditor(ctk.CTkFrame):
                 params=self.current_step.params.copy(),
                 enabled=self.current_step.enabled
             )
-            self.step_manager.steps.append(new_step)
-            self.step_manager._notify()
+            self.step_manager.insert_step(new_step)
             self.on_change()
 
     def _delete(self):
@@ -833,25 +486,67 @@ class PropertyEditor(ctk.CTkFrame):
             self.show_step(None)
 
 
+def _common_prefix(a: str, b: str) -> int:
+    """两段文字相同前缀的长度（二分比较切片，长文本也很快）"""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    """两段文字相同后缀的长度，不超过 limit"""
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
 class CodePreview(ctk.CTkFrame):
     """代码预览区域"""
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
+        self._code = ""
 
         ctk.CTkLabel(self, text="代码预览", font=("", 14, "bold")).pack(pady=(5, 0))
 
         self.textbox = ctk.CTkTextbox(self, font=("Consolas", 12))
         self.textbox.pack(fill="both", expand=True, padx=5, pady=5)
 
+    @staticmethod
+    def _index(text: str, offset: int) -> str:
+        """字符偏移转换为文本框的 "行.列" 位置"""
+        line = text.count("\n", 0, offset) + 1
+        column = offset - (text.rfind("\n", 0, offset) + 1)
+        return f"{line}.{column}"
+
     def set_code(self, code: str):
-        self.textbox.delete("1.0", "end")
-        self.textbox.insert("1.0", code)
+        """只替换与当前内容不同的一段，滚动位置保持不变"""
+        old = self._code
+        if code == old:
+            return
+        start = _common_prefix(old, code)
+        end = _common_suffix(old, code, min(len(old), len(code)) - start)
+        index = self._index(old, start)
+        self.textbox.delete(index, self._index(old, len(old) - end))
+        self.textbox.insert(index, code[start:len(code) - end])
+        self._code = code
 
 
 # ==================== 主窗口 ====================
 
 class AutoTaskGUI(ctk.CTk):
     """主窗口"""
+    PREVIEW_DELAY_MS = 300  # 停止修改这么久之后才重新生成预览
+
     def __init__(self):
         super().__init__()
 
@@ -865,6 +560,11 @@ class AutoTaskGUI(ctk.CTk):
         self.config = TaskConfig()
         self.generator = CodeGenerator()
         self.current_file = None
+        self._preview_job = None        # 等待中的预览生成（after 任务）
+        self._preview_thread = None     # 正在生成预览的后台线程
+        self._preview_result = None
+        self._preview_pending = False   # 生成期间又有修改，完成后需要再生成一次
+        self._monitor_window = None
 
         self._create_toolbar()
         self._create_main_layout()
@@ -879,6 +579,7 @@ class AutoTaskGUI(ctk.CTk):
             ("保存", self._save_task),
             ("运行", self._run_task),
             ("生成代码", self._export_code),
+            ("任务库", self._show_library),
             ("定时任务", self._show_scheduler),
         ]
         for text, cmd in buttons:
@@ -918,6 +619,7 @@ class AutoTaskGUI(ctk.CTk):
         self.code_preview = CodePreview(self, height=200)
         self.code_preview.pack(fill="x", padx=5, pady=5)
 
+        self.config.step_manager.set_on_change(self._on_steps_changed)
         self._update_preview()
 
     def _add_step(self, step_type: str):
@@ -929,13 +631,50 @@ class AutoTaskGUI(ctk.CTk):
     def _on_step_select(self, step: Step):
         self.property_editor.show_step(step)
 
+    def _on_steps_changed(self, diff: StepDiff = None):
+        self.step_list.refresh(diff)
+        self._update_preview()
+
     def _update_preview(self):
-        code = self.generator.generate(self.config.step_manager)
-        self.code_preview.set_code(code)
+        """安排重新生成预览：连续修改时只在停下来后生成一次，生成在后台线程中进行"""
+        if self._preview_job is not None:
+            self.after_cancel(self._preview_job)
+        self._preview_job = self.after(self.PREVIEW_DELAY_MS, self._start_preview)
+
+    def _start_preview(self):
+        self._preview_job = None
+        if self._preview_thread is not None:
+            self._preview_pending = True
+            return
+        # 后台线程读取步骤副本，界面线程可以继续修改
+        snapshot = self.config.step_manager.snapshot()
+        settings = dict(self.config.settings)
+        self._preview_thread = threading.Thread(
+            target=self._generate_preview, args=(snapshot, settings), daemon=True
+        )
+        self._preview_thread.start()
+        self.after(20, self._poll_preview)
+
+    def _generate_preview(self, snapshot, settings):
+        # 后台线程中不操作控件，结果由 _poll_preview 在界面线程中显示
+        try:
+            self._preview_result = self.generator.generate(snapshot, settings)
+        except Exception as e:
+            self._preview_result = f"# 生成代码失败: {e}\n"
+
+    def _poll_preview(self):
+        if self._preview_thread.is_alive():
+            self.after(20, self._poll_preview)
+            return
+        self._preview_thread = None
+        self.code_preview.set_code(self._preview_result)
+        if self._preview_pending:
+            self._preview_pending = False
+            self._start_preview()
 
     def _new_task(self):
         self.config = TaskConfig()
-        self.config.step_manager.set_on_change(self.step_list.refresh)
+        self.config.step_manager.set_on_change(self._on_steps_changed)
         self.step_list.step_manager = self.config.step_manager
         self.property_editor.step_manager = self.config.step_manager
         self.step_list.refresh()
@@ -949,13 +688,16 @@ class AutoTaskGUI(ctk.CTk):
             filetypes=[("JSON", "*.json")]
         )
         if path:
-            self.config.load(path)
-            self.config.step_manager.set_on_change(self.step_list.refresh)
-            self.step_list.step_manager = self.config.step_manager
-            self.property_editor.step_manager = self.config.step_manager
-            self.step_list.refresh()
-            self._update_preview()
-            self.current_file = path
+            self._load_task(path)
+
+    def _load_task(self, path):
+        self.config.load(path)
+        self.config.step_manager.set_on_change(self._on_steps_changed)
+        self.step_list.step_manager = self.config.step_manager
+        self.property_editor.step_manager = self.config.step_manager
+        self.step_list.refresh()
+        self._update_preview()
+        self.current_file = path
 
     def _save_task(self):
         path = self.current_file or filedialog.asksaveasfilename(
@@ -966,36 +708,33 @@ class AutoTaskGUI(ctk.CTk):
         if path:
             self.config.save(path)
             self.current_file = path
+            self._update_library(path)
             messagebox.showinfo("保存", "任务已保存")
 
+    def _update_library(self, path):
+        """保存后更新任务库中这一个任务的索引"""
+        from autotask.library import TaskLibrary
+        try:
+            library = TaskLibrary()
+            library.update(path)
+            library.close()
+        except Exception as e:
+            print(f"[任务库] 更新索引失败: {e}")
+
     def _run_task(self):
-        # 生成临时脚本并运行
+        # 保存为临时任务文件，由任务执行器在子进程中运行，运行监视窗口显示进度
         if not self.config.step_manager.steps:
             messagebox.showwarning("提示", "请先添加步骤")
             return
-        
+        if self._monitor_window is not None and self._monitor_window.winfo_exists():
+            self._monitor_window.focus()
+            return
+
         import tempfile
         # 使用系统临时目录避免中文路径问题
-        temp_dir = tempfile.gettempdir()
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        code = self.generator.generate(self.config.step_manager)
-        # 修改代码中的相对路径为绝对路径
-        code = code.replace('from auto_signin import', f'import sys\nsys.path.insert(0, r"{script_dir}")\nfrom auto_signin import')
-        # 将相对图片路径转换为绝对路径
-        code = code.replace('"images/', f'r"{script_dir}/images/')
-        code = code.replace("'images/", f"r'{script_dir}/images/")
-        
-        temp_file = os.path.join(temp_dir, "_auto_task_temp.py")
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(code)
-        
-        # 创建批处理文件
-        bat_file = os.path.join(temp_dir, "_run_task.bat")
-        with open(bat_file, 'w') as f:
-            f.write(f'@echo off\nchcp 65001 >nul\ncd /d "{script_dir}"\npython "{temp_file}"\npause')
-        
-        os.startfile(bat_file)
+        temp_file = os.path.join(tempfile.gettempdir(), "_auto_task_temp.json")
+        self.config.save(temp_file)
+        self._monitor_window = RunMonitorWindow(self, temp_file, self.step_list)
 
     def _export_code(self):
         path = filedialog.asksaveasfilename(
@@ -1003,7 +742,7 @@ class AutoTaskGUI(ctk.CTk):
             filetypes=[("Python", "*.py")]
         )
         if path:
-            code = self.generator.generate(self.config.step_manager)
+            code = self.generator.generate(self.config.step_manager, self.config.settings)
             with open(path, 'w', encoding='utf-8') as f:
                 f.write(code)
             messagebox.showinfo("导出", f"代码已导出到 {path}")
@@ -1012,6 +751,447 @@ class AutoTaskGUI(ctk.CTk):
         """显示定时任务管理窗口"""
         SchedulerWindow(self)
 
+    def _show_library(self):
+        TaskLibraryWindow(self, on_open=self._load_task)
+
+
+class MatchPreviewWindow(ctk.CTkToplevel):
+    """匹配预览窗口：在一帧画面（截图、图片或录制帧）上匹配模板，显示热力图、最佳位置、匹配度和次高峰值
+
+    匹配在后台线程中进行，结果按 (画面, 模板, 模式) 缓存；拖动阈值滑块只重新绘制标记
+    """
+    POLL_MS = 30
+    MODE_NAMES = {'彩色': 'color', '灰度': 'gray'}
+
+    def __init__(self, parent, template_path, confidence_entry=None):
+        super().__init__(parent)
+        self.title(f"匹配预览 - {os.path.basename(template_path)}")
+        self.geometry("560x560")
+        self.transient(parent)
+        self.template_path = template_path
+        self.confidence_entry = confidence_entry
+        self.frame_key = None       # 当前画面的缓存键
+        self.frame = None           # 当前画面（RGB 数组）
+        self.recording = None
+        self.result = None
+        self.cached = False
+        self._captures = 0
+        self._worker = None
+        self._worker_out = None
+        self._pending = False
+        self._image = None
+
+        try:
+            confidence = float(confidence_entry.get()) if confidence_entry else PARAM_DEFAULTS['confidence']
+        except ValueError:
+            confidence = PARAM_DEFAULTS['confidence']
+
+        bar = ctk.CTkFrame(self, fg_color="transparent")
+        bar.pack(fill="x", padx=10, pady=(10, 5))
+        ctk.CTkButton(bar, text="截图", width=70, command=self._capture).pack(side="left", padx=3)
+        ctk.CTkButton(bar, text="载入画面", width=80, command=self._load_frame).pack(side="left", padx=3)
+        self.mode_menu = ctk.CTkOptionMenu(bar, values=list(self.MODE_NAMES), width=80,
+                                           command=lambda _: self._match())
+        self.mode_menu.pack(side="left", padx=3)
+        self.apply_btn = ctk.CTkButton(bar, text="应用阈值", width=80, command=self._apply,
+                                       state="normal" if confidence_entry else "disabled")
+        self.apply_btn.pack(side="right", padx=3)
+
+        # 录制帧选择（载入录制的 meta.json 后显示）
+        self.frame_bar = ctk.CTkFrame(self, fg_color="transparent")
+        self.frame_label = ctk.CTkLabel(self.frame_bar, text="帧", width=70)
+        self.frame_label.pack(side="left")
+        self.frame_slider = ctk.CTkSlider(self.frame_bar, from_=0, to=1, command=self._on_frame_slider)
+        self.frame_slider.pack(side="left", fill="x", expand=True, padx=5)
+
+        conf_bar = ctk.CTkFrame(self, fg_color="transparent")
+        conf_bar.pack(fill="x", padx=10, pady=5)
+        self.conf_label = ctk.CTkLabel(conf_bar, text="", width=110, anchor="w")
+        self.conf_label.pack(side="left")
+        self.conf_slider = ctk.CTkSlider(conf_bar, from_=0.3, to=1.0, number_of_steps=70,
+                                         command=lambda _: self._render())
+        self.conf_slider.set(confidence)
+        self.conf_slider.pack(side="left", fill="x", expand=True, padx=5)
+
+        self.image_label = ctk.CTkLabel(self, text="点击「截图」或「载入画面」", height=280)
+        self.image_label.pack(fill="both", expand=True, padx=10, pady=5)
+        self.info_label = ctk.CTkLabel(self, text="", anchor="w", justify="left")
+        self.info_label.pack(fill="x", padx=10, pady=(0, 10))
+        self._render()
+
+    # ---------- 画面来源 ----------
+
+    def _capture(self):
+        """隐藏窗口后截取全屏"""
+        root = self.master.winfo_toplevel()
+        self.withdraw()
+        root.withdraw()
+        self.after(300, lambda: self._grab_screen(root))
+
+    def _grab_screen(self, root):
+        from autotask.screen import get_screen
+        import numpy as np
+        try:
+            image = get_screen().grab()
+        except Exception as e:
+            image = None
+            self.info_label.configure(text=f"截图失败: {e}")
+        finally:
+            root.deiconify()
+            self.deiconify()
+        if image is not None:
+            self._captures += 1
+            self._set_frame(('screen', id(self), self._captures), np.asarray(image.convert('RGB')))
+
+    def _load_frame(self):
+        path = filedialog.askopenfilename(
+            parent=self, initialdir="recordings" if os.path.isdir("recordings") else "images",
+            filetypes=[("图片或录制", "*.png *.jpg *.jpeg *.bmp meta.json"), ("所有文件", "*.*")]
+        )
+        if not path:
+            return
+        import numpy as np
+        try:
+            if os.path.basename(path) == 'meta.json':
+                from autotask.recording import Recording
+                recording = Recording(os.path.dirname(path))
+                if not len(recording):
+                    raise ValueError("录制中没有画面")
+                self.recording, last = recording, len(recording) - 1
+                self.frame_slider.configure(to=max(last, 1), number_of_steps=max(last, 1))
+                self.frame_slider.set(last)
+                self.frame_bar.pack(fill="x", padx=10, pady=(0, 5), after=self.mode_menu.master)
+                self._show_recording_frame(last)
+                return
+            from PIL import Image
+            with Image.open(path) as img:
+                frame = np.asarray(img.convert('RGB'))
+        except Exception as e:
+            self.info_label.configure(text=f"无法载入: {e}")
+            return
+        self.recording = None
+        self.frame_bar.pack_forget()
+        self._set_frame(('file', os.path.abspath(path), os.path.getmtime(path)), frame)
+
+    def _on_frame_slider(self, value):
+        if self.recording is not None:
+            self._show_recording_frame(int(round(value)))
+
+    def _show_recording_frame(self, index):
+        key = ('recording', os.path.abspath(self.recording.rec_dir), index)
+        if key == self.frame_key:
+            return
+        self.frame_label.configure(text=f"帧 {index + 1}/{len(self.recording)}")
+        self._set_frame(key, self.recording.frame_array(index))
+
+    def _set_frame(self, key, frame):
+        self.frame_key, self.frame = key, frame
+        self._match()
+
+    # ---------- 匹配和绘制 ----------
+
+    def _match(self):
+        """在后台线程中匹配（命中缓存时几乎立即完成）；正在匹配时等它完成后再按最新的画面匹配"""
+        if self.frame is None:
+            return
+        if self._worker is not None:
+            self._pending = True
+            return
+        self._pending = False
+        from autotask.heatmap import analyze_frame
+        args = (self.frame_key, self.frame, self.template_path, self.MODE_NAMES[self.mode_menu.get()])
+
+        def work():
+            try:
+                self._worker_out = analyze_frame(*args)
+            except Exception as e:
+                self._worker_out = e
+
+        self.info_label.configure(text="正在匹配...")
+        self._worker = threading.Thread(target=work, daemon=True)
+        self._worker.start()
+        self.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        if not self.winfo_exists():
+            return
+        if self._worker.is_alive():
+            self.after(self.POLL_MS, self._poll)
+            return
+        self._worker = None
+        out = self._worker_out
+        if isinstance(out, Exception):
+            self.result = None
+            self.info_label.configure(text=f"匹配失败: {out}")
+        else:
+            self.result, self.cached = out
+        self._render()
+        if self._pending:
+            self._match()
+
+    def _render(self):
+        confidence = round(self.conf_slider.get(), 2)
+        self.conf_label.configure(text=f"匹配度阈值 {confidence:.0%}")
+        if self.result is None:
+            return
+        from autotask.heatmap import render_overlay
+        image = render_overlay(self.result, confidence)
+        self._image = ctk.CTkImage(light_image=image, dark_image=image, size=image.size)
+        self.image_label.configure(image=self._image, text="")
+
+        r = self.result
+        verdict = "√ 会匹配" if r.score >= confidence else "× 不会匹配"
+        lines = [f"最高 {r.score:.1%} @ ({r.best[0]}, {r.best[1]})  {verdict}"]
+        if r.peaks:
+            lines.append("其它峰值: " + "  ".join(f"{s:.1%} @ ({x}, {y})" for x, y, s in r.peaks))
+        lines.append("匹配结果来自缓存" if self.cached else f"匹配耗时 {r.elapsed * 1000:.0f} ms")
+        self.info_label.configure(text="\n".join(lines))
+
+    def _apply(self):
+        if self.confidence_entry is not None:
+            self.confidence_entry.delete(0, "end")
+            self.confidence_entry.insert(0, f"{self.conf_slider.get():.2f}")
+
+
+class RunMonitorWindow(ctk.CTkToplevel):
+    """运行监视窗口：在子进程中执行任务，显示当前步骤、每步耗时和输出，可暂停、继续、取消"""
+    POLL_MS = 50
+    MAX_LOG_LINES = 2000
+
+    def __init__(self, parent, task_file, step_list: StepListPanel):
+        super().__init__(parent)
+        from autotask.monitor import RunMonitor
+        self.step_list = step_list
+        self.title("运行监视")
+        self.geometry("640x520")
+        self.minsize(500, 400)
+        self.transient(parent)
+        self.protocol("WM_DELETE_WINDOW", self._close)
+
+        self.total = len(step_list.step_manager.steps)
+        self.current = None     # 当前步骤的 step_start 数据
+        self.details = []       # 当前步骤内的匹配度、识别结果
+        self.paused = False
+        self.cancelling = False
+        self.log_lines = 0
+
+        self.status_label = ctk.CTkLabel(self, text="正在启动...", font=("", 14, "bold"), anchor="w")
+        self.status_label.pack(fill="x", padx=15, pady=(10, 5))
+        self.progress = ctk.CTkProgressBar(self)
+        self.progress.set(0)
+        self.progress.pack(fill="x", padx=15)
+
+        btn_frame = ctk.CTkFrame(self, fg_color="transparent")
+        btn_frame.pack(fill="x", padx=15, pady=8)
+        self.pause_btn = ctk.CTkButton(btn_frame, text="暂停", width=80, command=self._toggle_pause)
+        self.pause_btn.pack(side="left", padx=3)
+        self.cancel_btn = ctk.CTkButton(btn_frame, text="取消", width=80, fg_color="red", command=self._cancel)
+        self.cancel_btn.pack(side="left", padx=3)
+
+        ctk.CTkLabel(self, text="步骤耗时", anchor="w").pack(fill="x", padx=15)
+        self.timing_box = ctk.CTkTextbox(self, height=160, font=("Consolas", 12))
+        self.timing_box.pack(fill="x", padx=15, pady=(0, 5))
+        ctk.CTkLabel(self, text="输出", anchor="w").pack(fill="x", padx=15)
+        self.log_box = ctk.CTkTextbox(self, font=("Consolas", 11))
+        self.log_box.pack(fill="both", expand=True, padx=15, pady=(0, 10))
+
+        self.monitor = RunMonitor(task_file).start()
+        self._poll_job = self.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        for kind, name, data in self.monitor.poll():
+            if kind == 'log':
+                self._append_log(data)
+            elif kind == 'event':
+                self._on_event(name, data)
+            else:
+                self._on_exit(data)
+                return
+        self._poll_job = self.after(self.POLL_MS, self._poll)
+
+    def _append_log(self, line):
+        self.log_box.insert("end", line + "\n")
+        self.log_lines += 1
+        if self.log_lines > self.MAX_LOG_LINES:
+            self.log_box.delete("1.0", "2.0")
+            self.log_lines -= 1
+        self.log_box.see("end")
+
+    def _on_event(self, name, data):
+        if name == 'task_start':
+            self.total = data.get('total') or self.total
+            self.status_label.configure(text=f"运行中: {data.get('name', '')}")
+        elif name == 'step_start':
+            self.current, self.details = data, []
+            step_name = STEP_TYPES.get(data.get('step_type'), {}).get('name', data.get('step_type'))
+            self.status_label.configure(text=f"运行中: 步骤{data['index']}/{self.total} {step_name}")
+            self.progress.set((data['index'] - 1) / max(self.total, 1))
+            self.step_list.set_running(data.get('step_id'))
+        elif name == 'match':
+            score = f" {data['score']:.1%}" if data.get('score') is not None else ''
+            self.details.append(f"{data.get('image', '')}{score}{'' if data.get('found') else ' 未找到'}")
+        elif name == 'ocr':
+            self.details.append(f"OCR: {data.get('text', '')}")
+        elif name == 'step_end':
+            step_name = STEP_TYPES.get(data.get('step_type'), {}).get('name', data.get('step_type'))
+            failed = data.get('error') or data.get('result') is False
+            line = f"{'×' if failed else '√'} 步骤{data['index']:<4} {step_name:<8} {data.get('duration', 0):7.2f}秒"
+            detail = '; '.join(self.details) or data.get('error') or ''
+            self.timing_box.insert("end", f"{line}  {detail}".rstrip() + "\n")
+            self.timing_box.see("end")
+            self.progress.set(data['index'] / max(self.total, 1))
+        elif name == 'task_end':
+            result = "完成" if data.get('ok') else "未完成"
+            self.status_label.configure(text=f"{result}，用时 {data.get('duration', 0):.1f}秒")
+            if data.get('ok'):
+                self.progress.set(1)
+
+    def _on_exit(self, returncode):
+        self._poll_job = None
+        self.step_list.set_running(None)
+        if self.current is None and returncode:
+            self.status_label.configure(text=f"执行器异常退出 (退出码 {returncode})")
+        self.pause_btn.configure(state="disabled")
+        self.cancel_btn.configure(text="关闭", fg_color=("gray70", "gray30"), command=self.destroy)
+
+    def _toggle_pause(self):
+        if self.paused:
+            self.monitor.resume()
+            self.pause_btn.configure(text="暂停")
+        else:
+            self.monitor.pause()
+            self.pause_btn.configure(text="继续")
+            self.status_label.configure(text="已暂停")
+        self.paused = not self.paused
+
+    def _cancel(self):
+        # 第一次请求取消（执行器保存断点后退出），再点一次强制结束
+        if self.cancelling:
+            self.monitor.kill()
+            return
+        self.cancelling = True
+        self.monitor.cancel()
+        self.status_label.configure(text="正在取消...")
+        self.cancel_btn.configure(text="强制结束")
+
+    def _close(self):
+        if self.monitor.running:
+            if not messagebox.askyesno("运行监视", "任务仍在运行，取消并关闭？", parent=self):
+                return
+            self.monitor.cancel()
+        if self._poll_job is not None:
+            self.after_cancel(self._poll_job)
+        self.step_list.set_running(None)
+        self.destroy()
+
+
+class TaskLibraryWindow(ctk.CTkToplevel):
+    """任务库：按名称、引用的图片、推送令牌、变量或步骤类型搜索 tasks 目录中的任务"""
+    FILTERS = {'名称': 'text', '图片': 'image', '令牌': 'token', '变量': 'variable', '步骤类型': 'step_type'}
+
+    def __init__(self, parent, on_open=None):
+        super().__init__(parent)
+        self.title("任务库")
+        self.geometry("640x520")
+        self.transient(parent)
+        self.on_open = on_open
+        self.selected = None
+
+        from autotask.library import TaskLibrary
+        self.library = TaskLibrary()
+        self.library.scan()     # 只重新解析修改过的文件
+
+        bar = ctk.CTkFrame(self, fg_color="transparent")
+        bar.pack(fill="x", padx=10, pady=(10, 5))
+        self.filter_menu = ctk.CTkOptionMenu(bar, values=list(self.FILTERS), width=90,
+                                             command=lambda _: self._refresh())
+        self.filter_menu.pack(side="left")
+        self.search_entry = ctk.CTkEntry(bar, placeholder_text="搜索（图片可填文件名，步骤类型如 ocr_region）")
+        self.search_entry.pack(side="left", fill="x", expand=True, padx=5)
+        self.search_entry.bind("<KeyRelease>", lambda e: self._refresh())
+        ctk.CTkButton(bar, text="刷新", width=60, command=self._rescan).pack(side="left")
+
+        self.list_frame = ctk.CTkScrollableFrame(self, height=220)
+        self.list_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        self.detail = ctk.CTkTextbox(self, height=140)
+        self.detail.pack(fill="x", padx=10, pady=5)
+
+        bottom = ctk.CTkFrame(self, fg_color="transparent")
+        bottom.pack(fill="x", padx=10, pady=(0, 10))
+        self.summary_label = ctk.CTkLabel(bottom, text="", anchor="w")
+        self.summary_label.pack(side="left")
+        self.open_btn = ctk.CTkButton(bottom, text="打开", width=80, command=self._open, state="disabled")
+        self.open_btn.pack(side="right")
+
+        self.protocol("WM_DELETE_WINDOW", self._close)
+        self._refresh()
+
+    def _rescan(self):
+        self.library.scan()
+        self._refresh()
+
+    def _refresh(self):
+        from autotask.library import format_duration
+        query = self.search_entry.get().strip()
+        kind = self.FILTERS[self.filter_menu.get()]
+        infos = self.library.search(**{kind: query}) if query else self.library.search()
+
+        for child in self.list_frame.winfo_children():
+            child.destroy()
+        for info in infos:
+            if info.error:
+                text = f"{info.path}  （无法解析）"
+            else:
+                runs = f"成功 {info.ok_count}/{info.run_count}" if info.run_count else "未运行"
+                text = (f"{info.name}  ·  {info.path}  ·  {info.enabled_count} 步  ·  "
+                        f"约 {format_duration(info.expected_duration)}  ·  {runs}")
+            ctk.CTkButton(self.list_frame, text=text, anchor="w", fg_color="transparent",
+                          hover_color="gray25", command=lambda i=info: self._show(i)).pack(fill="x", pady=1)
+        self.summary_label.configure(
+            text=f"{len(infos)} 个任务，预计共 {format_duration(self.library.total_duration(infos))}")
+        if self.selected is not None and self.selected.path not in {i.path for i in infos}:
+            self._show(None)
+
+    def _show(self, info):
+        from autotask.library import format_duration, mask_token
+        self.selected = info
+        self.open_btn.configure(state="normal" if info is not None and not info.error else "disabled")
+        self.detail.delete("1.0", "end")
+        if info is None:
+            return
+        if info.error:
+            self.detail.insert("end", f"{info.path}\n无法解析: {info.error}")
+            return
+        types = "、".join(f"{STEP_TYPES[t]['name'] if t in STEP_TYPES else t} {n}"
+                         for t, n in sorted(info.step_types.items(), key=lambda x: -x[1]))
+        lines = [f"{info.name}  ({info.path})"]
+        if info.description:
+            lines.append(info.description)
+        lines.append(f"步骤: {info.enabled_count}/{info.step_count} 启用  {types}")
+        lines.append(f"预计耗时: {format_duration(info.expected_duration)}"
+                     f"（固定等待 {format_duration(info.estimate)}）")
+        if info.run_count:
+            last = time.strftime('%Y-%m-%d %H:%M', time.localtime(info.last_run))
+            lines.append(f"运行: {info.run_count} 次，成功 {info.ok_count} 次；最近 {last} "
+                         f"{'成功' if info.last_ok else '失败'}，耗时 {format_duration(info.last_duration)}")
+        if info.images:
+            lines.append("图片: " + "\n      ".join(info.images))
+        if info.tokens:
+            lines.append("推送令牌: " + "、".join(mask_token(t) for t in info.tokens))
+        if info.variables:
+            lines.append("变量: " + "、".join(info.variables))
+        self.detail.insert("end", "\n".join(lines))
+
+    def _open(self):
+        if self.selected is not None and self.on_open:
+            from autotask.paths import PROJECT_DIR
+            path = self.selected.path
+            self.on_open(path if os.path.isabs(path) else os.path.join(PROJECT_DIR, path))
+
+    def _close(self):
+        self.library.close()
+        self.destroy()
+
 
 class SchedulerWindow(ctk.CTkToplevel):
     """定时任务管理窗口"""
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+自动化任务核心包（不依赖 GUI）
+数据模型、代码生成器、任务执行器和推送发送器，供 GUI 和定时任务共用。
+cv2、pyautogui、requests 等重量级依赖只在真正用到时才导入。
+"""
+
+from autotask.models import (
+    STEP_TYPES, PARAM_DEFAULTS, PARAM_LABELS,
+    Step, StepDiff, StepManager, TaskConfig,
+)
+from autotask.codegen import CodeGenerator
+from autotask.runner import TaskRunner, TaskCancelled, StepTimeout, run_task_file
+
+__all__ = [
+    'STEP_TYPES', 'PARAM_DEFAULTS', 'PARAM_LABELS',
+    'Step', 'StepDiff', 'StepManager', 'TaskConfig',
+    'CodeGenerator',
+    'TaskRunner', 'TaskCancelled', 'StepTimeout', 'run_task_file',
+]
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+多账号批量签到
+从账号配置文件读取多个账号，每个账号可以覆盖 auto_signin.CONFIG 中的任意项
+（网址、推送令牌、图片模板、浏览器用户目录等），在同一进程中依次执行：
+模板只解码一次、OCR 模型只加载一次，后面的账号直接复用。
+每个账号使用自己的浏览器用户目录（browser.profile），登录状态互不影响；
+Linux 上可用 -j 在多个各自拥有虚拟显示的工作进程中同时执行。
+
+账号配置（tasks/accounts.json）:
+    {
+      "defaults": {"browser": {"path": "chrome"}},
+      "accounts": [
+        {"name": "主账号", "wx_push": {"token": "..."}, "browser": {"profile": "profiles/main"}},
+        {"name": "小号", "main_url": "https://...", "images": {"spin_button": "images/b/spin.png"}}
+      ]
+    }
+未设置 browser.profile 时默认使用 profiles/<账号名称>。
+
+用法:
+    python -m autotask.accounts
+    python -m autotask.accounts tasks/accounts.json --only 主账号 --resume
+    python -m autotask.accounts tasks/accounts.json -j 3 --display xvfb --log-dir logs
+"""
+
+import contextlib
+import copy
+import json
+import os
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+
+from autotask.paths import PROJECT_DIR, TASKS_DIR
+from autotask.clock import get_clock
+
+# auto_signin 位于项目根目录
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+ACCOUNTS_PATH = os.path.join(TASKS_DIR, "accounts.json")
+PROFILES_DIR = os.path.join(PROJECT_DIR, "profiles")
+
+
+@dataclass
+class AccountResult:
+    """单个账号的签到结果，时间均为秒"""
+    name: str
+    success: bool = False
+    redeem_code: str = ''
+    message: str = ''
+    error: str = ''
+    worker: int = 0
+    display: str = ''
+    started: float = 0.0
+    finished: float = 0.0
+    log_file: str = ''
+
+    @property
+    def run_time(self):
+        return self.finished - self.started
+
+
+def merge_config(base, override):
+    """深度合并：override 中的字典逐项覆盖 base，其它值直接替换"""
+    merged = copy.deepcopy(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def load_profiles(path=ACCOUNTS_PATH):
+    """读取账号配置，返回每个账号覆盖项的列表（已合并 defaults）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    defaults = data.get('defaults', {})
+    profiles = []
+    for i, account in enumerate(data.get('accounts', [])):
+        profile = merge_config(defaults, account)
+        profile.setdefault('name', f"账号{i + 1}")
+        profiles.append(profile)
+    names = [p['name'] for p in profiles]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise ValueError(f"账号名称重复: {', '.join(duplicates)}")
+    return profiles
+
+
+def account_config(profile):
+    """账号的完整配置：auto_signin.CONFIG + 账号覆盖项"""
+    from auto_signin import CONFIG
+    overrides = dict(profile)
+    name = overrides.pop('name')
+    config = merge_config(CONFIG, overrides)
+    config['account'] = name
+    browser = config.setdefault('browser', {})
+    if not browser.get('profile'):
+        browser['profile'] = os.path.join(PROFILES_DIR, name)
+    return config
+
+
+_warm = False
+
+
+def warm_up(configs):
+    """预先解码账号用到的模板并加载 OCR 模型（已加载的不再重复加载）"""
+    global _warm
+    from auto_signin import ImageFinder, get_ocr_reader
+    paths = {p for c in configs for p in c.get('images', {}).values() if p}
+    new = [p for p in sorted(paths) if p not in ImageFinder._template_cache]
+    loaded = sum(1 for p in new if ImageFinder.load_template(p) is not None)
+    if loaded:
+        print(f"[批量] 已预加载 {loaded} 个模板")
+    if not _warm:
+        get_ocr_reader()
+        _warm = True
+
+
+def run_account(profile, resume=False, log_dir=None):
+    """执行一个账号的签到流程（批量模式和工作进程共用）"""
+    from auto_signin import AutoSignIn
+
+    config = account_config(profile)
+    name = config['account']
+    result = AccountResult(name=name, worker=os.getpid(), display=os.environ.get('DISPLAY', ''))
+    log = None
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        result.log_file = os.path.join(log_dir, f"signin-{name}-{int(time.time())}.log")
+        log = open(result.log_file, 'w', encoding='utf-8')
+    try:
+        with contextlib.redirect_stdout(log) if log else contextlib.nullcontext():
+            warm_up([config])
+            auto = AutoSignIn(config, name=f"signin-{name}")
+            result.started = get_clock().time()
+            try:
+                result.success = bool(auto.run(resume=resume))
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+                traceback.print_exc(file=sys.stdout)
+            result.finished = get_clock().time()
+            result.redeem_code = auto.redeem_code or ''
+            result.message = auto.result_message or ''
+    finally:
+        if log:
+            log.close()
+    return result
+
+
+def run_batch(profiles, resume=False, workers=1, display='none', size=None, log_dir=None, on_result=None):
+    """依次（或在多个工作进程中）执行所有账号，返回与 profiles 顺序一致的结果列表"""
+    if workers <= 1:
+        warm_up([account_config(p) for p in profiles])
+        results = []
+        for profile in profiles:
+            result = run_account(profile, resume=resume, log_dir=log_dir)
+            results.append(result)
+            if on_result:
+                on_result(result)
+        return results
+
+    from autotask.parallel import ParallelExecutor, DEFAULT_SCREEN_SIZE
+    executor = ParallelExecutor(workers, display, size or DEFAULT_SCREEN_SIZE, log_dir)
+    return executor.map(run_account, [(p, resume, log_dir) for p in profiles], on_result,
+                        on_error=lambda args, e: AccountResult(name=args[0]['name'],
+                                                               error=f"{type(e).__name__}: {e}"))
+
+
+def print_summary(results, elapsed):
+    """打印每个账号的结果和耗时"""
+    print("\n" + "=" * 70)
+    print(f"{'账号':<16}{'结果':<6}{'兑换码':<24}{'耗时':>10}  {'显示':<6}")
+    print("-" * 70)
+    for r in results:
+        status = '成功' if r.success else '失败'
+        run = f"{r.run_time:.1f}s" if r.started else '-'
+        print(f"{r.name:<16}{status:<6}{(r.redeem_code or '-')[:22]:<24}{run:>10}  {r.display or '-':<6}")
+        if r.message:
+            print(f"    {r.message}")
+        if r.error:
+            print(f"    {r.error}")
+    ok = sum(1 for r in results if r.success)
+    print("-" * 70)
+    print(f"成功 {ok}/{len(results)}，总耗时 {elapsed:.1f}s")
+
+
+def main(argv=None):
+    import argparse
+    from autotask.parallel import DISPLAY_BACKENDS, DisplayError
+    parser = argparse.ArgumentParser(description="多账号批量签到")
+    parser.add_argument('accounts', nargs='?', default=ACCOUNTS_PATH, help="账号配置文件 (.json)")
+    parser.add_argument('--only', action='append', default=[], help="只执行指定名称的账号，可重复")
+    parser.add_argument('--resume', action='store_true', help="每个账号从上次失败的步骤继续")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="同时执行的账号数（大于 1 时需要虚拟显示）")
+    parser.add_argument('--display', choices=DISPLAY_BACKENDS, default='xvfb', help="并行时使用的虚拟显示类型")
+    parser.add_argument('--log-dir', default=None, help="每个账号的输出写入该目录（默认直接输出）")
+    args = parser.parse_args(argv)
+
+    try:
+        profiles = load_profiles(args.accounts)
+    except (OSError, ValueError) as e:
+        print(f"[!] 读取账号配置失败: {e}")
+        return 2
+    if args.only:
+        unknown = set(args.only) - {p['name'] for p in profiles}
+        if unknown:
+            print(f"[!] 未找到账号: {', '.join(sorted(unknown))}")
+            return 2
+        profiles = [p for p in profiles if p['name'] in args.only]
+    if not profiles:
+        print("[!] 没有要执行的账号")
+        return 2
+    if args.workers > 1 and args.display == 'none':
+        print("[!] 多个账号同时操作同一块屏幕会互相干扰，并行执行请使用虚拟显示")
+        return 2
+
+    print(f"[批量] 共 {len(profiles)} 个账号")
+    start = time.time()
+    try:
+        results = run_batch(profiles, resume=args.resume, workers=args.workers,
+                            display=args.display, log_dir=args.log_dir,
+                            on_result=lambda r: print(f"[{'√' if r.success else '!'}] {r.name} "
+                                                      f"({r.run_time:.1f}s)"))
+    except DisplayError as e:
+        print(f"[!] {e}")
+        return 2
+    print_summary(results, time.time() - start)
+    return 0 if all(r.success for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
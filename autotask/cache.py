@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+生成代码缓存
+按「任务 JSON 内容 + 代码生成器和步骤定义源码 + Python 版本」计算哈希，
+把编译好的代码对象（marshal）缓存到 tasks/.cache，
+之后的运行直接加载缓存，任务或模板变化时自动失效。
+"""
+
+import glob
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import types
+
+from autotask.paths import PROJECT_DIR, CACHE_DIR
+
+_generator_fingerprint = None
+
+
+def generator_fingerprint():
+    """代码生成器指纹：生成逻辑、步骤类型、参数默认值或块分析（find_blocks）改动后自动变化"""
+    global _generator_fingerprint
+    if _generator_fingerprint is None:
+        from autotask import codegen, models
+        h = hashlib.sha256()
+        for module in (codegen, models):
+            with open(module.__file__, 'rb') as f:
+                h.update(f.read())
+        _generator_fingerprint = h.hexdigest()
+    return _generator_fingerprint
+
+
+def task_hash(task_file):
+    """任务缓存键"""
+    with open(task_file, 'rb') as f:
+        data = f.read()
+    h = hashlib.sha256()
+    h.update(data)
+    h.update(generator_fingerprint().encode())
+    # marshal 格式与解释器版本相关
+    h.update(importlib.util.MAGIC_NUMBER)
+    return h.hexdigest()[:16]
+
+
+def _cache_prefix(task_file):
+    """同一任务文件的缓存前缀：文件名 + 绝对路径哈希，不同目录下的同名任务互不影响"""
+    stem = os.path.splitext(os.path.basename(task_file))[0]
+    location = os.path.normcase(os.path.abspath(task_file))
+    return f"{stem}-{hashlib.sha256(location.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _cache_path(task_file, digest):
+    return os.path.join(CACHE_DIR, f"{_cache_prefix(task_file)}-{digest}.bin")
+
+
+def compile_task(task_file):
+    """生成并编译任务代码，返回代码对象"""
+    from autotask.models import TaskConfig
+    from autotask.codegen import CodeGenerator
+    config = TaskConfig()
+    config.load(task_file)
+    code = CodeGenerator().generate(config.step_manager, config.settings)
+    return compile(code, os.path.abspath(task_file), 'exec')
+
+
+def load_code(task_file):
+    """获取任务的代码对象：命中缓存直接加载，否则编译并写入缓存"""
+    digest = task_hash(task_file)
+    path = _cache_path(task_file, digest)
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                return marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            pass  # 缓存损坏，重新编译
+
+    code = compile_task(task_file)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # 清理同一任务的旧缓存
+    prefix = glob.escape(_cache_prefix(task_file))
+    for old in glob.glob(os.path.join(CACHE_DIR, f"{prefix}-*.bin")):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        marshal.dump(code, f)
+    os.replace(tmp, path)
+    return code
+
+
+def load_task_module(task_file):
+    """加载任务对应的生成模块（不执行 main）"""
+    code = load_code(task_file)
+    name = "_autotask_" + os.path.splitext(os.path.basename(task_file))[0]
+    module = types.ModuleType(name)
+    module.__file__ = os.path.abspath(task_file)
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    exec(code, module.__dict__)
+    return module
+
+
+def run_cached(task_file):
+    """通过缓存的生成代码执行任务"""
+    load_task_module(task_file).main()
+    return True
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+断点续跑与重试策略
+每执行完一个步骤就把进度（下一步位置、变量、循环计数）写入 tasks/.checkpoints，
+任务中途失败后可以从失败的步骤继续，不必从打开浏览器重新开始，也不会重复使用兑换码。
+
+重试策略可在任务 settings 的 "retry" 中设置默认值，也可在单个步骤参数的 "retry" 中覆盖:
+    {"attempts": 3, "delay": 2, "backoff": 2, "abort": true}
+- attempts: 最多尝试次数（默认 1，即不重试）
+- delay / backoff: 第 n 次重试前等待 delay * backoff^(n-1) 秒
+- abort: 所有尝试都失败（返回 False 或超时）后终止任务并保留断点；默认 false 继续执行后续步骤
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+
+from autotask.paths import TASKS_DIR
+
+CHECKPOINT_DIR = os.path.join(TASKS_DIR, ".checkpoints")
+
+
+class StepFailed(Exception):
+    """步骤重试后仍然失败，且策略要求终止任务"""
+
+    def __init__(self, index, reason):
+        super().__init__(f"步骤{index} 失败: {reason}")
+        self.index = index
+        self.reason = reason
+
+
+class RetryPolicy:
+    """单个步骤的重试策略"""
+
+    def __init__(self, attempts=1, delay=2.0, backoff=1.0, abort=False):
+        self.attempts = max(1, int(attempts))
+        self.delay = float(delay)
+        self.backoff = float(backoff)
+        self.abort = bool(abort)
+
+    @classmethod
+    def from_settings(cls, default=None, override=None):
+        """合并任务默认策略和步骤策略"""
+        options = dict(default or {})
+        options.update(override or {})
+        known = ('attempts', 'delay', 'backoff', 'abort')
+        return cls(**{k: v for k, v in options.items() if k in known})
+
+    def delay_for(self, attempt):
+        """第 attempt 次失败后、下一次尝试前的等待秒数"""
+        return self.delay * (self.backoff ** (attempt - 1))
+
+
+def _safe_name(name):
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', name) or 'task'
+
+
+class Checkpoint:
+    """断点文件；key 不一致（任务内容已修改）时视为没有断点"""
+
+    def __init__(self, path, key=''):
+        self.path = path
+        self.key = key
+
+    @classmethod
+    def for_name(cls, name, key=''):
+        return cls(os.path.join(CHECKPOINT_DIR, f"{_safe_name(name)}.json"), key)
+
+    def load(self):
+        """读取断点，没有或已失效返回 None"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('key') != self.key:
+            return None
+        return state
+
+    def save(self, **state):
+        """原子写入断点，返回是否已写入"""
+        state['key'] = self.key
+        state['updated'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=1, default=str)
+        os.replace(tmp, self.path)
+        return True
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def exists(self):
+        return self.load() is not None
+
+
+class NullCheckpoint(Checkpoint):
+    """不读写文件的断点（模拟运行时使用，不影响真实断点）"""
+
+    def __init__(self):
+        super().__init__(os.devnull)
+
+    def load(self):
+        return None
+
+    def save(self, **state):
+        return False
+
+    def clear(self):
+        pass
+
+
+def task_checkpoint(config, name=None):
+    """任务的断点，name 默认为任务名称（以步骤内容区分，修改步骤后旧断点自动失效）"""
+    data = json.dumps(config.step_manager.to_list(), ensure_ascii=False, sort_keys=True)
+    key = hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+    return Checkpoint.for_name(name or config.name, key)
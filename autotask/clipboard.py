@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+剪贴板变化监视
+在触发复制的操作之前记下剪贴板当前状态（arm），之后轮询等待出现新的、符合格式的内容，
+取到就立即返回，超时返回 None，不再固定等待后只读一次，也不会卡在手动输入上。
+
+Windows 上先比较剪贴板序号（GetClipboardSequenceNumber，不用打开剪贴板），
+序号变化时才读取内容；其它平台和录制/回放时直接读取内容比较。
+
+用法:
+    watcher = ClipboardWatcher(r'^[A-Za-z0-9-]{6,64}$')
+    watcher.arm()
+    ...点击复制按钮...
+    code = watcher.wait(timeout=10)
+"""
+
+import re
+
+from autotask.clock import get_clock
+from autotask.inputs import get_input
+from autotask.trace import span
+
+
+class ClipboardWatcher:
+    """等待剪贴板出现新内容"""
+
+    def __init__(self, pattern=None, sink=None):
+        """pattern: 内容需匹配的正则（去除首尾空白后匹配），None 表示任意非空内容
+        sink: 输入设备，默认 get_input()
+        """
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self._sink = sink
+        self._sequence = None
+        self._text = None
+        self.armed = False
+
+    @property
+    def sink(self):
+        return self._sink or get_input()
+
+    def _read(self):
+        try:
+            return str(self.sink.paste() or '').strip()
+        except Exception as e:
+            print(f"  [!] 读取剪贴板失败: {e}")
+            return ''
+
+    def matches(self, text):
+        if not text:
+            return False
+        return self.pattern is None or bool(self.pattern.search(text))
+
+    def arm(self):
+        """记下当前剪贴板状态，之后只接受与之不同的内容"""
+        self._sequence = self.sink.clipboard_sequence()
+        self._text = self._read()
+        self.armed = True
+
+    def wait(self, timeout=10, interval=0.25):
+        """等待新的符合格式的内容，返回该内容；超时返回 None
+
+        未调用 arm 时（如断点续跑直接从读取开始）剪贴板中已有的符合格式的内容也会被接受
+        """
+        clock = get_clock()
+        end = clock.time() + timeout
+        sequence = self._sequence
+        with span('wait_clipboard', 'input', timeout=timeout) as sp:
+            while True:
+                current = self.sink.clipboard_sequence()
+                # 序号没有变化说明内容没变，不必读取
+                if current is None or current != sequence:
+                    sequence = current
+                    text = self._read()
+                    if self.matches(text) and text != self._text:
+                        sp.set(found=True)
+                        self.reset()
+                        return text
+                if clock.time() + interval > end:
+                    sp.set(found=False)
+                    return None
+                clock.sleep(interval)
+
+    def reset(self):
+        """清除 arm 记下的状态"""
+        self._sequence = None
+        self._text = None
+        self.armed = False
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+时钟
+所有等待和超时判断都通过 get_clock() 进行。默认是真实时钟；
+模拟运行时换成 SimClock，sleep 立即返回并把虚拟时间向前推进，
+几分钟的任务可以在几毫秒内跑完，并得到按步骤估算的耗时。
+"""
+
+import contextlib
+import threading
+import time
+
+# 模拟时各项操作的估计耗时（秒），用于让模拟结果接近真实运行
+DEFAULT_COSTS = {
+    'capture': 0.04,    # 整屏截图
+    'match': 0.01,      # 一次模板匹配
+    'ocr': 0.3,         # 一次 OCR 识别
+}
+
+
+class Clock:
+    """真实时钟"""
+
+    simulated = False
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def charge(self, kind, count=1):
+        """记录一项操作的耗时（真实时钟下操作本身已经花了时间，不需要处理）"""
+
+
+class SimClock(Clock):
+    """虚拟时钟：sleep 只推进虚拟时间，截图/匹配/OCR 按估计耗时计时"""
+
+    simulated = True
+
+    def __init__(self, start=None, costs=None):
+        self._now = time.time() if start is None else float(start)
+        self.start = self._now
+        self.costs = dict(DEFAULT_COSTS)
+        self.costs.update(costs or {})
+        self.slept = 0.0
+        self._lock = threading.Lock()
+
+    def time(self):
+        with self._lock:
+            return self._now
+
+    def advance(self, seconds):
+        with self._lock:
+            self._now += max(0.0, float(seconds))
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.slept += seconds
+            self.advance(seconds)
+
+    def charge(self, kind, count=1):
+        self.advance(self.costs.get(kind, 0.0) * count)
+
+    @property
+    def elapsed(self):
+        """从创建起经过的虚拟时间"""
+        return self.time() - self.start
+
+
+_clock = None
+
+
+def get_clock():
+    """当前时钟（默认真实时钟）"""
+    global _clock
+    if _clock is None:
+        _clock = Clock()
+    return _clock
+
+
+def set_clock(clock):
+    """替换时钟，返回原时钟"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+@contextlib.contextmanager
+def use_clock(clock):
+    """在 with 代码块内临时使用指定时钟"""
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
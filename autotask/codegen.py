@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+"""
+代码生成器
+把任务步骤生成为独立可运行的 Python 脚本
+"""
+
+import threading
+from typing import Dict, Optional
+
+from autotask.models import STEP_TYPES, PARAM_DEFAULTS, StepManager, find_blocks
+
+class CodeGenerator:
+    """代码生成器"""
+
+    IMPORTS = '''# -*- coding: utf-8 -*-
+"""自动生成的任务脚本"""
+import time
+import webbrowser
+import pyautogui
+import pyperclip
+from auto_signin import ImageFinder, HumanMouse, WxPush, get_ocr_reader
+from PIL import ImageGrab
+import numpy as np
+'''
+
+    TEMPLATES = {
+        'click_image': '''
+def step_{idx}_click_image():
+    """点击图片: {image_path}"""
+    finder = ImageFinder()
+    mouse = HumanMouse()
+    pos = finder.wait_for_image("{image_path}", timeout={timeout}, confidence={confidence})
+    if pos:
+        mouse.click(pos[0], pos[1])
+        return True
+    return False
+''',
+        'wait_image': '''
+def step_{idx}_wait_image():
+    """等待图片: {image_path}"""
+    finder = ImageFinder()
+    pos = finder.wait_for_image("{image_path}", timeout={timeout}, confidence={confidence})
+    return pos is not None
+''',
+        'input_text': '''
+def step_{idx}_input_text():
+    """输入文本"""
+    {clear_code}
+    text = "{text}"
+    # 使用剪贴板方式输入，支持中文
+    pyperclip.copy(text)
+    pyautogui.hotkey("ctrl", "v")
+    time.sleep(0.2)
+''',
+        'wait_time': '''
+def step_{idx}_wait_time():
+    """等待 {seconds} 秒"""
+    time.sleep({seconds})
+''',
+        'open_url': '''
+def step_{idx}_open_url():
+    """打开URL: {url}"""
+    webbrowser.open("{url}")
+    time.sleep(3)
+''',
+        'long_press': '''
+def step_{idx}_long_press():
+    """长按 {duration} 秒"""
+    import pyautogui
+    x, y = {x}, {y}
+    if x == 0 and y == 0:
+        x, y = pyautogui.position()
+    pyautogui.mouseDown(x, y)
+    time.sleep({duration})
+    pyautogui.mouseUp()
+''',
+        'paste': '''
+def step_{idx}_paste():
+    """粘贴剪贴板内容"""
+    pyautogui.hotkey("ctrl", "v")
+    time.sleep(0.3)
+''',
+        'open_app': '''
+def step_{idx}_open_app():
+    """打开程序: {app_path}"""
+    import subprocess
+    import os
+    app_path = r"{app_path}"
+    if os.path.exists(app_path):
+        subprocess.Popen(app_path, shell=True)
+        print(f"  [√] 已启动: {{app_path}}")
+        time.sleep(2)
+    else:
+        print(f"  [!] 程序不存在: {{app_path}}")
+''',
+        'clipboard_set': '''
+def step_{idx}_clipboard_set():
+    """设置剪贴板内容"""
+    pyperclip.copy("{content}")
+''',
+        'ocr_region': '''
+def step_{idx}_ocr_region():
+    """OCR识别区域 ({x1},{y1}) - ({x2},{y2}) - 使用Umi-OCR (重试{retry_count}次)"""
+    global {var_name}
+    import os
+    import base64
+    import io
+    import requests
+
+    retry_count = {retry_count}
+    retry_interval = {retry_interval}
+
+    for attempt in range(retry_count):
+        screenshot = ImageGrab.grab(bbox=({x1}, {y1}, {x2}, {y2}))
+        # 保存截图用于调试
+        debug_path = "images/_ocr_debug_{idx}.png"
+        os.makedirs("images", exist_ok=True)
+        screenshot.save(debug_path)
+        print(f"  [OCR] 第 {{attempt + 1}}/{{retry_count}} 次尝试, 截图区域: ({x1},{y1}) - ({x2},{y2})")
+
+        # 转换为base64
+        buffer = io.BytesIO()
+        screenshot.save(buffer, format='PNG')
+        img_base64 = base64.b64encode(buffer.getvalue()).decode()
+
+        # 调用Umi-OCR HTTP API
+        try:
+            resp = requests.post(
+                "http://127.0.0.1:1224/api/ocr",
+                json={{"base64": img_base64, "options": {{"data.format": "text"}}}},
+                timeout=30
+            )
+            data = resp.json()
+            if data.get("code") == 100:
+                result_text = data.get("data", "").strip()
+                if result_text:  # 识别成功且有内容
+                    {var_name} = result_text
+                    print(f"  [OCR] 识别成功: {{{var_name}}}")
+                    return {var_name}
+                else:
+                    print(f"  [OCR] 识别结果为空，等待 {{retry_interval}} 秒后重试...")
+            else:
+                print(f"  [OCR] 识别失败: {{data.get('msg', '未知错误')}}，等待 {{retry_interval}} 秒后重试...")
+        except Exception as e:
+            print(f"  [OCR] 请求失败: {{e}}")
+            print("  [OCR] 请确保Umi-OCR已启动并开启HTTP服务(端口1224)")
+
+        if attempt < retry_count - 1:
+            time.sleep(retry_interval)
+
+    # 所有重试都失败
+    {var_name} = ""
+    print(f"  [OCR] 重试 {{retry_count}} 次后仍然失败!")
+    return {var_name}
+''',
+        'press_key': '''
+def step_{idx}_press_key():
+    """按键: {key}"""
+    {key_code}
+''',
+        'wx_push': '''
+def step_{idx}_wx_push():
+    """微信推送"""
+    config = {{'enabled': True, 'url': 'https://xiaoxi.qxbl.de5.net/wxsend', 'token': '{token}'}}
+    # 支持变量引用，如 {{result}} 会被替换为变量值
+    title = "{title}"
+    content = "{content}"
+    # 尝试替换变量
+    for var_name in ['result', 'redeem_code', 'ocr_result']:
+        if var_name in globals():
+            content = content.replace('{{' + var_name + '}}', str(globals()[var_name]))
+            title = title.replace('{{' + var_name + '}}', str(globals()[var_name]))
+    WxPush.send_async(title, content, config)
+''',
+        'mouse_drag': '''
+def step_{idx}_mouse_drag():
+    """鼠标拖动: ({start_x},{start_y}) -> ({end_x},{end_y})"""
+    import pyautogui
+    pyautogui.moveTo({start_x}, {start_y})
+    time.sleep(0.1)
+    pyautogui.drag({end_x} - {start_x}, {end_y} - {start_y}, duration={duration})
+''',
+        'loop_start': '''
+def step_{idx}_loop_start():
+    """循环开始: {loop_count} 次"""
+    pass  # 循环逻辑在main中处理
+''',
+        'loop_end': '''
+def step_{idx}_loop_end():
+    """循环结束"""
+    pass  # 循环逻辑在main中处理
+''',
+        'if_image': '''
+def step_{idx}_if_image():
+    """如果图片存在: {image_path}（单帧探测 {probe_timeout} 秒）"""
+    _, pos = ImageFinder.probe(["{image_path}"], confidence={confidence}, timeout={probe_timeout})
+    print(f"  {{'存在' if pos else '不存在'}}: {image_path}")
+    if pos and {click_match}:
+        HumanMouse().click(pos[0], pos[1])
+    return pos is not None
+''',
+        'first_match': '''
+def step_{idx}_first_match():
+    """多图匹配：同一帧截图中按顺序匹配各分支图片，返回匹配的分支序号"""
+    paths = {case_paths}
+    matched, pos = ImageFinder.probe(paths, confidence={case_confidences}, timeout={probe_timeout})
+    print(f"  匹配结果: {{'无' if matched is None else paths[matched]}}")
+    if matched is not None and {case_clicks}[matched]:
+        HumanMouse().click(pos[0], pos[1])
+    return matched
+''',
+        'close_app': '''
+def step_{idx}_close_app():
+    """关闭程序: {process_name}"""
+    import subprocess
+    process_name = "{process_name}"
+    try:
+        subprocess.run(f'taskkill /F /IM {{process_name}}', shell=True, capture_output=True)
+        print(f"  [√] 已关闭: {{process_name}}")
+    except Exception as e:
+        print(f"  [!] 关闭失败: {{e}}")
+''',
+        'close_browser': '''
+def step_{idx}_close_browser():
+    """关闭浏览器: {browser_type}"""
+    import subprocess
+    browser_type = "{browser_type}"
+    browsers = {{
+        'chrome': ['chrome.exe', 'chromedriver.exe'],
+        'edge': ['msedge.exe', 'msedgedriver.exe'],
+        'firefox': ['firefox.exe', 'geckodriver.exe'],
+        'all': ['chrome.exe', 'msedge.exe', 'firefox.exe', 'chromedriver.exe', 'msedgedriver.exe', 'geckodriver.exe']
+    }}
+    targets = browsers.get(browser_type, browsers['all'])
+    for proc in targets:
+        try:
+            subprocess.run(f'taskkill /F /IM {{proc}}', shell=True, capture_output=True)
+        except:
+            pass
+    print(f"  [√] 已关闭浏览器: {{browser_type}}")
+''',
+    }
+
+    MAIN_TEMPLATE = '''
+
+def main():
+    """执行所有步骤"""
+    print("=" * 50)
+    print("开始执行自动化任务")
+    print("=" * 50)
+{step_calls}
+    print("=" * 50)
+    print("任务执行完成")
+    print("=" * 50)
+
+if __name__ == "__main__":
+    main()
+'''
+
+    # 摘要模式：推送先缓冲，结束时合并为一条发送；出错时立即推送错误
+    DIGEST_MAIN_TEMPLATE = '''
+
+def main():
+    """执行所有步骤（推送摘要模式）"""
+    WxPush.begin_digest({digest_title!r}, max_items={max_items!r}, max_wait={max_wait!r})
+    print("=" * 50)
+    print("开始执行自动化任务")
+    print("=" * 50)
+    try:
+{step_calls}
+    except Exception as e:
+        error_config = {error_config}
+        if error_config:
+            WxPush.send_async("任务失败", f"错误: {{e}}", error_config, urgent=True)
+        raise
+    finally:
+        WxPush.end_digest()
+    print("=" * 50)
+    print("任务执行完成")
+    print("=" * 50)
+
+if __name__ == "__main__":
+    main()
+'''
+
+    def __init__(self):
+        self._snippets = {}     # 步骤 id -> (参数指纹, 步骤函数代码)
+        self._lock = threading.Lock()
+
+    def _snippet(self, step, template: str, params: Dict) -> str:
+        """生成步骤函数代码，步骤类型和参数（含序号）都没变时直接使用上次的结果"""
+        key = (step.step_type, repr(sorted(params.items())))
+        cached = self._snippets.get(step.id)
+        if cached and cached[0] == key:
+            return cached[1]
+        snippet = template.format(**params)
+        self._snippets[step.id] = (key, snippet)
+        return snippet
+
+    def generate(self, step_manager: StepManager, settings: Optional[Dict] = None) -> str:
+        """生成脚本；可在后台线程中调用（同一实例的调用互斥）"""
+        with self._lock:
+            return self._generate(step_manager, settings)
+
+    def _generate(self, step_manager: StepManager, settings: Optional[Dict] = None) -> str:
+        settings = settings or {}
+        digest = bool(settings.get('push_digest'))
+        snippets = []
+        step_calls = []
+        indent_level = 2 if digest else 1  # 基础缩进级别（摘要模式多一层 try）
+        base_level = indent_level
+        loop_stack = []  # 循环栈，存储循环次数
+        blocks = find_blocks(step_manager.steps)
+        block_stack = []  # 条件/匹配/循环块栈: [步骤类型, 是否已打开分支(增加了缩进)]
+        skipped = set()   # 多图匹配和第一个匹配分支之间的步骤，与执行器一致不执行
+
+        for idx, step in enumerate(step_manager.steps, 1):
+            if not step.enabled or idx - 1 in skipped:
+                continue
+
+            template = self.TEMPLATES.get(step.step_type, '')
+            params = step.params.copy()
+            params['idx'] = idx
+
+            # 补充缺失的默认参数（兼容旧配置文件）
+            step_info = STEP_TYPES.get(step.step_type, {})
+            for param_name in step_info.get('params', []):
+                if param_name not in params:
+                    params[param_name] = PARAM_DEFAULTS.get(param_name, '')
+
+            # 特殊处理
+            if step.step_type == 'first_match':
+                block = blocks.get(idx - 1, {'cases': []})
+                cases = [step_manager.steps[c].params for c in block['cases']]
+                params['case_paths'] = repr([c.get('image_path', '') for c in cases])
+                params['case_confidences'] = repr([float(c.get('confidence', PARAM_DEFAULTS['confidence'])) for c in cases])
+                params['case_clicks'] = repr([bool(c.get('click_match', False)) for c in cases])
+            elif step.step_type == 'input_text':
+                params['clear_code'] = 'pyautogui.hotkey("ctrl", "a")\n    ' if params.get('clear_first') else ''
+            elif step.step_type == 'press_key':
+                mods = params.get('modifiers', '').strip()
+                key = params.get('key', 'enter')
+                if mods:
+                    # 支持逗号分隔的修饰键
+                    mod_list = [m.strip() for m in mods.replace('+', ',').split(',') if m.strip()]
+                    key_list = [k.strip() for k in key.split(',') if k.strip()]
+                    all_keys = mod_list + key_list
+                    keys_str = '", "'.join(all_keys)
+                    params['key_code'] = f'pyautogui.hotkey("{keys_str}")'
+                else:
+                    params['key_code'] = f'pyautogui.press("{key}")'
+
+            snippets.append(self._snippet(step, template, params))
+
+            # 处理循环逻辑
+            base_indent = '    ' * indent_level
+            if step.step_type == 'loop_start':
+                loop_count = params.get('loop_count', 3)
+                loop_stack.append(loop_count)
+                step_calls.append(f'{base_indent}print("步骤{idx}: 循环开始 ({loop_count}次)")')
+                step_calls.append(f'{base_indent}for _loop_i_{len(loop_stack)} in range({loop_count}):')
+                step_calls.append(f'{base_indent}    print(f"  第 {{_loop_i_{len(loop_stack)} + 1}}/{loop_count} 次循环")')
+                indent_level += 1
+                block_stack.append(['loop', True])
+            elif step.step_type == 'loop_end':
+                if loop_stack:
+                    loop_stack.pop()
+                    # 循环内未闭合的条件/匹配块到循环结束为止
+                    while block_stack:
+                        frame = block_stack.pop()
+                        if frame[1]:
+                            indent_level = max(base_level, indent_level - 1)
+                        if frame[0] == 'loop':
+                            break
+                    base_indent = '    ' * indent_level
+                step_calls.append(f'{base_indent}print("步骤{idx}: 循环结束")')
+            elif step.step_type in ('if_image', 'first_match'):
+                name = STEP_TYPES[step.step_type]['name']
+                step_calls.append(f'{base_indent}print("步骤{idx}: {name}")')
+                if step.step_type == 'if_image':
+                    step_calls.append(f'{base_indent}if step_{idx}_if_image():')
+                    step_calls.append(f'{base_indent}    pass')
+                    indent_level += 1
+                    block_stack.append(['if_image', True, idx - 1])
+                else:
+                    block = blocks.get(idx - 1, {'skipped': []})
+                    if block['skipped']:
+                        skipped.update(block['skipped'])
+                        numbers = '、'.join(str(j + 1) for j in block['skipped'])
+                        step_calls.append(f'{base_indent}print("  [!] 步骤{numbers} 位于多图匹配和第一个匹配分支之间，不会执行")')
+                    step_calls.append(f'{base_indent}_match_{idx} = step_{idx}_first_match()')
+                    block_stack.append(['first_match', False, idx])
+            elif step.step_type == 'else':
+                # 只有第一个否则步骤生效（与执行器一致），之后的忽略
+                if block_stack and block_stack[-1][0] == 'if_image' and blocks[block_stack[-1][2]]['else'] == idx - 1:
+                    base_indent = '    ' * (indent_level - 1)
+                    step_calls.append(f'{base_indent}else:')
+                    step_calls.append(f'{base_indent}    pass')
+            elif step.step_type == 'case':
+                if block_stack and block_stack[-1][0] == 'first_match':
+                    frame = block_stack[-1]
+                    match_idx = frame[2]
+                    case_no = blocks.get(idx - 1, {'cases': []})['cases'].index(idx - 1)
+                    if params.get('image_path'):
+                        cond = f'_match_{match_idx} == {case_no}'
+                    else:
+                        cond = f'_match_{match_idx} is None'  # 图片为空的分支：都未匹配时执行
+                    if frame[1]:
+                        base_indent = '    ' * (indent_level - 1)
+                        step_calls.append(f'{base_indent}elif {cond}:')
+                    else:
+                        step_calls.append(f'{base_indent}if {cond}:')
+                        indent_level += 1
+                        frame[1] = True
+                    step_calls.append(f'{base_indent}    pass')
+            elif step.step_type in ('end_if', 'end_match'):
+                opener = 'if_image' if step.step_type == 'end_if' else 'first_match'
+                if block_stack and block_stack[-1][0] == opener:
+                    if block_stack.pop()[1]:
+                        indent_level = max(base_level, indent_level - 1)
+            else:
+                step_calls.append(f'{base_indent}print("步骤{idx}: {STEP_TYPES[step.step_type]["name"]}")')
+                step_calls.append(f'{base_indent}step_{idx}_{step.step_type}()')
+
+        # 清除已删除步骤的缓存
+        alive = {step.id for step in step_manager.steps}
+        self._snippets = {k: v for k, v in self._snippets.items() if k in alive}
+
+        code = self.IMPORTS + ''.join(snippets)
+        if digest:
+            # 错误通知使用第一个推送步骤的令牌
+            error_config = None
+            for step in step_manager.steps:
+                if step.enabled and step.step_type == 'wx_push':
+                    error_config = {'enabled': True, 'url': 'https://xiaoxi.qxbl.de5.net/wxsend',
+                                    'token': step.params.get('token', '')}
+                    break
+            code += self.DIGEST_MAIN_TEMPLATE.format(
+                step_calls='\n'.join(step_calls) or '        pass',
+                digest_title=settings.get('digest_title', '任务汇总'),
+                max_items=settings.get('digest_max_items', 10),
+                max_wait=settings.get('digest_max_wait', 600),
+                error_config=repr(error_config),
+            )
+        else:
+            code += self.MAIN_TEMPLATE.format(step_calls='\n'.join(step_calls))
+        return code
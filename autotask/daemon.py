@@ -0,0 +1,569 @@
+# -*- coding: utf-8 -*-
+"""
+定时任务守护进程
+常驻一个 Python 进程按 cron 表达式或固定间隔执行任务，
+已加载的图片模板、OCR 模型和 HTTP 连接在多次执行之间复用，不必每次冷启动。
+跨平台（不依赖 schtasks），任务列表和运行记录保存在 tasks/daemon_state.json，重启后继续。
+
+用法:
+    python -m autotask.daemon start                                   # 前台运行守护进程
+    python -m autotask.daemon add tasks/Telegram.json --at 08:00      # 每天 08:00
+    python -m autotask.daemon add tasks/bohe.json --cron "*/30 9-18 * * 1-5"
+    python -m autotask.daemon add signin --every 6h --name 签到
+    python -m autotask.daemon list
+    python -m autotask.daemon add tasks/push.json --every 1h --priority 5 --max-delay 10m
+    python -m autotask.daemon run 签到                                # 立即执行一次
+    python -m autotask.daemon queue                                   # 查看执行队列
+    python -m autotask.daemon remove 签到
+    python -m autotask.daemon stop
+
+到期任务进入执行队列（autotask/jobs.py）：按优先级执行，需要同一资源（屏幕、剪贴板、某个程序）
+的任务依次执行，互不冲突。
+控制命令通过本机 TCP 端口（默认 127.0.0.1:47823）以 JSON 行协议发送给守护进程。
+"""
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from autotask.paths import TASKS_DIR
+from autotask.jobs import JobQueue
+
+STATE_PATH = os.path.join(TASKS_DIR, "daemon_state.json")
+HOST = '127.0.0.1'
+PORT = 47823
+MISFIRE_GRACE = 3600     # 守护进程停止期间错过的执行，在该时间（秒）内补执行一次，超过则跳过
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+WORKERS = 2              # 执行线程数；需要屏幕的任务由资源锁保证依次执行
+
+
+class TriggerError(ValueError):
+    """触发条件格式错误"""
+
+
+# ==================== 触发条件 ====================
+
+class CronTrigger:
+    """cron 表达式：分 时 日 月 周（周日为 0 或 7），支持 * , - /"""
+
+    FIELDS = (('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7))
+
+    def __init__(self, expr):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise TriggerError(f"cron 表达式需要 5 个字段: {expr}")
+        self.expr = expr
+        values = [self._parse_field(p, lo, hi) for p, (_, lo, hi) in zip(parts, self.FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {d % 7 for d in weekdays}
+        # 与标准 cron 相同：日和周都有限制时，满足其一即可
+        self.day_any = parts[2] == '*'
+        self.weekday_any = parts[4] == '*'
+
+    @staticmethod
+    def _parse_field(text, lo, hi):
+        result = set()
+        for item in text.split(','):
+            step = 1
+            if '/' in item:
+                item, step_text = item.split('/', 1)
+                if not step_text.isdigit() or int(step_text) == 0:
+                    raise TriggerError(f"无效步长: {text}")
+                step = int(step_text)
+            if item == '*':
+                start, end = lo, hi
+            elif '-' in item:
+                a, b = item.split('-', 1)
+                if not (a.isdigit() and b.isdigit()):
+                    raise TriggerError(f"无效范围: {text}")
+                start, end = int(a), int(b)
+            elif item.isdigit():
+                start = int(item)
+                end = hi if step > 1 else start
+            else:
+                raise TriggerError(f"无效字段: {text}")
+            if start < lo or end > hi or start > end:
+                raise TriggerError(f"超出范围 {lo}-{hi}: {text}")
+            result.update(range(start, end + 1, step))
+        return result
+
+    def _day_matches(self, dt):
+        in_days = dt.day in self.days
+        in_weekdays = (dt.isoweekday() % 7) in self.weekdays
+        if self.day_any and self.weekday_any:
+            return True
+        if self.day_any:
+            return in_weekdays
+        if self.weekday_any:
+            return in_days
+        return in_days or in_weekdays
+
+    def next_after(self, dt):
+        """dt 之后的下一次触发时间（按分钟对齐）"""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            if t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+                continue
+            return t
+        raise TriggerError(f"cron 表达式永远不会触发: {self.expr}")
+
+    def describe(self):
+        return f"cron {self.expr}"
+
+
+class IntervalTrigger:
+    """固定间隔"""
+
+    UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+    def __init__(self, seconds):
+        if isinstance(seconds, str):
+            seconds = self.parse(seconds)
+        if seconds <= 0:
+            raise TriggerError("间隔必须大于 0")
+        self.seconds = float(seconds)
+
+    @classmethod
+    def parse(cls, text):
+        """'90' / '90s' / '30m' / '6h' / '1d' -> 秒"""
+        text = text.strip().lower()
+        unit = cls.UNITS.get(text[-1:]) if text else None
+        number = text[:-1] if unit else text
+        try:
+            return float(number) * (unit or 1)
+        except ValueError:
+            raise TriggerError(f"无效间隔: {text}")
+
+    def next_after(self, dt):
+        return dt + timedelta(seconds=self.seconds)
+
+    def describe(self):
+        s = self.seconds
+        for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+            if s >= size and s % size == 0:
+                return f"每 {int(s // size)}{unit}"
+        return f"每 {s:g}s"
+
+
+def parse_trigger(spec):
+    """根据任务记录中的触发条件创建触发器
+
+    spec: {"cron": "0 8 * * *"} / {"interval": 3600} / {"time": "08:00"}（每天）
+    """
+    if 'cron' in spec:
+        return CronTrigger(spec['cron'])
+    if 'interval' in spec:
+        return IntervalTrigger(spec['interval'])
+    if 'time' in spec:
+        try:
+            hour, minute = (int(v) for v in str(spec['time']).split(':'))
+        except ValueError:
+            raise TriggerError(f"无效时间: {spec['time']}")
+        return CronTrigger(f"{minute} {hour} * * *")
+    raise TriggerError(f"未知触发条件: {spec}")
+
+
+# ==================== 守护进程 ====================
+
+def _fmt(dt):
+    return dt.strftime(TIME_FORMAT) if dt else None
+
+
+def _parse_time(text):
+    return datetime.strptime(text, TIME_FORMAT) if text else None
+
+
+class SchedulerDaemon:
+    """常驻调度器：到期任务进入队列，由执行线程在同一进程内执行"""
+
+    def __init__(self, state_path=STATE_PATH, host=HOST, port=PORT, run_func=None, workers=WORKERS):
+        self.state_path = state_path
+        self.host = host
+        self.port = port
+        if run_func is None:
+            from autotask.runner import run_target
+            run_func = run_target
+        self.run_func = run_func
+        self.jobs = {}
+        self.queue = JobQueue()
+        self.workers = workers
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._server = None
+        self._load()
+
+    # ---------- 持久化 ----------
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        now = datetime.now()
+        for job in data.get('jobs', []):
+            trigger = parse_trigger(job['trigger'])
+            next_run = _parse_time(job.get('next_run'))
+            if next_run is None or (now - next_run).total_seconds() > MISFIRE_GRACE:
+                next_run = trigger.next_after(now)
+            job['next_run'] = _fmt(next_run)
+            self.jobs[job['name']] = job
+
+    def _save(self):
+        """原子写入状态文件（调用方持有锁）"""
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'jobs': list(self.jobs.values())}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.state_path)
+
+    # ---------- 任务管理 ----------
+
+    def add_job(self, target, trigger, name=None, enabled=True,
+                priority=0, resources=None, max_delay=None):
+        """添加或替换任务，返回任务记录
+
+        priority: 数值大的先执行；resources: 独占资源列表，None 表示按任务内容自动推断；
+        max_delay: 入队后最多等待的秒数，超过仍未开始则本次放弃
+        """
+        if target != 'signin':
+            if not os.path.exists(target):
+                raise FileNotFoundError(f"任务文件不存在: {target}")
+            target = os.path.abspath(target)
+        name = name or os.path.splitext(os.path.basename(target))[0]
+        next_run = parse_trigger(trigger).next_after(datetime.now())
+        job = {
+            'name': name,
+            'target': target,
+            'trigger': trigger,
+            'enabled': enabled,
+            'priority': int(priority),
+            'resources': sorted(resources) if resources is not None else None,
+            'max_delay': max_delay,
+            'next_run': _fmt(next_run),
+            'last_run': None,
+            'last_result': None,
+            'last_duration': None,
+            'last_wait': None,
+            'run_count': 0,
+            'created': _fmt(datetime.now()),
+        }
+        with self._cond:
+            self.jobs[name] = job
+            self._save()
+            self._cond.notify_all()
+        return dict(job)
+
+    def remove_job(self, name):
+        with self._cond:
+            if self.jobs.pop(name, None) is None:
+                raise KeyError(f"没有任务: {name}")
+            self._save()
+            self._cond.notify_all()
+        return True
+
+    def list_jobs(self):
+        snapshot = self.queue.snapshot()
+        queued = {j['name'] for j in snapshot['pending']}
+        running = {j['name'] for j in snapshot['running']}
+        with self._cond:
+            jobs = [dict(job) for job in self.jobs.values()]
+        for job in jobs:
+            job['trigger_text'] = parse_trigger(job['trigger']).describe()
+            job['state'] = ('running' if job['name'] in running else
+                            'queued' if job['name'] in queued else None)
+        return sorted(jobs, key=lambda j: j['next_run'] or '')
+
+    def run_now(self, name):
+        """立即把任务放入队列（不影响原有计划）"""
+        with self._cond:
+            if name not in self.jobs:
+                raise KeyError(f"没有任务: {name}")
+            job = dict(self.jobs[name])
+        return self._enqueue(job)
+
+    def _enqueue(self, job):
+        """放入执行队列，返回是否新入队（同名任务已在排队时不重复入队）"""
+        resources = job.get('resources')
+        queued, added = self.queue.submit(
+            job['name'], job['target'], priority=job.get('priority', 0),
+            resources=resources, max_delay=job.get('max_delay')
+        )
+        if added:
+            print(f"[队列] {job['name']} 入队 (优先级 {queued.priority}，"
+                  f"资源 {', '.join(sorted(queued.resources)) or '无'})")
+        else:
+            print(f"[队列] {job['name']} 已在队列中，跳过本次触发")
+        return added
+
+    # ---------- 调度循环 ----------
+
+    def _next_due(self):
+        """返回 (任务, 距离执行的秒数)，没有任务返回 (None, None)"""
+        enabled = [j for j in self.jobs.values() if j['enabled'] and j['next_run']]
+        if not enabled:
+            return None, None
+        job = min(enabled, key=lambda j: j['next_run'])
+        return job, (_parse_time(job['next_run']) - datetime.now()).total_seconds()
+
+    def _execute(self, queued):
+        name = queued.name
+        print(f"[调度] 开始执行: {name}，排队 {queued.wait_time:.1f}秒")
+        start = time.perf_counter()
+        try:
+            ok = bool(self.run_func(queued.target))
+            error = None
+        except Exception as e:
+            ok, error = False, f"{type(e).__name__}: {e}"
+        duration = time.perf_counter() - start
+        print(f"[{'√' if ok else '!'}] {name} 执行{'成功' if ok else '失败'}，"
+              f"排队 {queued.wait_time:.1f}秒，执行 {duration:.1f}秒"
+              + (f" - {error}" if error else ''))
+        return ok, error
+
+    def _worker(self):
+        """执行线程：从队列取任务执行并记录结果"""
+        while True:
+            queued = self.queue.take()
+            if queued is None:
+                return
+            started = datetime.now()
+            ok, error = self._execute(queued)
+            self.queue.done(queued, ok, error)
+            with self._cond:
+                current = self.jobs.get(queued.name)
+                if current is not None:
+                    current['last_run'] = _fmt(started)
+                    current['last_result'] = 'success' if ok else (error or 'failed')
+                    current['last_duration'] = round(queued.run_time, 2)
+                    current['last_wait'] = round(queued.wait_time, 2)
+                    current['run_count'] = current.get('run_count', 0) + 1
+                    self._save()
+
+    def start_workers(self):
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f'daemon-worker-{i + 1}', daemon=True).start()
+
+    def run_pending(self, block=True):
+        """把到期任务放入队列；block=True 时持续运行直到 stop()"""
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopping:
+                        return
+                    job, delay = self._next_due()
+                    if job is not None and delay <= 0:
+                        break
+                    if not block:
+                        return
+                    self._cond.wait(timeout=None if job is None else min(delay, 60))
+                # 下次计划时间从触发时刻起算，执行耗时不会推迟后续触发
+                job['next_run'] = _fmt(parse_trigger(job['trigger']).next_after(datetime.now()))
+                self._save()
+                job = dict(job)
+            self._enqueue(job)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self.queue.close()
+        if self._server is not None:
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    # ---------- 控制接口 ----------
+
+    def handle_command(self, request):
+        """处理一条控制命令，返回响应字典"""
+        cmd = request.get('cmd')
+        try:
+            if cmd == 'add':
+                result = self.add_job(request['target'], request['trigger'], request.get('name'),
+                                      priority=request.get('priority', 0),
+                                      resources=request.get('resources'),
+                                      max_delay=request.get('max_delay'))
+            elif cmd == 'remove':
+                result = self.remove_job(request['name'])
+            elif cmd == 'list':
+                result = self.list_jobs()
+            elif cmd == 'run':
+                result = self.run_now(request['name'])
+            elif cmd == 'queue':
+                result = self.queue.snapshot()
+            elif cmd == 'status':
+                snapshot = self.queue.snapshot()
+                result = {'pid': os.getpid(), 'jobs': len(self.jobs),
+                          'running': [j['name'] for j in snapshot['running']],
+                          'pending': len(snapshot['pending'])}
+            elif cmd == 'stop':
+                self.stop()
+                result = True
+            else:
+                return {'ok': False, 'error': f"未知命令: {cmd}"}
+        except (KeyError, FileNotFoundError, TriggerError) as e:
+            return {'ok': False, 'error': e.args[0] if e.args else str(e)}
+        return {'ok': True, 'result': result}
+
+    def _start_server(self):
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        response = daemon.handle_command(json.loads(line))
+                    except ValueError:
+                        response = {'ok': False, 'error': '无效请求'}
+                    self.wfile.write((json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8'))
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='daemon-ipc', daemon=True).start()
+
+    def serve_forever(self):
+        """启动控制接口并在当前线程执行调度循环，直到收到 stop 命令或 Ctrl+C"""
+        self._start_server()
+        self.start_workers()
+        print(f"[调度] 守护进程已启动 (pid {os.getpid()})，控制端口 {self.host}:{self.port}，"
+              f"{len(self.jobs)} 个任务，{self.workers} 个执行线程")
+        try:
+            self.run_pending(block=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            self._server.server_close()
+            print("[调度] 守护进程已退出")
+
+
+# ==================== 客户端 ====================
+
+def send_command(cmd, host=HOST, port=PORT, timeout=10, **args):
+    """向守护进程发送命令，返回结果；守护进程报错时抛出 RuntimeError"""
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall((json.dumps(dict(cmd=cmd, **args), ensure_ascii=False) + '\n').encode('utf-8'))
+        data = sock.makefile('rb').readline()
+    response = json.loads(data)
+    if not response.get('ok'):
+        raise RuntimeError(response.get('error'))
+    return response.get('result')
+
+
+def _print_jobs(jobs):
+    if not jobs:
+        print("没有定时任务")
+        return
+    for job in jobs:
+        state = {'running': '执行中', 'queued': '排队中'}.get(job.get('state')) or ('启用' if job['enabled'] else '停用')
+        last = (f"上次 {job['last_run']} {job['last_result']}（排队 {job.get('last_wait') or 0:.1f}秒，"
+                f"执行 {job['last_duration']:.1f}秒）" if job['last_run'] else "尚未执行")
+        print(f"  - {job['name']} [{state}] {job['trigger_text']}，下次 {job['next_run']}，{last}")
+        print(f"      {job['target']}")
+
+
+def _print_queue(snapshot):
+    print(f"占用资源: {', '.join(snapshot['held']) or '无'}")
+    for title, key in (('执行中', 'running'), ('排队中', 'pending'), ('最近完成', 'history')):
+        print(f"{title}:")
+        if not snapshot[key]:
+            print("  （无）")
+        for job in snapshot[key][:20]:
+            print(f"  - {job['name']} [{job['status']}] 优先级 {job['priority']}，"
+                  f"排队 {job['wait_time']:.1f}秒，执行 {job['run_time']:.1f}秒，"
+                  f"资源 {', '.join(job['resources']) or '无'}"
+                  + (f" - {job['error']}" if job.get('error') else ''))
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="定时任务守护进程")
+    parser.add_argument('--port', type=int, default=PORT, help="控制端口")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('start', help="前台运行守护进程")
+    p.add_argument('--state', default=STATE_PATH, help="状态文件")
+    p = sub.add_parser('add', help="添加任务")
+    p.add_argument('target', help="任务文件 (.json) 或 signin")
+    group = p.add_mutually_exclusive_group(required=True)
+    group.add_argument('--at', help="每天固定时间，如 08:00")
+    group.add_argument('--every', help="固定间隔，如 30m、6h")
+    group.add_argument('--cron', help="cron 表达式，如 '0 8 * * 1-5'")
+    p.add_argument('--name', help="任务名称（默认使用文件名）")
+    p.add_argument('--priority', type=int, default=0, help="优先级，数值大的先执行")
+    p.add_argument('--resource', action='append', default=None,
+                   help="独占资源（可多次指定，如 screen、clipboard、app:chrome.exe），默认按任务内容推断")
+    p.add_argument('--max-delay', help="入队后最多等待多久仍未开始则放弃，如 10m")
+    sub.add_parser('list', help="查看任务")
+    sub.add_parser('queue', help="查看执行队列")
+    for command, text in (('remove', "删除任务"), ('run', "立即执行一次")):
+        p = sub.add_parser(command, help=text)
+        p.add_argument('name')
+    sub.add_parser('status', help="守护进程状态")
+    sub.add_parser('stop', help="停止守护进程")
+    args = parser.parse_args(argv)
+
+    if args.command == 'start':
+        SchedulerDaemon(state_path=args.state, port=args.port).serve_forever()
+        return 0
+
+    request = {}
+    if args.command == 'add':
+        if args.at:
+            trigger = {'time': args.at}
+        elif args.every:
+            trigger = {'interval': args.every}
+        else:
+            trigger = {'cron': args.cron}
+        target = args.target if args.target == 'signin' else os.path.abspath(args.target)
+        try:
+            max_delay = IntervalTrigger.parse(args.max_delay) if args.max_delay else None
+        except TriggerError as e:
+            print(f"[!] {e}")
+            return 1
+        request = {'target': target, 'trigger': trigger, 'name': args.name,
+                   'priority': args.priority, 'resources': args.resource, 'max_delay': max_delay}
+    elif args.command in ('remove', 'run'):
+        request = {'name': args.name}
+
+    try:
+        result = send_command(args.command, port=args.port, **request)
+    except OSError:
+        print(f"[!] 无法连接守护进程（端口 {args.port}），请先运行: python -m autotask.daemon start")
+        return 2
+    except (RuntimeError, TriggerError) as e:
+        print(f"[!] {e}")
+        return 1
+
+    if args.command == 'list':
+        _print_jobs(result)
+    elif args.command == 'queue':
+        _print_queue(result)
+    elif args.command == 'run':
+        print("[√] 已加入执行队列" if result else "[!] 该任务已在队列中")
+    elif args.command == 'add':
+        print(f"[√] 已添加: {result['name']}，{parse_trigger(result['trigger']).describe()}，下次 {result['next_run']}")
+    elif args.command == 'status':
+        print(f"守护进程 pid {result['pid']}，{result['jobs']} 个任务，{result['pending']} 个排队，"
+              f"{'正在执行 ' + ', '.join(result['running']) if result['running'] else '空闲'}")
+    else:
+        print("[√] 完成")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
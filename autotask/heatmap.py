@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+模板匹配分析（匹配预览）
+在一帧画面上匹配模板，得到最佳位置、匹配度、次高的几个峰值和缩小的匹配度热力图，
+用于在编辑器中调整 confidence，不必运行任务再从输出中读「最高: 72%」。
+
+- 匹配方式与执行时相同（TM_CCOEFF_NORMED），可选灰度模式
+- 结果按 (画面, 模板, 模式) 缓存，调整阈值只重新绘制标记，不重新匹配
+- 不依赖 GUI，绘制结果为 PIL 图像
+
+用法:
+    result = analyze_frame(('file', 'shot.png'), image, 'images/button.png')
+    preview = render_overlay(result, confidence=0.8)
+"""
+
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from autotask.lazy import lazy_import
+from autotask.templates import parse_ref, template_file
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
+
+MODES = ('color', 'gray')
+PREVIEW_WIDTH = 480     # 预览图和热力图的宽度
+PEAK_COUNT = 4          # 除最佳位置外再找几个峰值
+
+
+@dataclass
+class MatchResult:
+    """一次匹配的结果，坐标均为原始画面中模板中心的位置"""
+    score: float
+    best: Tuple[int, int]
+    peaks: List[Tuple[int, int, float]] = field(default_factory=list)  # 次高的峰值 (x, y, 匹配度)
+    template_size: Tuple[int, int] = (0, 0)
+    frame_size: Tuple[int, int] = (0, 0)
+    heat: object = None         # 缩小的匹配度图（0-1，float32，与 preview 同尺寸）
+    preview: object = None      # 缩小的画面（RGB 数组）
+    overlay: object = None      # 叠加了热力图的缩小画面（RGB 数组），绘制标记时复制使用
+    elapsed: float = 0.0        # 匹配耗时（秒）
+
+    @property
+    def scale(self):
+        return self.preview.shape[1] / self.frame_size[0]
+
+
+class MatchCache:
+    """按 (画面, 模板哈希或路径和修改时间, 模式) 缓存匹配结果，超出容量时丢弃最久未用的"""
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+
+    def get(self, key):
+        result = self._items.get(key)
+        if result is not None:
+            self._items.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self._items[key] = result
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+DEFAULT_CACHE = MatchCache()
+
+
+def find_peaks(scores, template_size, count=PEAK_COUNT + 1):
+    """依次取最大值并抹掉其周围（模板大小）的区域，返回 [(左上角 x, y, 匹配度)]"""
+    work = scores.copy()
+    w, h = template_size
+    peaks = []
+    for _ in range(count):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(work)
+        if max_val <= 0:
+            break
+        peaks.append((x, y, float(max_val)))
+        work[max(0, y - h // 2):y + h // 2 + 1, max(0, x - w // 2):x + w // 2 + 1] = -1
+    return peaks
+
+
+def blend_heat(preview, heat, alpha=0.6):
+    """把匹配度图按 JET 色表叠加到画面上，匹配度越高越不透明"""
+    heat8 = (heat * 255).astype(np.uint8)
+    colored = cv2.cvtColor(cv2.applyColorMap(heat8, cv2.COLORMAP_JET), cv2.COLOR_BGR2RGB)
+    weight = (heat * alpha)[..., None]
+    return (preview * (1 - weight) + colored * weight).astype(np.uint8)
+
+
+def analyze(frame_rgb, template_bgr, mode='color', width=PREVIEW_WIDTH):
+    """匹配模板，返回 MatchResult；模板比画面大时返回 None"""
+    start = time.perf_counter()
+    frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+    if mode == 'gray':
+        frame_m = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+        template_m = cv2.cvtColor(template_bgr, cv2.COLOR_BGR2GRAY)
+    else:
+        frame_m, template_m = frame_bgr, template_bgr
+    fh, fw = frame_m.shape[:2]
+    th, tw = template_m.shape[:2]
+    if th > fh or tw > fw:
+        return None
+
+    scores = cv2.matchTemplate(frame_m, template_m, cv2.TM_CCOEFF_NORMED)
+    peaks = [(x + tw // 2, y + th // 2, s) for x, y, s in find_peaks(scores, (tw, th))]
+    if not peaks:
+        peaks = [(tw // 2, th // 2, 0.0)]
+
+    # 匹配度图按模板中心对齐到整幅画面后缩小
+    height = max(1, round(fh * width / fw))
+    padded = cv2.copyMakeBorder(np.clip(scores, 0, 1), th // 2, th - 1 - th // 2, tw // 2, tw - 1 - tw // 2,
+                                cv2.BORDER_CONSTANT, value=0)
+    heat = cv2.resize(padded, (width, height), interpolation=cv2.INTER_AREA)
+    preview = cv2.resize(frame_rgb, (width, height), interpolation=cv2.INTER_AREA)
+
+    best = peaks[0]
+    return MatchResult(score=best[2], best=(best[0], best[1]), peaks=peaks[1:],
+                       template_size=(tw, th), frame_size=(fw, fh), heat=heat, preview=preview,
+                       overlay=blend_heat(preview, heat), elapsed=time.perf_counter() - start)
+
+
+def analyze_frame(frame_key, frame_rgb, template_path, mode='color', cache=DEFAULT_CACHE):
+    """带缓存的 analyze；frame_key 标识画面（如 ('file', 路径, 修改时间)），返回 (结果, 是否命中缓存)
+
+    模板无法读取时抛出 ValueError
+    """
+    from auto_signin import ImageFinder
+    template = ImageFinder.load_template(template_path)
+    if template is None:
+        raise ValueError(f"图片不存在或无法读取: {template_path}")
+    # 模板库引用按哈希（内容不变），普通路径按文件和修改时间
+    ref = parse_ref(template_path)
+    path = template_file(template_path)
+    template_key = ref[0] if ref else (os.path.abspath(path), os.path.getmtime(path))
+    key = (frame_key, template_key, mode)
+    result = cache.get(key) if cache is not None else None
+    if result is not None:
+        return result, True
+    result = analyze(np.asarray(frame_rgb), template, mode)
+    if result is None:
+        raise ValueError("模板比画面还大")
+    if cache is not None:
+        cache.put(key, result)
+    return result, False
+
+
+def render_overlay(result, confidence):
+    """在叠加了热力图的画面上标出最佳位置和峰值（达到阈值为绿色，否则红色），返回 PIL 图像"""
+    image = result.overlay.copy()
+
+    scale = result.scale
+    tw, th = result.template_size
+    marks = [(result.best[0], result.best[1], result.score)] + list(result.peaks)
+    for i, (x, y, score) in enumerate(reversed(marks)):
+        is_best = i == len(marks) - 1
+        color = (0, 220, 0) if score >= confidence else (230, 40, 40)
+        x1, y1 = int((x - tw / 2) * scale), int((y - th / 2) * scale)
+        x2, y2 = int((x + tw / 2) * scale), int((y + th / 2) * scale)
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2 if is_best else 1)
+        cv2.putText(image, f"{score:.0%}", (x1, max(10, y1 - 3)), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.4, color, 1, cv2.LINE_AA)
+    return Image.fromarray(image)
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+输入设备
+鼠标、键盘、剪贴板以及打开网址/程序等对桌面有副作用的操作都通过 get_input() 执行。
+默认是真实设备（pyautogui / pyperclip）；录制/回放/模拟运行时替换为其它实现。
+"""
+
+import contextlib
+import os
+import subprocess
+import sys
+import webbrowser
+
+from autotask.lazy import lazy_import
+
+pyautogui = lazy_import('pyautogui')
+pyperclip = lazy_import('pyperclip')
+
+
+class InputSink:
+    """输入设备接口"""
+
+    def position(self):
+        raise NotImplementedError
+
+    def move_to(self, x, y):
+        raise NotImplementedError
+
+    def mouse_down(self, x=None, y=None):
+        raise NotImplementedError
+
+    def mouse_up(self):
+        raise NotImplementedError
+
+    def drag(self, dx, dy, duration=0.0):
+        raise NotImplementedError
+
+    def press(self, key):
+        raise NotImplementedError
+
+    def hotkey(self, *keys):
+        raise NotImplementedError
+
+    def copy(self, text):
+        raise NotImplementedError
+
+    def paste(self):
+        raise NotImplementedError
+
+    def clipboard_sequence(self):
+        """剪贴板序号（内容变化时改变），不支持时返回 None，此时只能读取内容比较"""
+        return None
+
+    def open_url(self, url, browser=None, profile=None):
+        """打开网址；指定 profile 时用独立的浏览器用户目录打开（多账号互不影响登录状态）"""
+        raise NotImplementedError
+
+    def open_app(self, path):
+        raise NotImplementedError
+
+    def kill_process(self, name):
+        raise NotImplementedError
+
+
+class LiveInput(InputSink):
+    """真实鼠标键盘"""
+
+    def position(self):
+        x, y = pyautogui.position()
+        return int(x), int(y)
+
+    def move_to(self, x, y):
+        pyautogui.moveTo(x, y, duration=0)
+
+    def mouse_down(self, x=None, y=None):
+        if x is None or y is None:
+            pyautogui.mouseDown()
+        else:
+            pyautogui.mouseDown(x, y)
+
+    def mouse_up(self):
+        pyautogui.mouseUp()
+
+    def drag(self, dx, dy, duration=0.0):
+        pyautogui.drag(dx, dy, duration=duration)
+
+    def press(self, key):
+        pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        pyautogui.hotkey(*keys)
+
+    def copy(self, text):
+        pyperclip.copy(text)
+
+    def paste(self):
+        return pyperclip.paste()
+
+    def clipboard_sequence(self):
+        # Windows 上读取序号不需要打开剪贴板，轮询开销很小
+        if sys.platform != 'win32':
+            return None
+        import ctypes
+        return ctypes.windll.user32.GetClipboardSequenceNumber()
+
+    def open_url(self, url, browser=None, profile=None):
+        if not browser and not profile:
+            webbrowser.open(url)
+            return
+        # Chrome / Edge 系浏览器：--user-data-dir 指定独立的用户目录
+        browser = browser or 'chrome'
+        args = ['--new-window', url]
+        if profile:
+            os.makedirs(profile, exist_ok=True)
+            args.insert(0, f'--user-data-dir={os.path.abspath(profile)}')
+        if sys.platform == 'win32':
+            # start 可以按程序名（如 chrome、msedge）找到已安装的浏览器
+            subprocess.Popen(subprocess.list2cmdline(['start', '', browser] + args), shell=True)
+        else:
+            subprocess.Popen([browser] + args)
+
+    def open_app(self, path):
+        subprocess.Popen(path, shell=True)
+
+    def kill_process(self, name):
+        subprocess.run(f'taskkill /F /IM {name}', shell=True, capture_output=True)
+
+
+class FakeInput(InputSink):
+    """假输入设备：只记录操作，不影响桌面（离线回放、模拟运行用）"""
+
+    def __init__(self, clipboard_values=None):
+        self.events = []
+        self._pos = (0, 0)
+        self._clipboard = ''
+        # 预设的剪贴板读取结果（如录制时应用写入剪贴板的兑换码），按顺序返回
+        self._clipboard_values = list(clipboard_values or [])
+
+    def _log(self, kind, **data):
+        self.events.append(dict(kind=kind, **data))
+
+    def position(self):
+        return self._pos
+
+    def move_to(self, x, y):
+        self._pos = (int(x), int(y))
+
+    def mouse_down(self, x=None, y=None):
+        if x is not None and y is not None:
+            self._pos = (int(x), int(y))
+        self._log('mouse_down', x=self._pos[0], y=self._pos[1])
+
+    def mouse_up(self):
+        self._log('mouse_up', x=self._pos[0], y=self._pos[1])
+
+    def drag(self, dx, dy, duration=0.0):
+        self._log('drag', x=self._pos[0], y=self._pos[1], dx=dx, dy=dy)
+        self._pos = (self._pos[0] + int(dx), self._pos[1] + int(dy))
+
+    def press(self, key):
+        self._log('press', key=key)
+
+    def hotkey(self, *keys):
+        self._log('hotkey', keys=list(keys))
+
+    def copy(self, text):
+        self._clipboard = text
+        self._log('copy', text=text)
+
+    def paste(self):
+        if self._clipboard_values:
+            self._clipboard = self._clipboard_values.pop(0)
+        self._log('paste', text=self._clipboard)
+        return self._clipboard
+
+    def open_url(self, url, browser=None, profile=None):
+        self._log('open_url', url=url)
+
+    def open_app(self, path):
+        self._log('open_app', path=path)
+
+    def kill_process(self, name):
+        self._log('kill_process', name=name)
+
+
+_input = None
+
+
+def get_input():
+    """当前输入设备（默认真实设备）"""
+    global _input
+    if _input is None:
+        _input = LiveInput()
+    return _input
+
+
+def set_input(sink):
+    """替换输入设备，返回原设备"""
+    global _input
+    previous, _input = _input, sink
+    return previous
+
+
+@contextlib.contextmanager
+def use_input(sink):
+    """在 with 代码块内临时使用指定输入设备"""
+    previous = set_input(sink)
+    try:
+        yield sink
+    finally:
+        set_input(previous)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+任务队列
+守护进程中到期的任务先进入队列，再由执行线程按优先级取出。
+- 资源锁：任务声明要独占的资源（屏幕、剪贴板、某个程序），资源被占用时排队等待，不会同时操作鼠标屏幕
+- 优先级：数值大的先执行，相同优先级按入队顺序
+- 截止时间：入队后超过该时间仍未开始的任务直接放弃
+- 去重：同名任务已在队列中时不再重复入队
+- 记录每个任务的排队时间和执行时间
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Optional, Set
+
+# 资源名称
+SCREEN = 'screen'
+CLIPBOARD = 'clipboard'
+
+# 各步骤类型需要独占的资源；app: 开头的资源名由参数决定
+SCREEN_STEPS = {'click_image', 'wait_image', 'long_press', 'mouse_drag', 'input_text',
+                'paste', 'press_key', 'ocr_region', 'open_url', 'open_app',
+                'if_image', 'first_match'}
+CLIPBOARD_STEPS = {'input_text', 'paste', 'clipboard_set'}
+
+HISTORY_SIZE = 50
+
+
+def infer_resources(target):
+    """根据任务内容推断需要独占的资源"""
+    if target == 'signin':
+        return {SCREEN, CLIPBOARD, 'app:browser'}
+    try:
+        with open(target, 'r', encoding='utf-8') as f:
+            steps = json.load(f).get('steps', [])
+    except (OSError, ValueError):
+        # 读不到任务文件时按最保守的情况处理
+        return {SCREEN, CLIPBOARD}
+
+    resources = set()
+    for step in steps:
+        if not step.get('enabled', True):
+            continue
+        step_type = step.get('step_type')
+        params = step.get('params', {})
+        if step_type in SCREEN_STEPS:
+            resources.add(SCREEN)
+        if step_type in CLIPBOARD_STEPS:
+            resources.add(CLIPBOARD)
+        if step_type in ('open_url', 'close_browser'):
+            resources.add('app:browser')
+        elif step_type == 'open_app' and params.get('app_path'):
+            resources.add('app:' + os.path.basename(str(params['app_path'])).lower())
+        elif step_type == 'close_app' and params.get('process_name'):
+            resources.add('app:' + str(params['process_name']).lower())
+    return resources
+
+
+@dataclass
+class QueuedJob:
+    """队列中的一次执行"""
+    name: str
+    target: str
+    priority: int = 0
+    resources: Set[str] = field(default_factory=set)
+    deadline: Optional[float] = None      # 最晚开始时间（time.time），None 表示不限
+    enqueued: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    status: str = 'queued'                # queued / running / success / failed / expired
+    error: Optional[str] = None
+    seq: int = 0
+
+    @property
+    def wait_time(self):
+        """排队时间（秒）"""
+        end = self.started or self.finished or time.time()
+        return end - self.enqueued
+
+    @property
+    def run_time(self):
+        """执行时间（秒）"""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def to_dict(self):
+        data = asdict(self)
+        data['resources'] = sorted(self.resources)
+        data['wait_time'] = round(self.wait_time, 2)
+        data['run_time'] = round(self.run_time, 2)
+        data.pop('seq')
+        return data
+
+
+class JobQueue:
+    """带优先级和资源锁的任务队列（线程安全）"""
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self._cond = threading.Condition()
+        self._pending = []
+        self._running = []
+        self._held = set()
+        self._seq = itertools.count()
+        self._closed = False
+        self.history = deque(maxlen=history_size)
+
+    def submit(self, name, target, priority=0, resources=None, max_delay=None):
+        """入队，返回 (任务, 是否新入队)
+
+        同名任务已在排队时不重复入队，只把优先级提升到两者中较高的那个。
+        max_delay: 入队后最多等待的秒数，超过仍未开始则放弃
+        """
+        now = time.time()
+        with self._cond:
+            for job in self._pending:
+                if job.name == name:
+                    job.priority = max(job.priority, priority)
+                    return job, False
+            if resources is None:
+                resources = infer_resources(target)
+            job = QueuedJob(name=name, target=target, priority=priority, resources=set(resources),
+                            deadline=now + max_delay if max_delay else None,
+                            enqueued=now, seq=next(self._seq))
+            self._pending.append(job)
+            self._cond.notify_all()
+        return job, True
+
+    def _expire(self, now):
+        """移除已过截止时间的排队任务"""
+        for job in [j for j in self._pending if j.deadline is not None and j.deadline < now]:
+            self._pending.remove(job)
+            job.status, job.finished = 'expired', now
+            self.history.append(job)
+            print(f"[队列] {job.name} 排队 {job.wait_time:.0f}秒仍未开始，已超过截止时间，放弃执行")
+
+    def _ready(self):
+        """优先级最高且资源空闲的任务"""
+        for job in sorted(self._pending, key=lambda j: (-j.priority, j.seq)):
+            if not (job.resources & self._held):
+                return job
+        return None
+
+    def take(self, timeout=None):
+        """取出下一个可执行的任务并占用其资源；队列关闭或超时返回 None"""
+        end = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while not self._closed:
+                now = time.time()
+                self._expire(now)
+                job = self._ready()
+                if job is not None:
+                    self._pending.remove(job)
+                    self._running.append(job)
+                    self._held |= job.resources
+                    job.status, job.started = 'running', now
+                    return job
+                # 等待新任务、资源释放或最近的截止时间
+                waits = [j.deadline - now for j in self._pending if j.deadline is not None]
+                if end is not None:
+                    waits.append(end - now)
+                    if end <= now:
+                        return None
+                self._cond.wait(timeout=max(min(waits), 0.01) if waits else None)
+        return None
+
+    def done(self, job, success, error=None):
+        """任务执行结束，释放资源"""
+        with self._cond:
+            job.finished = time.time()
+            job.status = 'success' if success else 'failed'
+            job.error = error
+            if job in self._running:
+                self._running.remove(job)
+            self._held -= job.resources
+            self.history.append(job)
+            self._cond.notify_all()
+
+    def close(self):
+        """关闭队列，唤醒所有等待的执行线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def snapshot(self):
+        """当前排队、执行中和最近完成的任务"""
+        with self._cond:
+            return {
+                'pending': [j.to_dict() for j in sorted(self._pending, key=lambda j: (-j.priority, j.seq))],
+                'running': [j.to_dict() for j in self._running],
+                'history': [j.to_dict() for j in reversed(self.history)],
+                'held': sorted(self._held),
+            }
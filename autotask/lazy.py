@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+延迟导入
+cv2、numpy、pyautogui 等模块导入很慢，只在第一次真正使用时才导入
+"""
+
+import importlib
+
+
+class LazyModule:
+    """模块代理：首次访问属性时才导入真实模块"""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = '已加载' if self.__dict__['_module'] is not None else '未加载'
+        return f"<LazyModule {self.__dict__['_name']} ({state})>"
+
+
+def lazy_import(name):
+    """返回延迟导入的模块代理"""
+    return LazyModule(name)
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+任务库索引
+把 tasks/ 下每个任务 JSON 的摘要（名称、各类型步骤数、引用的图片、推送令牌、变量、预计耗时）
+和运行统计（次数、成功次数、最近一次结果、平均耗时）保存在 SQLite（tasks/library.db）中，
+回答「哪些任务用到了这张图片」「哪些任务用这个令牌推送」「全部任务大概要跑多久」时不必逐个载入任务文件。
+
+- scan() 只比较文件的修改时间和大小，变化的文件才重新解析，已删除的文件从索引中移除
+- 保存任务后调用 update(路径) 只更新这一个文件
+- 执行器（run_task_file）每次运行后调用 record_run() 记录运行统计
+
+用法:
+    library = TaskLibrary()
+    library.scan()
+    for info in library.search(image='images/button.png'):
+        print(info.name, info.path)
+    python -m autotask.library [关键字] [--image 图片] [--token 令牌] [--variable 变量]
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from autotask.paths import PROJECT_DIR, TASKS_DIR
+from autotask.templates import parse_ref
+
+LIBRARY_PATH = os.path.join(TASKS_DIR, "library.db")
+
+# 只统计固定耗时的步骤：等待时间、长按/拖动时长；等待图片等按立即完成计算
+_DURATION_PARAMS = {'wait_time': 'seconds', 'long_press': 'duration', 'mouse_drag': 'duration'}
+_VAR_REF = re.compile(r'\{(\w+)\}')
+
+
+@dataclass
+class TaskInfo:
+    """任务摘要和运行统计"""
+    path: str                   # 项目内为相对路径（如 tasks/example.json），否则为绝对路径
+    name: str = ''
+    description: str = ''
+    step_count: int = 0
+    enabled_count: int = 0
+    step_types: Dict[str, int] = field(default_factory=dict)    # 步骤类型 -> 启用的步骤数
+    images: List[str] = field(default_factory=list)
+    tokens: List[str] = field(default_factory=list)
+    variables: List[str] = field(default_factory=list)          # 产生或引用的变量
+    estimate: float = 0.0       # 按固定等待估算的耗时（秒）
+    error: Optional[str] = None  # 任务文件无法解析时的错误信息
+    run_count: int = 0
+    ok_count: int = 0
+    last_run: Optional[float] = None
+    last_ok: Optional[bool] = None
+    last_duration: Optional[float] = None
+    avg_duration: Optional[float] = None
+
+    @property
+    def expected_duration(self):
+        """预计耗时：运行过取平均耗时，否则取估算值"""
+        return self.avg_duration if self.run_count else self.estimate
+
+
+def normalize_path(path):
+    """项目内的路径转为以 / 分隔的相对路径，其它路径转为绝对路径
+
+    相对路径与执行时一样优先按当前目录查找，找不到时按项目目录解析
+    """
+    if not path:
+        return ''
+    if os.path.isabs(path) or os.path.exists(path):
+        full = os.path.abspath(path)
+    else:
+        full = os.path.abspath(os.path.join(PROJECT_DIR, path))
+    try:
+        rel = os.path.relpath(full, PROJECT_DIR)
+    except ValueError:
+        rel = None      # Windows 上不在同一个盘
+    if rel is None or rel.startswith('..'):
+        return full.replace('\\', '/')
+    return rel.replace('\\', '/')
+
+
+def _number(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def summarize(data):
+    """从任务 JSON 数据提取摘要，返回 TaskInfo（path 为空）"""
+    steps = [s for s in data.get('steps', []) if isinstance(s, dict)]
+    info = TaskInfo(path='', name=str(data.get('name', '')), description=str(data.get('description', '')),
+                    step_count=len(steps))
+    images, tokens, variables = {}, {}, {}
+    repeat = [1]    # 嵌套循环的次数乘积
+    estimate = 0.0
+    for step in steps:
+        if not step.get('enabled', True):
+            continue
+        t = step.get('step_type', '')
+        params = step.get('params') or {}
+        info.enabled_count += 1
+        info.step_types[t] = info.step_types.get(t, 0) + 1
+
+        if params.get('image_path'):
+            value = str(params['image_path'])
+            images[value if parse_ref(value) else normalize_path(value)] = None
+        if t == 'wx_push' and params.get('token'):
+            tokens[str(params['token'])] = None
+        if t == 'ocr_region':
+            variables[str(params.get('var_name') or 'result')] = None
+        elif t == 'first_match':
+            variables['match'] = None
+        for value in params.values():
+            if isinstance(value, str):
+                for name in _VAR_REF.findall(value):
+                    variables[name] = None
+
+        if t == 'loop_start':
+            repeat.append(repeat[-1] * max(1, int(_number(params.get('loop_count'), 1))))
+        elif t == 'loop_end' and len(repeat) > 1:
+            repeat.pop()
+        elif t in _DURATION_PARAMS:
+            estimate += _number(params.get(_DURATION_PARAMS[t])) * repeat[-1]
+
+    info.images, info.tokens, info.variables = list(images), list(tokens), list(variables)
+    info.estimate = estimate
+    return info
+
+
+class TaskLibrary:
+    """任务库索引（SQLite）"""
+
+    def __init__(self, path=LIBRARY_PATH, tasks_dir=TASKS_DIR):
+        self.path = path
+        self.tasks_dir = tasks_dir
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                is_task INTEGER NOT NULL,
+                summary TEXT,
+                error TEXT,
+                indexed REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS refs (
+                path TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS refs_value ON refs (kind, value);
+            CREATE INDEX IF NOT EXISTS refs_path ON refs (path);
+            CREATE TABLE IF NOT EXISTS runs (
+                path TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0,
+                ok_count INTEGER NOT NULL DEFAULT 0,
+                last_run REAL,
+                last_ok INTEGER,
+                last_duration REAL,
+                total_duration REAL NOT NULL DEFAULT 0
+            );
+        ''')
+        self._conn.commit()
+
+    # ---------- 更新索引 ----------
+
+    def scan(self):
+        """同步 tasks 目录：只解析新增或修改过的文件，移除已删除的文件；返回 (更新数, 移除数)"""
+        found = {}
+        try:
+            entries = list(os.scandir(self.tasks_dir))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith('.json'):
+                found[normalize_path(entry.path)] = entry.stat()
+
+        with self._lock:
+            known = dict((row[0], (row[1], row[2])) for row in
+                         self._conn.execute("SELECT path, mtime_ns, size FROM tasks"))
+        prefix = normalize_path(self.tasks_dir).rstrip('/') + '/'
+        removed = [p for p in known if p.startswith(prefix) and p not in found]
+        changed = [p for p, st in found.items() if known.get(p) != (st.st_mtime_ns, st.st_size)]
+        for key in changed:
+            self._index(key, found[key])
+        if removed:
+            self._delete(removed)
+        return len(changed), len(removed)
+
+    def update(self, task_file):
+        """重新索引一个任务文件（保存任务后调用），文件不存在时从索引中移除"""
+        key = normalize_path(task_file)
+        try:
+            st = os.stat(task_file)
+        except OSError:
+            self._delete([key])
+            return None
+        return self._index(key, st)
+
+    def _index(self, key, st):
+        error, info, is_task = None, None, True
+        try:
+            with open(self._file(key), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get('steps'), list):
+                info = summarize(data)
+            else:
+                is_task = False     # 调度配置、账号文件等其它 JSON
+        except (OSError, ValueError) as e:
+            error = str(e)
+
+        refs = []
+        if info is not None:
+            info.path = key
+            refs = [(key, 'image', v) for v in info.images] + \
+                   [(key, 'image_name', os.path.basename(v)) for v in info.images] + \
+                   [(key, 'template', parse_ref(v)[0]) for v in info.images if parse_ref(v)] + \
+                   [(key, 'token', v) for v in info.tokens] + \
+                   [(key, 'variable', v) for v in info.variables] + \
+                   [(key, 'step_type', v) for v in info.step_types]
+        summary = json.dumps(self._summary_fields(info), ensure_ascii=False) if info else None
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tasks (path, mtime_ns, size, is_task, summary, error, indexed) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, st.st_mtime_ns, st.st_size, int(is_task), summary, error, time.time())
+                )
+                self._conn.execute("DELETE FROM refs WHERE path = ?", (key,))
+                self._conn.executemany("INSERT INTO refs (path, kind, value) VALUES (?, ?, ?)", refs)
+        return info
+
+    def _delete(self, keys):
+        with self._lock:
+            with self._conn:
+                for table in ('tasks', 'refs', 'runs'):
+                    self._conn.executemany(f"DELETE FROM {table} WHERE path = ?", [(k,) for k in keys])
+
+    @staticmethod
+    def _file(key):
+        return key if os.path.isabs(key) else os.path.join(PROJECT_DIR, key)
+
+    @staticmethod
+    def _summary_fields(info):
+        return {k: getattr(info, k) for k in ('name', 'description', 'step_count', 'enabled_count',
+                                              'step_types', 'images', 'tokens', 'variables', 'estimate')}
+
+    # ---------- 运行统计 ----------
+
+    def record_run(self, task_file, ok, duration):
+        """记录一次运行结果"""
+        key = normalize_path(task_file)
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO runs (path, count, ok_count, last_run, last_ok, last_duration, total_duration) "
+                    "VALUES (?, 1, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET count = count + 1, ok_count = ok_count + excluded.ok_count, "
+                    "last_run = excluded.last_run, last_ok = excluded.last_ok, "
+                    "last_duration = excluded.last_duration, total_duration = total_duration + excluded.total_duration",
+                    (key, int(bool(ok)), time.time(), int(bool(ok)), duration, duration)
+                )
+
+    # ---------- 查询 ----------
+
+    def search(self, text='', image=None, token=None, variable=None, step_type=None):
+        """按名称/描述关键字和引用（图片、令牌、变量、步骤类型）筛选任务，各条件同时满足"""
+        sql = ("SELECT t.path, t.summary, t.error, r.count, r.ok_count, r.last_run, r.last_ok, "
+               "r.last_duration, r.total_duration FROM tasks t LEFT JOIN runs r ON r.path = t.path "
+               "WHERE t.is_task = 1")
+        args = []
+        if image:
+            # 按模板库引用、路径或文件名匹配（其它电脑上保存的任务中图片路径不同）
+            if parse_ref(image):
+                kind, value = 'template', parse_ref(image)[0]
+            elif '/' not in image and '\\' not in image:
+                kind, value = 'image_name', image
+            else:
+                kind, value = 'image', normalize_path(image)
+            sql += " AND t.path IN (SELECT path FROM refs WHERE kind = ? AND value = ?)"
+            args += [kind, value]
+        for kind, value in (('token', token), ('variable', variable), ('step_type', step_type)):
+            if value:
+                sql += " AND t.path IN (SELECT path FROM refs WHERE kind = ? AND value = ?)"
+                args += [kind, value]
+        sql += " ORDER BY t.path"
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+
+        results = []
+        text = (text or '').lower()
+        for path, summary, error, count, ok_count, last_run, last_ok, last_duration, total in rows:
+            info = TaskInfo(path=path, error=error, **(json.loads(summary) if summary else {}))
+            if text and text not in f"{info.name}\n{info.description}\n{path}".lower():
+                continue
+            if count:
+                info.run_count, info.ok_count = count, ok_count
+                info.last_run, info.last_ok, info.last_duration = last_run, bool(last_ok), last_duration
+                info.avg_duration = total / count
+            results.append(info)
+        return results
+
+    def get(self, task_file):
+        """单个任务的摘要，未索引返回 None"""
+        key = normalize_path(task_file)
+        return next((info for info in self.search() if info.path == key), None)
+
+    def tasks_using_image(self, image):
+        return self.search(image=image)
+
+    def tasks_with_token(self, token):
+        return self.search(token=token)
+
+    def total_duration(self, infos=None):
+        """所有（或给定）任务的预计总耗时（秒）"""
+        return sum(info.expected_duration or 0 for info in (self.search() if infos is None else infos))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def record_run(task_file, ok, duration):
+    """执行器调用：更新任务文件的索引并记录运行结果，失败只打印警告
+
+    只记录项目目录内的任务文件（GUI 运行时保存在系统临时目录的任务不计入）
+    """
+    if os.path.isabs(normalize_path(task_file)):
+        return
+    try:
+        library = TaskLibrary()
+        try:
+            library.update(task_file)
+            library.record_run(task_file, ok, duration)
+        finally:
+            library.close()
+    except (sqlite3.Error, OSError) as e:
+        print(f"  [任务库] 记录运行结果失败: {e}")
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return '-'
+    if seconds < 60:
+        return f"{seconds:.0f}秒"
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}分{seconds:02d}秒" if minutes < 60 else f"{minutes // 60}小时{minutes % 60:02d}分"
+
+
+def mask_token(token):
+    """界面和命令行只显示令牌的开头"""
+    return token[:4] + '****' if len(token) > 4 else '****'
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="任务库索引")
+    parser.add_argument('text', nargs='?', default='', help="名称或描述中的关键字")
+    parser.add_argument('--image', help="引用的图片（路径或文件名）")
+    parser.add_argument('--token', help="推送令牌")
+    parser.add_argument('--variable', help="产生或引用的变量")
+    parser.add_argument('--type', dest='step_type', help="包含的步骤类型（如 ocr_region）")
+    args = parser.parse_args(argv)
+
+    library = TaskLibrary()
+    updated, removed = library.scan()
+    print(f"[任务库] 已更新 {updated} 个，移除 {removed} 个")
+    infos = library.search(args.text, image=args.image, token=args.token,
+                           variable=args.variable, step_type=args.step_type)
+    for info in infos:
+        if info.error:
+            print(f"  {info.path}: 无法解析 ({info.error})")
+            continue
+        runs = f"运行 {info.run_count} 次，成功 {info.ok_count} 次" if info.run_count else "未运行"
+        print(f"  {info.path}  {info.name}  {info.enabled_count} 步  "
+              f"预计 {format_duration(info.expected_duration)}  {runs}")
+        if info.images:
+            print(f"      图片: {', '.join(info.images)}")
+        if info.tokens:
+            print(f"      令牌: {', '.join(mask_token(t) for t in info.tokens)}")
+        if info.variables:
+            print(f"      变量: {', '.join(info.variables)}")
+    print(f"共 {len(infos)} 个任务，预计总耗时 {format_duration(library.total_duration(infos))}")
+    library.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+签到站点的本地替身服务器
+模拟协议签到用到的接口，用于离线测试和基准测试协议签到，不访问真实站点:
+    POST /api/spin          转盘抽奖，返回 {"success": true, "data": {"code": 兑换码}}，每个会话每天一次
+    POST /api/user/topup    兑换 {"key": 兑换码}，返回 {"success": true, "message": ..., "data": 额度}
+- 以 Cookie session 识别登录状态，缺少或无效时返回 401；每次响应刷新 session Cookie（检验 Cookie 持久化）
+- /api/cloudflare 返回 403 的 HTML 验证页，用于检验回退到浏览器流程
+- 可设置每个请求的延迟，模拟网络往返
+
+用法:
+    python -m autotask.mocksite --port 8765 --session test-session
+    然后把 CONFIG['http'] 的 spin_url / redeem_url 指向 http://127.0.0.1:8765/api/...，cookies 设为 session=test-session
+"""
+
+import json
+import secrets
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SESSION = 'test-session'
+QUOTA_PER_CODE = 500000
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # 支持 keep-alive，客户端可以复用连接
+    disable_nagle_algorithm = True  # 响应头和响应体分两次写出，避免 keep-alive 连接上的 40ms 延迟确认等待
+
+    def log_message(self, format, *args):
+        pass
+
+    def _session(self):
+        for part in self.headers.get('Cookie', '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == 'session':
+                return value
+        return None
+
+    def _reply(self, status, body, content_type='application/json', session=None):
+        data = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        if session:
+            self.send_header('Set-Cookie', f'session={session}; Path=/; HttpOnly')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        site = self.server.site
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if site.delay:
+            time.sleep(site.delay)
+        with site._lock:
+            site.requests += 1
+
+        if self.path == '/api/cloudflare':
+            self._reply(403, b'<html><title>Just a moment...</title>cloudflare challenge</html>', 'text/html')
+            return
+        session = site.refresh(self._session())
+        if session is None:
+            self._reply(401, {'success': False, 'message': '未登录'})
+            return
+        try:
+            payload = json.loads(raw or b'{}')
+        except ValueError:
+            self._reply(400, {'success': False, 'message': '请求格式错误'}, session=session)
+            return
+
+        if self.path == '/api/spin':
+            ok, result = site.spin(session)
+            body = {'success': True, 'data': {'code': result}} if ok else {'success': False, 'message': result}
+        elif self.path == '/api/user/topup':
+            ok, result = site.redeem(str(payload.get('key', '')))
+            body = {'success': True, 'message': '兑换成功', 'data': result} if ok \
+                else {'success': False, 'message': result}
+        else:
+            self._reply(404, {'success': False, 'message': '接口不存在'}, session=session)
+            return
+        self._reply(200, body, session=session)
+
+
+class MockSite:
+    """替身服务器；port=0 时自动选择空闲端口"""
+
+    def __init__(self, host='127.0.0.1', port=0, sessions=(DEFAULT_SESSION,), delay=0.0):
+        self.delay = delay
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._sessions = set(sessions)      # 有效会话（每次请求后轮换为新值）
+        self._spun = set()                   # (初始会话, 日期)，每个账号每天只能抽一次
+        self._origin = {s: s for s in sessions}
+        self._codes = {}                     # 兑换码 -> 是否已使用
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.site = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def http_config(self, session=DEFAULT_SESSION):
+        """指向本服务器的 CONFIG['http']"""
+        return {
+            'enabled': True,
+            'spin_url': f"{self.url}/api/spin",
+            'redeem_url': f"{self.url}/api/user/topup",
+            'cookies': f"session={session}",
+            'timeout': 5,
+        }
+
+    def refresh(self, session):
+        """校验会话并轮换为新值，无效返回 None"""
+        with self._lock:
+            if session not in self._sessions:
+                return None
+            self._sessions.discard(session)
+            new = secrets.token_hex(8)
+            self._sessions.add(new)
+            self._origin[new] = self._origin.pop(session)
+            return new
+
+    def spin(self, session):
+        with self._lock:
+            key = (self._origin[session], time.strftime('%Y-%m-%d'))
+            if key in self._spun:
+                return False, '今天已经抽过奖了'
+            self._spun.add(key)
+            code = secrets.token_hex(16)
+            self._codes[code] = False
+            return True, code
+
+    def redeem(self, code):
+        with self._lock:
+            if code not in self._codes:
+                return False, '兑换码无效'
+            if self._codes[code]:
+                return False, '兑换码已被使用'
+            self._codes[code] = True
+            return True, QUOTA_PER_CODE
+
+    def reset_day(self):
+        """清除今天的抽奖记录（基准测试反复执行时使用）"""
+        with self._lock:
+            self._spun.clear()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mocksite', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="签到站点的本地替身服务器")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--session', action='append', default=[], help="有效的 session Cookie，可重复")
+    parser.add_argument('--delay', type=float, default=0.0, help="每个请求的延迟（秒）")
+    args = parser.parse_args(argv)
+
+    site = MockSite(args.host, args.port, args.session or [DEFAULT_SESSION], args.delay)
+    print(f"[替身] 已启动: {site.url}  有效会话: {', '.join(args.session or [DEFAULT_SESSION])}")
+    site.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+"""
+任务数据模型
+步骤类型定义、步骤、步骤管理器和任务配置（不依赖 GUI）
+"""
+
+import json
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Optional, Callable
+
+# 步骤类型定义
+STEP_TYPES = {
+    'click_image': {'icon': '📌', 'name': '点击图片', 'params': ['image_path', 'confidence', 'timeout']},
+    'wait_image': {'icon': '⏳', 'name': '等待图片', 'params': ['image_path', 'confidence', 'timeout']},
+    'long_press': {'icon': '👆', 'name': '长按', 'params': ['duration', 'x', 'y']},
+    'mouse_drag': {'icon': '🖱️', 'name': '鼠标拖动', 'params': ['start_x', 'start_y', 'end_x', 'end_y', 'duration']},
+    'input_text': {'icon': '⌨️', 'name': '输入文本', 'params': ['text', 'clear_first']},
+    'wait_time': {'icon': '⏱️', 'name': '等待时间', 'params': ['seconds']},
+    'open_url': {'icon': '🌐', 'name': '打开URL', 'params': ['url']},
+    'open_app': {'icon': '🚀', 'name': '打开程序', 'params': ['app_path']},
+    'close_app': {'icon': '❌', 'name': '关闭程序', 'params': ['process_name']},
+    'close_browser': {'icon': '🔒', 'name': '关闭浏览器', 'params': ['browser_type']},
+    'paste': {'icon': '📋', 'name': '粘贴', 'params': []},
+    'clipboard_set': {'icon': '📋', 'name': '设置剪贴板', 'params': ['content']},
+    'ocr_region': {'icon': '🔤', 'name': 'OCR识别', 'params': ['x1', 'y1', 'x2', 'y2', 'var_name', 'retry_count', 'retry_interval']},
+    'press_key': {'icon': '⌨️', 'name': '按键操作', 'params': ['key', 'modifiers']},
+    'wx_push': {'icon': '📱', 'name': '微信推送', 'params': ['title', 'content', 'token']},
+    'loop_start': {'icon': '🔁', 'name': '循环开始', 'params': ['loop_count']},
+    'loop_end': {'icon': '🔚', 'name': '循环结束', 'params': []},
+    'if_image': {'icon': '❓', 'name': '如果图片存在', 'params': ['image_path', 'confidence', 'probe_timeout', 'click_match']},
+    'else': {'icon': '↪️', 'name': '否则', 'params': []},
+    'end_if': {'icon': '🔚', 'name': '条件结束', 'params': []},
+    'first_match': {'icon': '🔀', 'name': '多图匹配', 'params': ['probe_timeout']},
+    'case': {'icon': '▶️', 'name': '匹配分支', 'params': ['image_path', 'confidence', 'click_match']},
+    'end_match': {'icon': '🔚', 'name': '匹配结束', 'params': []},
+}
+
+# 流程控制步骤（由执行器/代码生成器处理，不对应处理函数）
+CONTROL_STEPS = {'loop_start', 'loop_end', 'if_image', 'else', 'end_if', 'first_match', 'case', 'end_match'}
+
+# 参数默认值
+PARAM_DEFAULTS = {
+    'image_path': '', 'confidence': 0.8, 'timeout': 30,
+    'text': '', 'clear_first': True, 'seconds': 3,
+    'url': 'https://', 'var_name': 'result', 'content': '',
+    'x': 0, 'y': 0, 'width': 200, 'height': 100,
+    'x1': 0, 'y1': 0, 'x2': 200, 'y2': 100,
+    'start_x': 0, 'start_y': 0, 'end_x': 100, 'end_y': 100,
+    'key': 'enter', 'modifiers': '',
+    'title': '通知', 'token': '',
+    'duration': 1.0,
+    'app_path': '',
+    'loop_count': 3,
+    'process_name': '',
+    'browser_type': 'all',
+    'retry_count': 10,
+    'retry_interval': 2,
+    'probe_timeout': 0.5,
+    'click_match': False,
+}
+
+# 参数中文名称
+PARAM_LABELS = {
+    'image_path': '图片路径',
+    'confidence': '置信度',
+    'timeout': '超时(秒)',
+    'text': '文本内容',
+    'clear_first': '先清空',
+    'seconds': '秒数',
+    'url': '网址',
+    'app_path': '程序路径',
+    'var_name': '变量名',
+    'content': '内容',
+    'x': 'X坐标',
+    'y': 'Y坐标',
+    'width': '宽度',
+    'height': '高度',
+    'x1': '起始X',
+    'y1': '起始Y',
+    'x2': '结束X',
+    'y2': '结束Y',
+    'start_x': '起点X',
+    'start_y': '起点Y',
+    'end_x': '终点X',
+    'end_y': '终点Y',
+    'key': '按键',
+    'modifiers': '组合键',
+    'title': '标题',
+    'token': '令牌',
+    'duration': '时长(秒)',
+    'loop_count': '循环次数',
+    'process_name': '进程名',
+    'browser_type': '浏览器类型',
+    'retry_count': '重试次数',
+    'retry_interval': '重试间隔(秒)',
+    'probe_timeout': '探测时间(秒)',
+    'click_match': '点击匹配处',
+}
+
+
+def find_blocks(steps):
+    """分析条件/匹配块结构（只看启用的步骤），返回 {步骤下标: 块信息}
+
+    - if_image: {'else': 否则步骤下标或 None, 'end': 条件结束下标}
+    - else:     {'end': 条件结束下标}
+    - first_match: {'cases': [匹配分支下标...], 'end': 匹配结束下标,
+                    'skipped': [多图匹配和第一个匹配分支之间的步骤下标]}（这些步骤不会执行）
+    - case:     {'end': 匹配结束下标}
+    块不跨越循环边界：循环内的否则/匹配分支/结束步骤只与同一循环内的开始步骤配对。
+    缺少结束步骤时块延续到所在循环的循环结束之前（end 为循环结束下标 - 1，跳到 end + 1 即回到循环结束），
+    不在循环中时 end 为 len(steps)，即块延续到任务末尾。
+    """
+    blocks = {}
+    stack = []      # [(类型, 下标)]，类型为 'if' / 'match' / 'loop'
+
+    def close(stop, end):
+        """关闭栈顶的块：stop 为块内最后一个步骤之后的下标，end 为记录的结束下标"""
+        kind, opener = stack.pop()
+        if kind == 'match':
+            block = blocks[opener]
+            first = block['cases'][0] if block['cases'] else stop
+            block['skipped'] = [j for j in range(opener + 1, first) if steps[j].enabled]
+        if kind != 'loop':
+            blocks[opener]['end'] = end
+
+    for i, step in enumerate(steps):
+        if not step.enabled:
+            continue
+        t = step.step_type
+        top = stack[-1][0] if stack else None
+        if t == 'if_image':
+            blocks[i] = {'else': None, 'end': len(steps)}
+            stack.append(('if', i))
+        elif t == 'first_match':
+            blocks[i] = {'cases': [], 'end': len(steps), 'skipped': []}
+            stack.append(('match', i))
+        elif t == 'loop_start':
+            stack.append(('loop', i))
+        elif t == 'loop_end':
+            if any(kind == 'loop' for kind, _ in stack):
+                # 循环内未闭合的块到循环结束为止
+                while stack[-1][0] != 'loop':
+                    close(i, i - 1)
+                stack.pop()
+        elif t == 'else' and top == 'if':
+            opener = stack[-1][1]
+            if blocks[opener]['else'] is None:
+                blocks[opener]['else'] = i
+                blocks[i] = blocks[opener]
+        elif t == 'case' and top == 'match':
+            opener = stack[-1][1]
+            blocks[opener]['cases'].append(i)
+            blocks[i] = blocks[opener]
+        elif (t == 'end_if' and top == 'if') or (t == 'end_match' and top == 'match'):
+            close(i, i)
+    while stack:
+        if stack[-1][0] == 'loop':
+            stack.pop()
+        else:
+            close(len(steps), len(steps))
+    return blocks
+
+
+@dataclass
+class Step:
+    """步骤数据类"""
+    id: str = field(default_factory=lambda: str(uuid.uuid4())[:8])
+    step_type: str = ''
+    params: Dict = field(default_factory=dict)
+    enabled: bool = True
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+@dataclass
+class StepDiff:
+    """一次变更事件涉及的步骤 id（各列表不重复，按发生顺序）
+
+    added: 新增的步骤    removed: 删除的步骤
+    updated: 参数或启用状态变化的步骤    moved: 位置变化的步骤
+    reset: 步骤整体被替换（载入任务、清空），需要全部重新处理
+    """
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    moved: List[str] = field(default_factory=list)
+    reset: bool = False
+
+    def __bool__(self):
+        return bool(self.reset or self.added or self.removed or self.updated or self.moved)
+
+
+class StepManager:
+    """步骤管理器
+
+    维护 步骤 id -> 下标 的索引，按 id 查找、修改都不再扫描整个列表。
+    每次修改都会调用 on_change(diff)；在 batch() 中的多次修改合并为一次调用。
+    """
+    def __init__(self):
+        self._steps: List[Step] = []
+        self._index: Dict[str, int] = {}
+        self._on_change: Optional[Callable] = None
+        self._batch_depth = 0
+        self._pending: Optional[StepDiff] = None
+
+    @property
+    def steps(self) -> List[Step]:
+        return self._steps
+
+    @steps.setter
+    def steps(self, steps: List[Step]):
+        self._steps = steps
+        self._reindex()
+
+    def set_on_change(self, callback):
+        """callback(diff: StepDiff)"""
+        self._on_change = callback
+
+    # ---------- 索引 ----------
+
+    def _reindex(self, start: int = 0):
+        """重建从 start 开始的步骤下标"""
+        if start == 0:
+            self._index = {}
+        for i in range(start, len(self._steps)):
+            self._index[self._steps[i].id] = i
+
+    def index_of(self, step_id: str) -> int:
+        """步骤下标，不存在返回 -1
+
+        命中时校验下标处确实是该步骤；未命中或校验失败时重建索引再查一次，
+        直接修改过 steps 列表（包括替换元素等长度不变的修改）也能找到。
+        """
+        i = self._index.get(step_id, -1)
+        if 0 <= i < len(self._steps) and self._steps[i].id == step_id:
+            return i
+        self._reindex()
+        return self._index.get(step_id, -1)
+
+    def get_step(self, step_id: str) -> Optional[Step]:
+        i = self.index_of(step_id)
+        return self._steps[i] if i >= 0 else None
+
+    # ---------- 变更通知 ----------
+
+    @contextmanager
+    def batch(self):
+        """在 with 块中的修改只在结束时通知一次，diff 包含全部变化"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._flush()
+
+    def _record(self, added=(), removed=(), updated=(), moved=(), reset=False):
+        # 各类 id 用字典保存（有序且去重），通知时再转换为 StepDiff
+        if self._pending is None:
+            self._pending = {'added': {}, 'removed': {}, 'updated': {}, 'moved': {}, 'reset': False}
+        pending = self._pending
+        pending['reset'] = pending['reset'] or reset
+        for step_id in added:
+            if step_id in pending['removed']:
+                del pending['removed'][step_id]
+                pending['updated'][step_id] = None  # 删除后又加回，视为修改
+            else:
+                pending['added'][step_id] = None
+        for step_id in removed:
+            pending['updated'].pop(step_id, None)
+            pending['moved'].pop(step_id, None)
+            if step_id in pending['added']:
+                del pending['added'][step_id]       # 同一批中新增又删除，相互抵消
+            else:
+                pending['removed'][step_id] = None
+        for kind, ids in (('updated', updated), ('moved', moved)):
+            for step_id in ids:
+                if step_id not in pending['added']:
+                    pending[kind][step_id] = None
+        if self._batch_depth == 0:
+            self._flush()
+
+    def _flush(self):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        diff = StepDiff(list(pending['added']), list(pending['removed']),
+                        list(pending['updated']), list(pending['moved']), pending['reset'])
+        if diff and self._on_change:
+            self._on_change(diff)
+
+    # ---------- 单个步骤 ----------
+
+    def insert_step(self, step: Step, insert_after_id: str = None) -> Step:
+        """插入已有的步骤对象，insert_after_id 不存在时添加到末尾"""
+        i = self.index_of(insert_after_id) + 1 if insert_after_id else 0
+        if i <= 0:
+            i = len(self._steps)
+        self._steps.insert(i, step)
+        self._reindex(i)
+        self._record(added=[step.id], moved=[s.id for s in self._steps[i + 1:]])
+        return step
+
+    def add_step(self, step_type: str, insert_after_id: str = None) -> Step:
+        params = {p: PARAM_DEFAULTS.get(p, '') for p in STEP_TYPES[step_type]['params']}
+        # 如果指定了插入位置，则插入到该位置之后；否则添加到末尾
+        return self.insert_step(Step(step_type=step_type, params=params), insert_after_id)
+
+    def remove_step(self, step_id: str):
+        self.remove_steps([step_id])
+
+    def move_step(self, step_id: str, direction: int):
+        i = self.index_of(step_id)
+        new_idx = i + direction
+        if i >= 0 and 0 <= new_idx < len(self._steps):
+            steps = self._steps
+            steps[i], steps[new_idx] = steps[new_idx], steps[i]
+            self._index[steps[i].id], self._index[steps[new_idx].id] = i, new_idx
+            self._record(moved=[steps[new_idx].id, steps[i].id])
+
+    def move_step_to(self, step_id: str, target_idx: int):
+        """移动步骤到指定位置（从1开始）"""
+        self.move_steps_to([step_id], target_idx)
+
+    def update_step(self, step_id: str, params: Dict):
+        step = self.get_step(step_id)
+        if step:
+            step.params.update(params)
+            self._record(updated=[step_id])
+
+    def toggle_step(self, step_id: str):
+        step = self.get_step(step_id)
+        if step:
+            step.enabled = not step.enabled
+            self._record(updated=[step_id])
+
+    # ---------- 批量（多选） ----------
+
+    def remove_steps(self, step_ids):
+        """删除多个步骤"""
+        doomed = {i for i in (self.index_of(s) for s in step_ids) if i >= 0}
+        if not doomed:
+            return
+        first = min(doomed)
+        removed = [self._steps[i].id for i in sorted(doomed)]
+        for step_id in removed:
+            del self._index[step_id]
+        self._steps[first:] = [s for i, s in enumerate(self._steps[first:], first) if i not in doomed]
+        self._reindex(first)
+        self._record(removed=removed, moved=[s.id for s in self._steps[first:]])
+
+    def move_steps(self, step_ids, direction: int):
+        """多个步骤各自上移（direction<0）或下移，相对顺序不变，到达边界的步骤不再移动"""
+        selected = {self._steps[i].id for i in (self.index_of(s) for s in step_ids) if i >= 0}
+        steps = self._steps
+        moved = []
+        delta = -1 if direction < 0 else 1
+        for _ in range(abs(direction)):
+            # 上移时从上往下处理，下移时从下往上，选中的步骤不会越过彼此
+            order = range(len(steps)) if delta < 0 else range(len(steps) - 1, -1, -1)
+            for i in order:
+                j = i + delta
+                if steps[i].id in selected and 0 <= j < len(steps) and steps[j].id not in selected:
+                    steps[i], steps[j] = steps[j], steps[i]
+                    self._index[steps[i].id], self._index[steps[j].id] = i, j
+                    moved += [steps[i].id, steps[j].id]
+        if moved:
+            self._record(moved=moved)
+
+    def move_steps_to(self, step_ids, target_idx: int):
+        """把多个步骤按原顺序连续放到指定位置（从1开始，为移动后第一个步骤的位置）"""
+        picked = sorted(i for i in {self.index_of(s) for s in step_ids} if i >= 0)
+        target = target_idx - 1  # 转换为0索引
+        if not picked or target < 0 or target + len(picked) > len(self._steps):
+            return
+        if picked == list(range(target, target + len(picked))):
+            return
+        block = [self._steps[i] for i in picked]
+        picked_set = set(picked)
+        rest = [s for i, s in enumerate(self._steps) if i not in picked_set]
+        start = min(picked[0], target)
+        before = [s.id for s in self._steps]
+        self._steps[:] = rest[:target] + block + rest[target:]
+        self._reindex(start)
+        self._record(moved=[s.id for i, s in enumerate(self._steps) if i >= start and before[i] != s.id])
+
+    def set_enabled(self, step_ids, enabled: bool):
+        """启用或禁用多个步骤"""
+        changed = []
+        for step_id in step_ids:
+            step = self.get_step(step_id)
+            if step and step.enabled != enabled:
+                step.enabled = enabled
+                changed.append(step_id)
+        if changed:
+            self._record(updated=changed)
+
+    # ---------- 整体 ----------
+
+    def clear(self):
+        self.steps = []
+        self._record(reset=True)
+
+    def to_list(self):
+        return [s.to_dict() for s in self.steps]
+
+    def snapshot(self) -> 'StepManager':
+        """步骤的独立副本（不带回调），供后台线程读取"""
+        copy = StepManager()
+        copy.steps = [Step(s.id, s.step_type, dict(s.params), s.enabled) for s in self.steps]
+        return copy
+
+    def from_list(self, data):
+        self.steps = [Step.from_dict(d) for d in data]
+        self._record(reset=True)
+
+
+class TaskConfig:
+    """任务配置"""
+    def __init__(self):
+        self.name = "未命名任务"
+        self.description = ""
+        self.settings = {'default_confidence': 0.8, 'default_timeout': 30}
+        self.step_manager = StepManager()
+
+    def save(self, filepath: str):
+        data = {
+            'name': self.name,
+            'description': self.description,
+            'settings': self.settings,
+            'steps': self.step_manager.to_list()
+        }
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def load(self, filepath: str):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.name = data.get('name', '未命名任务')
+        self.description = data.get('description', '')
+        self.settings = data.get('settings', {})
+        self.step_manager.from_list(data.get('steps', []))
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+运行监视
+在子进程中执行任务，通过管道获取结构化的执行事件，并可暂停、继续、取消。
+
+子进程（python task_runner.py 任务.json --events --control）:
+- 事件以 "@@event " 开头的 JSON 行写到标准输出，其它输出照常打印
+  （task_start / step_start / match / ocr / step_end / task_end 等，数据与 TaskRunner 的 on_event 相同）
+- 从标准输入读取控制命令，每行一个: pause / resume / cancel
+
+界面一侧使用 RunMonitor 启动子进程，在界面线程中定期调用 poll() 取回事件和输出:
+    monitor = RunMonitor('tasks/example.json').start()
+    for kind, name, data in monitor.poll():
+        ...  # ('event', 事件名, 数据) / ('log', None, 一行输出) / ('exit', None, 退出码)
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+from autotask.paths import PROJECT_DIR
+
+EVENT_PREFIX = '@@event '
+COMMANDS = ('pause', 'resume', 'cancel')
+
+
+class EventWriter:
+    """把执行事件写为 JSON 行（TaskRunner 的 on_event 回调）"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def __call__(self, event, data):
+        line = json.dumps({'event': event, 'data': data}, ensure_ascii=False, default=str)
+        with self._lock:
+            # 整行一次写出，避免和普通输出混在同一行
+            self.stream.write(f"\n{EVENT_PREFIX}{line}\n")
+            self.stream.flush()
+
+
+def parse_line(line):
+    """解析子进程的一行输出，返回 (类型, 事件名, 数据)"""
+    text, sep, payload = line.rstrip('\r\n').partition(EVENT_PREFIX)
+    if not sep:
+        return 'log', None, text
+    try:
+        message = json.loads(payload)
+        return 'event', message['event'], message.get('data') or {}
+    except (ValueError, KeyError, TypeError):
+        return 'log', None, line.rstrip('\r\n')
+
+
+def serve_control(runner, stream=None):
+    """后台线程读取控制命令并转交给执行器；输入结束（父进程退出）时取消任务"""
+    stream = stream or sys.stdin
+
+    def loop():
+        for line in stream:
+            command = line.strip()
+            if command in COMMANDS:
+                getattr(runner, command)()
+        runner.cancel()
+
+    thread = threading.Thread(target=loop, name='run-control', daemon=True)
+    thread.start()
+    return thread
+
+
+class RunMonitor:
+    """在子进程中执行任务并收集事件（不依赖 GUI）"""
+
+    def __init__(self, task_file, resume=False, python=None):
+        self.task_file = task_file
+        self.from_checkpoint = resume
+        self.python = python or sys.executable
+        self.process = None
+        self.returncode = None
+        self._queue = queue.Queue()
+
+    def start(self):
+        cmd = [self.python, '-u', os.path.join(PROJECT_DIR, 'task_runner.py'), self.task_file,
+               '--events', '--control']
+        if self.from_checkpoint:
+            cmd.append('--resume')
+        env = dict(os.environ, PYTHONIOENCODING='utf-8')
+        kwargs = {'creationflags': subprocess.CREATE_NO_WINDOW} if os.name == 'nt' else {}
+        self.process = subprocess.Popen(
+            cmd, cwd=PROJECT_DIR, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, encoding='utf-8', errors='replace', bufsize=1, **kwargs
+        )
+        threading.Thread(target=self._read, name='run-monitor', daemon=True).start()
+        return self
+
+    def _read(self):
+        for line in self.process.stdout:
+            kind, name, data = parse_line(line)
+            if kind == 'log' and not data:
+                continue    # 事件前后补的空行
+            self._queue.put((kind, name, data))
+        self.returncode = self.process.wait()
+        self._queue.put(('exit', None, self.returncode))
+
+    def poll(self):
+        """取回目前收到的所有事件和输出（不阻塞）"""
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def _send(self, command):
+        if not self.running:
+            return False
+        try:
+            self.process.stdin.write(command + '\n')
+            self.process.stdin.flush()
+            return True
+        except OSError:
+            return False
+
+    def pause(self):
+        return self._send('pause')
+
+    def resume(self):
+        return self._send('resume')
+
+    def cancel(self):
+        """请求取消：执行器在下一次检查时停止并保存断点"""
+        return self._send('cancel')
+
+    def kill(self):
+        """强制结束子进程"""
+        if self.running:
+            self.process.kill()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 识别
+任务中的 OCR 步骤通过 get_ocr().recognize(image) 调用，默认使用 Umi-OCR HTTP 服务（复用连接）。
+录制/回放时可替换为记录或重放识别结果的实现，模拟运行时可使用返回固定文本的 StaticOcr。
+"""
+
+import base64
+import contextlib
+import io
+
+from autotask.trace import span
+
+UMI_OCR_URL = 'http://127.0.0.1:1224/api/ocr'
+
+
+class OcrError(Exception):
+    """OCR 服务返回错误"""
+
+
+class UmiOcr:
+    """Umi-OCR HTTP 接口"""
+
+    def __init__(self, url=UMI_OCR_URL, timeout=30):
+        self.url = url
+        self.timeout = timeout
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def recognize(self, image):
+        """识别 PIL 图像中的文字，返回去除首尾空白的文本；服务报错时抛出 OcrError"""
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        img_base64 = base64.b64encode(buffer.getvalue()).decode()
+
+        with span('ocr_request', 'ocr') as sp:
+            resp = self.session.post(
+                self.url,
+                json={"base64": img_base64, "options": {"data.format": "text"}},
+                timeout=self.timeout
+            )
+            data = resp.json()
+            sp.set(code=data.get("code"))
+        if data.get("code") != 100:
+            raise OcrError(data.get('msg', '未知错误'))
+        return str(data.get("data", "")).strip()
+
+
+class StaticOcr:
+    """固定识别结果（模拟运行或测试用）"""
+
+    def __init__(self, text=''):
+        self.text = text
+
+    def recognize(self, image):
+        return self.text
+
+
+_ocr = None
+
+
+def get_ocr():
+    """当前 OCR 引擎（默认 Umi-OCR）"""
+    global _ocr
+    if _ocr is None:
+        _ocr = UmiOcr()
+    return _ocr
+
+
+def set_ocr(engine):
+    """替换 OCR 引擎，返回原引擎"""
+    global _ocr
+    previous, _ocr = _ocr, engine
+    return previous
+
+
+@contextlib.contextmanager
+def use_ocr(engine):
+    """在 with 代码块内临时使用指定 OCR 引擎"""
+    previous = set_ocr(engine)
+    try:
+        yield engine
+    finally:
+        set_ocr(previous)
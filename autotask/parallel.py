@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+并行执行
+用进程池同时执行多个任务文件，每个工作进程拥有独立的虚拟 X 显示（Xvfb / Xephyr），
+DISPLAY 环境变量只在该进程内生效，因此截图、鼠标键盘（pyautogui）、
+剪贴板（xclip/xsel）以及任务中启动的程序都落在各自的显示上，互不干扰。
+
+用法:
+    python -m autotask.parallel tasks/a.json tasks/b.json tasks/c.json -j 3
+    python -m autotask.parallel tasks/*.json -j 4 --size 1280x720 --log-dir logs
+    python -m autotask.parallel tasks/*.json -j 2 --display xephyr   # 显示嵌套窗口，便于观察
+
+虚拟显示只支持 Linux 等 X11 环境；--display none 时不隔离显示，
+只适合不操作桌面的任务（如纯推送、离线回放）。
+"""
+
+import contextlib
+import multiprocessing
+import multiprocessing.util
+import os
+import shutil
+import subprocess
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+DISPLAY_BACKENDS = ('xvfb', 'xephyr', 'none')
+DEFAULT_SCREEN_SIZE = (1920, 1080)
+DISPLAY_START_TIMEOUT = 10   # 等待虚拟显示启动的时间（秒）
+
+
+class DisplayError(Exception):
+    """虚拟显示无法启动"""
+
+
+class VirtualDisplay:
+    """一个虚拟 X 显示（由 X 服务器通过 -displayfd 自动分配空闲编号，无需自己找端口）"""
+
+    def __init__(self, backend='xvfb', size=DEFAULT_SCREEN_SIZE, depth=24):
+        self.backend = backend
+        self.size = size
+        self.depth = depth
+        self.number = None
+        self._proc = None
+
+    @property
+    def name(self):
+        return f":{self.number}" if self.number is not None else None
+
+    def _command(self, fd):
+        w, h = self.size
+        if self.backend == 'xephyr':
+            return ['Xephyr', '-displayfd', str(fd), '-screen', f'{w}x{h}x{self.depth}',
+                    '-nolisten', 'tcp', '-ac']
+        return ['Xvfb', '-displayfd', str(fd), '-screen', '0', f'{w}x{h}x{self.depth}',
+                '-nolisten', 'tcp', '-ac']
+
+    def start(self):
+        """启动 X 服务器，返回显示名（如 ':3'）"""
+        read_fd, write_fd = os.pipe()
+        try:
+            self._proc = subprocess.Popen(
+                self._command(write_fd), pass_fds=(write_fd,),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+        except FileNotFoundError:
+            os.close(read_fd)
+            os.close(write_fd)
+            raise DisplayError(f"未找到 {self.backend}，请先安装（如 apt install xvfb）")
+        os.close(write_fd)
+
+        # X 服务器就绪后会把显示编号写到 displayfd 并关闭
+        data = b''
+        deadline = time.monotonic() + DISPLAY_START_TIMEOUT
+        with os.fdopen(read_fd, 'rb') as pipe:
+            while time.monotonic() < deadline and not data.endswith(b'\n'):
+                chunk = pipe.read(1)
+                if not chunk:
+                    break
+                data += chunk
+        if not data.strip().isdigit():
+            self.stop()
+            raise DisplayError(f"{self.backend} 启动失败")
+        self.number = int(data)
+        return self.name
+
+    def stop(self):
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+        self._proc = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+@dataclass
+class TaskResult:
+    """单个任务的执行结果，时间均为秒"""
+    task_file: str
+    success: bool = False
+    error: str = ''
+    worker: int = 0
+    display: str = ''
+    queued: float = 0.0        # 提交时间（time.time）
+    started: float = 0.0
+    finished: float = 0.0
+    log_file: str = ''
+
+    @property
+    def wait_time(self):
+        return self.started - self.queued
+
+    @property
+    def run_time(self):
+        return self.finished - self.started
+
+
+# ---------- 工作进程 ----------
+
+_worker_display = None
+
+
+def _init_worker(backend, size):
+    """工作进程初始化：启动本进程专用的虚拟显示"""
+    global _worker_display
+    if backend == 'none':
+        return
+    _worker_display = VirtualDisplay(backend, size)
+    os.environ['DISPLAY'] = _worker_display.start()
+    # 用 multiprocessing 的终结器关闭 X 服务器：工作进程结束时在 atexit 之前执行，
+    # 并按 exitpriority 排在其它终结器前面，X 服务器在本进程的清理完成前就已关闭
+    multiprocessing.util.Finalize(None, _worker_display.stop, exitpriority=10)
+
+
+def _run_one(task_file, queued, log_dir):
+    """在工作进程中执行一个任务文件"""
+    from autotask.runner import run_task_file
+
+    result = TaskResult(task_file=task_file, queued=queued, worker=os.getpid(),
+                        display=os.environ.get('DISPLAY', ''), started=time.time())
+    log = None
+    if log_dir:
+        stem = os.path.splitext(os.path.basename(task_file))[0]
+        result.log_file = os.path.join(log_dir, f"{stem}-{os.getpid()}-{int(result.started)}.log")
+        log = open(result.log_file, 'w', encoding='utf-8')
+    try:
+        with contextlib.redirect_stdout(log) if log else contextlib.nullcontext():
+            try:
+                result.success = bool(run_task_file(task_file))
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+                traceback.print_exc(file=sys.stdout)
+    finally:
+        if log:
+            log.close()
+    result.finished = time.time()
+    return result
+
+
+# ---------- 调度 ----------
+
+class ParallelExecutor:
+    """把任务文件分配给 N 个各自拥有虚拟显示的工作进程执行"""
+
+    def __init__(self, workers=None, display='xvfb', size=DEFAULT_SCREEN_SIZE, log_dir=None):
+        if display not in DISPLAY_BACKENDS:
+            raise ValueError(f"未知显示类型: {display}，可选 {', '.join(DISPLAY_BACKENDS)}")
+        if display != 'none':
+            if sys.platform == 'win32':
+                raise DisplayError("虚拟显示隔离需要 X11 环境（Linux），Windows 上请使用 --display none")
+            binary = 'Xephyr' if display == 'xephyr' else 'Xvfb'
+            if shutil.which(binary) is None:
+                raise DisplayError(f"未找到 {binary}，请先安装（如 apt install xvfb）")
+        self.workers = workers or os.cpu_count() or 1
+        self.display = display
+        self.size = size
+        self.log_dir = log_dir
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+    def run(self, task_files, on_result=None):
+        """执行全部任务，按完成顺序回调 on_result(result)，返回与 task_files 顺序一致的结果列表"""
+        task_files = [os.path.abspath(f) for f in task_files]
+        queued = time.time()
+        return self.map(_run_one, [(f, queued, self.log_dir) for f in task_files], on_result,
+                        on_error=lambda args, e: TaskResult(task_file=args[0], error=f"{type(e).__name__}: {e}"))
+
+    def map(self, func, arg_list, on_result=None, on_error=None):
+        """在工作进程中执行 func(*args)，返回与 arg_list 顺序一致的结果列表
+
+        func 必须是模块级函数（spawn 方式按名称导入）；工作进程在所有任务间复用，
+        已加载的模板、OCR 模型等在同一进程的后续任务中不必重新加载。
+        on_error(args, exc): 工作进程异常退出时生成替代结果，默认抛出异常
+        """
+        results = [None] * len(arg_list)
+        # spawn：工作进程不继承父进程已加载的模块和 X 连接，DISPLAY 在导入 pyautogui 之前设置
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(arg_list) or 1),
+                                 mp_context=context, initializer=_init_worker,
+                                 initargs=(self.display, self.size)) as pool:
+            futures = {pool.submit(func, *args): i for i, args in enumerate(arg_list)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 工作进程异常退出（如虚拟显示启动失败）
+                    if on_error is None:
+                        raise
+                    result = on_error(arg_list[i], e)
+                results[i] = result
+                if on_result:
+                    on_result(result)
+        return results
+
+
+def print_summary(results, elapsed):
+    """打印每个任务的结果和耗时"""
+    print("\n" + "=" * 70)
+    print(f"{'任务':<28}{'结果':<6}{'显示':<6}{'排队':>8}{'执行':>10}")
+    print("-" * 70)
+    for r in results:
+        name = os.path.basename(r.task_file)
+        status = '成功' if r.success else '失败'
+        wait = f"{r.wait_time:.1f}s" if r.started else '-'
+        run = f"{r.run_time:.1f}s" if r.started else '-'
+        print(f"{name:<28}{status:<6}{r.display or '-':<6}{wait:>8}{run:>10}")
+        if r.error:
+            print(f"    {r.error}")
+    total_run = sum(r.run_time for r in results if r.started)
+    ok = sum(1 for r in results if r.success)
+    print("-" * 70)
+    print(f"成功 {ok}/{len(results)}，总耗时 {elapsed:.1f}s，任务累计执行 {total_run:.1f}s"
+          + (f"，并行加速 {total_run / elapsed:.1f}x" if elapsed > 0 else ''))
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="在独立虚拟显示上并行执行多个任务")
+    parser.add_argument('task_files', nargs='+', help="任务文件 (.json)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="工作进程数（默认 CPU 核数）")
+    parser.add_argument('--display', choices=DISPLAY_BACKENDS, default='xvfb', help="虚拟显示类型")
+    parser.add_argument('--size', default='%dx%d' % DEFAULT_SCREEN_SIZE, help="虚拟屏幕尺寸，如 1920x1080")
+    parser.add_argument('--log-dir', default=None, help="每个任务的输出写入该目录（默认直接输出）")
+    args = parser.parse_args(argv)
+
+    w, h = (int(v) for v in args.size.lower().split('x'))
+    try:
+        executor = ParallelExecutor(args.workers, args.display, (w, h), args.log_dir)
+    except DisplayError as e:
+        print(f"[!] {e}")
+        return 2
+
+    start = time.time()
+    results = executor.run(args.task_files, on_result=lambda r: print(
+        f"[{'√' if r.success else '!'}] {os.path.basename(r.task_file)} "
+        f"({r.run_time:.1f}s{', ' + r.display if r.display else ''})"))
+    print_summary(results, time.time() - start)
+    return 0 if all(r.success for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""项目目录"""
+
+import os
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TASKS_DIR = os.path.join(PROJECT_DIR, "tasks")
+IMAGES_DIR = os.path.join(PROJECT_DIR, "images")
+CACHE_DIR = os.path.join(TASKS_DIR, ".cache")
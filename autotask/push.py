@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+"""
+微信推送后台发送器
+- 推送先写入磁盘发件箱（SQLite），步骤立即返回
+- 后台线程复用 keep-alive 连接发送
+- 失败按指数退避重试，进程退出时在限定时间内尽量发完
+- 可选摘要模式：运行期间缓冲推送，合并为一条消息发送（每个执行线程各自一份，
+  守护进程同时执行的任务互不影响）
+- 模拟运行时换成 DryRunDispatcher，只记录不发送
+"""
+
+import atexit
+import contextlib
+import contextvars
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from autotask.paths import TASKS_DIR
+from autotask.trace import span
+
+OUTBOX_PATH = os.path.join(TASKS_DIR, "push_outbox.db")
+
+# 重试配置
+MAX_ATTEMPTS = 8        # 最多尝试次数，超过后标记为失败
+BASE_DELAY = 2          # 首次重试间隔（秒）
+MAX_DELAY = 600         # 最大重试间隔（秒）
+REQUEST_TIMEOUT = 10    # 单次请求超时（秒）
+FLUSH_DEADLINE = 15     # 退出时最多等待发送的时间（秒）
+CLAIM_LEASE = 60        # 取出待发送记录后的占用时长（秒），防止多进程重复发送
+
+# 摘要配置
+DIGEST_MAX_ITEMS = 10   # 缓冲条数达到后立即合并发送
+DIGEST_MAX_WAIT = 600   # 首条缓冲后最多等待的时间（秒）
+
+
+class PushOutbox:
+    """磁盘发件箱"""
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_try REAL NOT NULL,
+                created REAL NOT NULL,
+                last_error TEXT,
+                claimed_until REAL
+            )
+        ''')
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")]
+        if 'claimed_until' not in columns:
+            # 旧版本创建的发件箱
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN claimed_until REAL")
+        self._conn.commit()
+
+    def add(self, url, params):
+        """写入一条待发送推送，返回记录ID"""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO outbox (url, params, next_try, created) VALUES (?, ?, ?, ?)",
+                (url, json.dumps(params, ensure_ascii=False), now, now)
+            )
+            self._conn.commit()
+            return cur.lastrowid
+
+    def due(self, now=None, limit=20):
+        """取出到期待发送的记录
+
+        取出的记录被占用 CLAIM_LEASE 秒（claimed_until），多个进程共用发件箱时（如并行执行）
+        不会重复发送；发送进程中途退出时，租约到期后由其它进程接手。
+        占用不改变计划时间，发送完成（成功、重试或放弃）时解除占用。
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, url, params, attempts FROM outbox "
+                    "WHERE status = 'pending' AND next_try <= ? "
+                    "AND (claimed_until IS NULL OR claimed_until <= ?) ORDER BY id LIMIT ?",
+                    (now, now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET claimed_until = ? WHERE id = ?",
+                    [(now + CLAIM_LEASE, r[0]) for r in rows]
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return [{'id': r[0], 'url': r[1], 'params': json.loads(r[2]), 'attempts': r[3]} for r in rows]
+
+    def next_due_time(self):
+        """最近一条待发送记录的计划时间（被占用的记录取租约到期时间），没有则返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(MAX(next_try, COALESCE(claimed_until, 0))) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        return row[0] if row else None
+
+    def next_retry_time(self, now=None):
+        """未被占用的记录中最近的计划时间；有记录正在发送（被占用）时返回 None"""
+        now = time.time() if now is None else now
+        with self._lock:
+            claimed, next_try = self._conn.execute(
+                "SELECT SUM(claimed_until > ?), MIN(next_try) FROM outbox WHERE status = 'pending'",
+                (now,)
+            ).fetchone()
+        return None if claimed else next_try
+
+    def mark_sent(self, item_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (item_id,))
+            self._conn.commit()
+
+    def mark_retry(self, item_id, attempts, next_try, error):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = ?, next_try = ?, last_error = ?, claimed_until = NULL "
+                "WHERE id = ?",
+                (attempts, next_try, error, item_id)
+            )
+            self._conn.commit()
+
+    def mark_failed(self, item_id, attempts, error):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'failed', attempts = ?, last_error = ?, claimed_until = NULL "
+                "WHERE id = ?",
+                (attempts, error, item_id)
+            )
+            self._conn.commit()
+
+    def pending_count(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PushDispatcher:
+    """后台推送发送器"""
+
+    def __init__(self, outbox_path=OUTBOX_PATH, max_attempts=MAX_ATTEMPTS,
+                 base_delay=BASE_DELAY, max_delay=MAX_DELAY, timeout=REQUEST_TIMEOUT):
+        self.outbox = PushOutbox(outbox_path)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._session = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def session(self):
+        """懒加载 keep-alive 会话"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+
+    def start(self):
+        """启动后台线程（重复调用无副作用）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="wx-push", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, url, params):
+        """写入发件箱并唤醒后台线程，立即返回"""
+        item_id = self.outbox.add(url, params)
+        self.start()
+        self._wakeup.set()
+        return item_id
+
+    def _backoff(self, attempts):
+        delay = min(self.base_delay * (2 ** (attempts - 1)), self.max_delay)
+        return delay * random.uniform(0.8, 1.2)
+
+    def _deliver(self, item):
+        """发送单条推送，返回 (是否成功, 错误信息)"""
+        try:
+            with span('push_http', 'http', title=item['params'].get('title', '')):
+                response = self.session.get(item['url'], params=item['params'], timeout=self.timeout)
+            if response.status_code == 200:
+                return True, None
+            return False, f"状态码 {response.status_code}: {response.text[:100]}"
+        except Exception as e:
+            return False, str(e)
+
+    def _process_due(self):
+        """发送所有到期记录，返回本轮处理条数"""
+        items = self.outbox.due()
+        for item in items:
+            ok, error = self._deliver(item)
+            attempts = item['attempts'] + 1
+            title = item['params'].get('title', '')
+            if ok:
+                self.outbox.mark_sent(item['id'])
+                print(f"  [推送] 已发送: {title}")
+            elif attempts >= self.max_attempts:
+                self.outbox.mark_failed(item['id'], attempts, error)
+                print(f"  [推送] 放弃发送 ({attempts}次失败): {title} - {error}")
+            else:
+                delay = self._backoff(attempts)
+                self.outbox.mark_retry(item['id'], attempts, time.time() + delay, error)
+                print(f"  [推送] 发送失败，{delay:.0f}秒后重试: {title} - {error}")
+        return len(items)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self._process_due()
+            except Exception as e:
+                print(f"  [推送] 后台发送异常: {e}")
+
+            next_try = self.outbox.next_due_time()
+            wait = None if next_try is None else max(0.0, next_try - time.time())
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def flush(self, deadline=FLUSH_DEADLINE):
+        """在限定时间内等待发件箱中到期的推送发完，返回剩余待发数量"""
+        if self.outbox.pending_count() == 0:
+            return 0
+        self.start()
+        end = time.time() + deadline
+        while time.time() < end:
+            self._wakeup.set()
+            time.sleep(0.2)
+            if self.outbox.pending_count() == 0:
+                break
+            # 剩余记录都在退避等待中且超出期限，不必再等；正在发送的记录一直等到期限
+            next_try = self.outbox.next_retry_time()
+            if next_try is not None and next_try > end:
+                break
+        remaining = self.outbox.pending_count()
+        if remaining:
+            print(f"  [推送] 仍有 {remaining} 条推送未发送，将在下次运行时重试")
+        return remaining
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+
+class DryRunDispatcher:
+    """模拟运行用的发送器：只记录推送内容，不写发件箱也不发送"""
+
+    def __init__(self):
+        self.sent = []
+
+    def enqueue(self, url, params):
+        self.sent.append((url, dict(params)))
+        print(f"  [模拟] 推送未发送: {params.get('title', '')}")
+        return len(self.sent)
+
+    def flush(self, deadline=FLUSH_DEADLINE):
+        return 0
+
+    def stop(self):
+        pass
+
+
+class PushDigest:
+    """推送摘要：缓冲运行期间的推送，按条数/时间阈值或结束时合并为一条发送"""
+
+    def __init__(self, dispatcher, title='任务汇总', max_items=DIGEST_MAX_ITEMS,
+                 max_wait=DIGEST_MAX_WAIT):
+        self.dispatcher = dispatcher
+        self.title = title
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._buffers = {}   # (url, token) -> [(时间, 标题, 内容), ...]
+        self._timers = {}
+
+    def add(self, url, params):
+        """加入缓冲，达到条数阈值时立即合并发送"""
+        key = (url, params.get('token', ''))
+        with self._lock:
+            entries = self._buffers.setdefault(key, [])
+            entries.append((time.strftime('%H:%M:%S'), params.get('title', ''), params.get('content', '')))
+            full = len(entries) >= self.max_items
+            if not full and key not in self._timers:
+                timer = threading.Timer(self.max_wait, self._flush_key, args=(key,))
+                timer.daemon = True
+                self._timers[key] = timer
+                timer.start()
+        if full:
+            self._flush_key(key)
+
+    def _flush_key(self, key):
+        with self._lock:
+            entries = self._buffers.pop(key, [])
+            timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        if not entries:
+            return
+        url, token = key
+        lines = []
+        for stamp, title, content in entries:
+            lines.append(f"[{stamp}] {title}\n{content}")
+        params = {
+            'token': token,
+            'title': f"{self.title} ({len(entries)}条)",
+            'content': '\n\n'.join(lines),
+        }
+        self.dispatcher.enqueue(url, params)
+        print(f"  [推送] 已合并 {len(entries)} 条消息发送")
+
+    def flush(self):
+        """合并发送所有缓冲"""
+        with self._lock:
+            keys = list(self._buffers)
+        for key in keys:
+            self._flush_key(key)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+# 当前执行上下文的摘要；新线程从空上下文开始，各执行线程互不影响
+_digest = contextvars.ContextVar('push_digest', default=None)
+_active_digests = set()
+_digest_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """获取全局发送器，首次调用时注册退出前发送"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = PushDispatcher()
+            atexit.register(_flush_on_exit)
+            # 上次运行遗留的推送继续重试
+            if _dispatcher.outbox.pending_count():
+                _dispatcher.start()
+        return _dispatcher
+
+
+def set_dispatcher(dispatcher):
+    """替换全局发送器，返回原发送器"""
+    global _dispatcher
+    with _dispatcher_lock:
+        previous, _dispatcher = _dispatcher, dispatcher
+    return previous
+
+
+@contextlib.contextmanager
+def use_dispatcher(dispatcher):
+    """在 with 代码块内临时使用指定发送器"""
+    previous = set_dispatcher(dispatcher)
+    try:
+        yield dispatcher
+    finally:
+        set_dispatcher(previous)
+
+
+def begin_digest(title='任务汇总', max_items=DIGEST_MAX_ITEMS, max_wait=DIGEST_MAX_WAIT):
+    """在当前执行上下文开启摘要模式，之后的非紧急推送都进入缓冲"""
+    end_digest()
+    digest = PushDigest(get_dispatcher(), title, max_items, max_wait)
+    _digest.set(digest)
+    with _digest_lock:
+        _active_digests.add(digest)
+    return digest
+
+
+def get_digest():
+    """当前执行上下文的摘要缓冲，未开启时返回 None"""
+    return _digest.get()
+
+
+def end_digest():
+    """结束当前执行上下文的摘要模式并合并发送剩余缓冲"""
+    digest = _digest.get()
+    if digest is None:
+        return
+    _digest.set(None)
+    with _digest_lock:
+        _active_digests.discard(digest)
+    digest.flush()
+
+
+def _flush_on_exit():
+    # 其它线程中未结束的摘要也在退出前发送
+    with _digest_lock:
+        digests = list(_active_digests)
+        _active_digests.clear()
+    for digest in digests:
+        digest.flush()
+    if _dispatcher is not None:
+        _dispatcher.flush()
+        _dispatcher.stop()
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+录制与回放
+录制真实运行时的截图（关键帧 + 差量压缩）、输入操作和 OCR 结果，
+之后可在没有桌面的环境中（如 Linux）用回放屏幕和假输入设备重新运行
+AutoSignIn 或任意任务 JSON，用于离线调试和可重复的性能基准。
+回放使用虚拟时钟：等待和超时不真正等待，第 N 次截图时虚拟时间推进到第 N 帧的录制时间，
+报告的耗时是虚拟时间，多次回放结果相同。
+
+录制目录结构:
+    meta.json        帧列表、事件列表、屏幕尺寸
+    frames/*.png     关键帧（整屏）和差量帧（变化区域）
+
+用法:
+    python -m autotask.recording record tasks/Telegram.json recordings/telegram
+    python -m autotask.recording replay tasks/Telegram.json recordings/telegram
+    python -m autotask.recording record signin recordings/signin    # auto_signin 签到流程
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+from autotask.lazy import lazy_import
+from autotask.clock import SimClock, use_clock
+from autotask.screen import ScreenSource, LiveScreen, use_screen
+from autotask.inputs import InputSink, FakeInput, get_input, use_input
+from autotask.ocr import OcrError, get_ocr, use_ocr
+from autotask.runner import run_target
+
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
+
+KEYFRAME_INTERVAL = 30      # 每隔多少帧强制保存一个关键帧
+DELTA_MAX_RATIO = 0.5       # 变化区域超过整屏该比例时直接存关键帧
+
+
+class Recorder:
+    """录制器：保存截图帧和事件"""
+
+    def __init__(self, out_dir, keyframe_interval=KEYFRAME_INTERVAL):
+        self.out_dir = out_dir
+        self.keyframe_interval = keyframe_interval
+        self.frames = []
+        self.events = []
+        self.size = None
+        self._prev = None
+        self._since_key = 0
+        self._t0 = time.monotonic()
+        os.makedirs(os.path.join(out_dir, 'frames'), exist_ok=True)
+
+    def _now(self):
+        return round(time.monotonic() - self._t0, 4)
+
+    def _save(self, array, name):
+        Image.fromarray(array).save(os.path.join(self.out_dir, 'frames', name), compress_level=1)
+
+    def add_frame(self, image):
+        """记录一帧整屏截图（PIL RGB），返回帧序号"""
+        array = np.asarray(image.convert('RGB'))
+        index = len(self.frames)
+        entry = {'t': self._now()}
+        h, w = array.shape[:2]
+        if self.size is None:
+            self.size = [w, h]
+
+        if self._prev is None or self._prev.shape != array.shape or self._since_key >= self.keyframe_interval:
+            entry['type'] = 'key'
+        else:
+            changed = np.any(self._prev != array, axis=2)
+            if not changed.any():
+                entry['type'] = 'same'
+            else:
+                ys, xs = np.nonzero(changed)
+                x1, x2 = int(xs.min()), int(xs.max()) + 1
+                y1, y2 = int(ys.min()), int(ys.max()) + 1
+                if (x2 - x1) * (y2 - y1) > DELTA_MAX_RATIO * w * h:
+                    entry['type'] = 'key'
+                else:
+                    entry.update(type='delta', x=x1, y=y1)
+                    entry['file'] = f"{index:06d}.png"
+                    self._save(array[y1:y2, x1:x2], entry['file'])
+
+        if entry['type'] == 'key':
+            entry['file'] = f"{index:06d}.png"
+            self._save(array, entry['file'])
+            self._since_key = 0
+        else:
+            self._since_key += 1
+
+        self._prev = array
+        self.frames.append(entry)
+        return index
+
+    def add_event(self, kind, **data):
+        self.events.append(dict(t=self._now(), kind=kind, frame=len(self.frames) - 1, **data))
+
+    def close(self):
+        meta = {
+            'version': 1,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'size': self.size,
+            'frames': self.frames,
+            'events': self.events,
+        }
+        with open(os.path.join(self.out_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1)
+
+
+class RecordingScreen(ScreenSource):
+    """录制屏幕：每次截图都保存整屏帧，再按 bbox 裁剪返回"""
+
+    def __init__(self, recorder, inner=None):
+        self.recorder = recorder
+        self.inner = inner or LiveScreen()
+
+    def grab(self, bbox=None):
+        image = self.inner.grab()
+        self.recorder.add_frame(image)
+        return image.crop(bbox) if bbox else image
+
+
+class RecordingInput(InputSink):
+    """录制输入：转发给真实设备并记录事件（鼠标移动轨迹不记录）"""
+
+    def __init__(self, recorder, inner):
+        self.recorder = recorder
+        self.inner = inner
+
+    def position(self):
+        return self.inner.position()
+
+    def move_to(self, x, y):
+        self.inner.move_to(x, y)
+
+    def mouse_down(self, x=None, y=None):
+        self.inner.mouse_down(x, y)
+        px, py = self.inner.position()
+        self.recorder.add_event('mouse_down', x=px, y=py)
+
+    def mouse_up(self):
+        self.inner.mouse_up()
+        px, py = self.inner.position()
+        self.recorder.add_event('mouse_up', x=px, y=py)
+
+    def drag(self, dx, dy, duration=0.0):
+        self.recorder.add_event('drag', dx=dx, dy=dy)
+        self.inner.drag(dx, dy, duration)
+
+    def press(self, key):
+        self.recorder.add_event('press', key=key)
+        self.inner.press(key)
+
+    def hotkey(self, *keys):
+        self.recorder.add_event('hotkey', keys=list(keys))
+        self.inner.hotkey(*keys)
+
+    def copy(self, text):
+        self.recorder.add_event('copy', text=text)
+        self.inner.copy(text)
+
+    def paste(self):
+        text = self.inner.paste()
+        self.recorder.add_event('paste', text=text)
+        return text
+
+    def open_url(self, url, browser=None, profile=None):
+        self.recorder.add_event('open_url', url=url)
+        self.inner.open_url(url, browser=browser, profile=profile)
+
+    def open_app(self, path):
+        self.recorder.add_event('open_app', path=path)
+        self.inner.open_app(path)
+
+    def kill_process(self, name):
+        self.recorder.add_event('kill_process', name=name)
+        self.inner.kill_process(name)
+
+
+class RecordingOcr:
+    """录制 OCR：转发给真实引擎并记录识别结果"""
+
+    def __init__(self, recorder, inner):
+        self.recorder = recorder
+        self.inner = inner
+
+    def recognize(self, image):
+        try:
+            text = self.inner.recognize(image)
+        except OcrError as e:
+            self.recorder.add_event('ocr', error=str(e))
+            raise
+        self.recorder.add_event('ocr', text=text)
+        return text
+
+
+class Recording:
+    """已录制的数据"""
+
+    def __init__(self, rec_dir):
+        self.rec_dir = rec_dir
+        with open(os.path.join(rec_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.frames = meta['frames']
+        self.events = meta['events']
+        self.size = meta.get('size')
+        self._cache_index = None
+        self._cache_array = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    def _load(self, name):
+        with Image.open(os.path.join(self.rec_dir, 'frames', name)) as img:
+            return np.array(img.convert('RGB'))
+
+    def frame_array(self, index):
+        """还原第 index 帧（从最近的关键帧依次应用差量），返回 RGB 数组"""
+        index = max(0, min(index, len(self.frames) - 1))
+        if index == self._cache_index:
+            return self._cache_array
+
+        # 顺序回放时直接在上一帧基础上应用差量
+        if self._cache_index is not None and self._cache_index < index:
+            start, array = self._cache_index + 1, self._cache_array.copy()
+        else:
+            start = index
+            while self.frames[start]['type'] != 'key':
+                start -= 1
+            array = None
+
+        for i in range(start, index + 1):
+            entry = self.frames[i]
+            if entry['type'] == 'key':
+                array = self._load(entry['file'])
+            elif entry['type'] == 'delta':
+                patch = self._load(entry['file'])
+                x, y = entry['x'], entry['y']
+                array[y:y + patch.shape[0], x:x + patch.shape[1]] = patch
+
+        self._cache_index, self._cache_array = index, array
+        return array
+
+    def frame(self, index):
+        return Image.fromarray(self.frame_array(index))
+
+    def events_of(self, kind):
+        return [e for e in self.events if e['kind'] == kind]
+
+
+class ReplayScreen(ScreenSource):
+    """回放屏幕：第 N 次截图返回录制的第 N 帧，录制结束后保持最后一帧
+
+    clock: 虚拟时钟（SimClock），截图时把虚拟时间推进到该帧的录制时间
+    """
+
+    def __init__(self, recording, clock=None):
+        self.recording = recording
+        self.clock = clock
+        self.position = 0
+        self._image = (None, None)
+
+    def grab(self, bbox=None):
+        if self.clock is not None:
+            recorded = self.clock.start + self.recording.frames[self.position]['t']
+            self.clock.advance(recorded - self.clock.time())
+        # 同一帧返回同一个图像对象（停在最后一帧时图像识别可复用匹配结果）
+        if self._image[0] != self.position:
+            self._image = (self.position, self.recording.frame(self.position))
+        image = self._image[1]
+        if self.position < len(self.recording) - 1:
+            self.position += 1
+        return image.crop(bbox) if bbox else image
+
+
+class ReplayOcr:
+    """回放 OCR：按顺序返回录制的识别结果"""
+
+    def __init__(self, recording):
+        self._results = list(recording.events_of('ocr'))
+
+    def recognize(self, image):
+        if not self._results:
+            return ''
+        event = self._results.pop(0)
+        if 'error' in event:
+            raise OcrError(event['error'])
+        return event.get('text', '')
+
+
+def record(target, out_dir):
+    """真实运行并录制"""
+    recorder = Recorder(out_dir)
+    start = time.perf_counter()
+    try:
+        with use_screen(RecordingScreen(recorder)), \
+                use_input(RecordingInput(recorder, get_input())), \
+                use_ocr(RecordingOcr(recorder, get_ocr())):
+            ok = run_target(target)
+    finally:
+        recorder.close()
+    print(f"[录制] {len(recorder.frames)} 帧, {len(recorder.events)} 个事件, "
+          f"耗时 {time.perf_counter() - start:.1f}秒 -> {out_dir}")
+    return ok
+
+
+def replay(target, rec_dir, seed=0):
+    """用录制数据离线回放，返回 (是否完成, 回放时的输入事件)"""
+    recording = Recording(rec_dir)
+    paste_values = [e.get('text', '') for e in recording.events_of('paste')]
+    fake = FakeInput(clipboard_values=paste_values)
+    clock = SimClock()
+    random.seed(seed)  # 鼠标轨迹随机偏移固定下来，保证回放可重复
+    start = time.perf_counter()
+    with use_clock(clock), use_screen(ReplayScreen(recording, clock)), use_input(fake), \
+            use_ocr(ReplayOcr(recording)):
+        ok = run_target(target)
+    real = time.perf_counter() - start
+
+    recorded = [e['kind'] for e in recording.events if e['kind'] not in ('ocr',)]
+    replayed = [e['kind'] for e in fake.events]
+    status = '一致' if recorded == replayed else '不一致'
+    print(f"[回放] {len(recording)} 帧, 耗时 {clock.elapsed:.2f}秒（虚拟时间，实际 {real:.2f}秒）, "
+          f"输入事件 录制 {len(recorded)} / 回放 {len(replayed)} ({status})")
+    return ok, fake.events
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="录制/回放任务运行")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('record', help="真实运行并录制")
+    p.add_argument('target', help="任务文件 (.json) 或 signin")
+    p.add_argument('out_dir', help="录制输出目录")
+    p = sub.add_parser('replay', help="离线回放")
+    p.add_argument('target', help="任务文件 (.json) 或 signin")
+    p.add_argument('rec_dir', help="录制目录")
+    p.add_argument('--seed', type=int, default=0, help="随机种子")
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        ok = record(args.target, args.out_dir)
+    else:
+        ok, _ = replay(args.target, args.rec_dir, seed=args.seed)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,722 @@
+# -*- coding: utf-8 -*-
+"""
+任务执行器
+直接解释执行任务 JSON 中的步骤，不再生成代码再 exec
+- 通过处理函数注册表执行每种步骤
+- 整个任务共享一个执行上下文（图像识别、鼠标、屏幕/输入设备、OCR、变量）
+- 统一处理循环、条件（如果图片存在/否则）、多图匹配、超时、取消/暂停和事件回调
+- 每步执行后保存断点，失败后可从失败的步骤继续（--resume），步骤可按策略重试
+
+用法: python task_runner.py tasks/example.json
+      python task_runner.py tasks/example.json --resume
+      python -m autotask.runner tasks/example.json
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+
+from autotask.models import STEP_TYPES, PARAM_DEFAULTS, TaskConfig, find_blocks
+from autotask.paths import PROJECT_DIR
+from autotask import trace
+from autotask.trace import span
+from autotask.screen import get_screen
+from autotask.inputs import get_input
+from autotask.ocr import get_ocr, OcrError
+from autotask.clock import get_clock
+from autotask.checkpoint import RetryPolicy, StepFailed, task_checkpoint
+
+# auto_signin 位于项目根目录
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+WX_PUSH_URL = 'https://xiaoxi.qxbl.de5.net/wxsend'
+
+
+class TaskCancelled(Exception):
+    """任务被取消"""
+
+
+class StepTimeout(Exception):
+    """步骤执行超时"""
+
+
+class RunContext:
+    """执行上下文：一次任务运行中所有步骤共享"""
+
+    def __init__(self, settings=None):
+        from auto_signin import ImageFinder, HumanMouse
+        self.settings = settings or {}
+        self.finder = ImageFinder()
+        self.mouse = HumanMouse()
+        self.variables = {}
+        self.step_deadline = None
+        self.on_event = None
+        self._cancel = threading.Event()
+        self._resume = threading.Event()
+        self._resume.set()
+
+    @property
+    def screen(self):
+        return get_screen()
+
+    @property
+    def input(self):
+        return get_input()
+
+    @property
+    def ocr(self):
+        return get_ocr()
+
+    def emit(self, event, **data):
+        """发送执行事件（步骤内的匹配度、识别结果等）"""
+        if self.on_event:
+            try:
+                self.on_event(event, data)
+            except Exception as e:
+                print(f"  [!] 事件回调异常: {e}")
+
+    def resolve_path(self, path):
+        """模板库引用原样返回；相对路径优先按当前目录查找，找不到时按脚本目录解析，
+        其它电脑上的绝对路径按其中的 images/ 定位到本项目（见 autotask.templates）"""
+        from autotask.templates import resolve_path
+        return resolve_path(path)
+
+    def check(self):
+        """检查取消/暂停/超时，步骤内的长操作应定期调用"""
+        if not self._resume.is_set():
+            self._resume.wait()
+        if self._cancel.is_set():
+            raise TaskCancelled()
+        if self.step_deadline is not None and get_clock().time() > self.step_deadline:
+            raise StepTimeout()
+
+    def sleep(self, seconds):
+        """可被取消的等待（虚拟时钟下立即推进时间）"""
+        clock = get_clock()
+        end = clock.time() + float(seconds)
+        with span('sleep', 'sleep', seconds=float(seconds)):
+            while True:
+                self.check()
+                remaining = end - clock.time()
+                if remaining <= 0:
+                    return
+                if clock.simulated:
+                    clock.sleep(remaining)
+                else:
+                    self._cancel.wait(min(remaining, 0.2))
+
+
+# ==================== 步骤处理函数 ====================
+
+HANDLERS = {}
+
+
+def handler(step_type):
+    """注册步骤处理函数"""
+    def decorator(func):
+        HANDLERS[step_type] = func
+        return func
+    return decorator
+
+
+def substitute_vars(text, variables):
+    """替换 {变量名} 引用"""
+    for name, value in variables.items():
+        text = text.replace('{' + name + '}', str(value))
+    return text
+
+
+def _wait_image(ctx, params):
+    path = ctx.resolve_path(params['image_path'])
+    timeout = float(params['timeout'])
+    confidence = float(params['confidence'])
+    name = os.path.basename(path)
+    if ctx.finder.load_template(path) is None:
+        print(f"  [!] 图片不存在或无法读取: {path}")
+        return None
+
+    end = get_clock().time() + timeout
+    while True:
+        ctx.check()
+        pos, score = ctx.finder.locate(path)
+        if score >= confidence:
+            print(f"  [√] 找到 {name} (匹配度: {score:.1%})")
+            ctx.emit('match', image=name, score=round(score, 4), found=True)
+            return pos
+        if get_clock().time() >= end:
+            print(f"  [x] 等待超时: {name} (最高: {score:.1%})")
+            ctx.emit('match', image=name, score=round(score, 4), found=False)
+            return None
+        ctx.sleep(0.5)
+
+
+@handler('click_image')
+def _click_image(ctx, params):
+    pos = _wait_image(ctx, params)
+    if pos:
+        ctx.mouse.click(pos[0], pos[1])
+        return True
+    return False
+
+
+@handler('wait_image')
+def _wait_image_step(ctx, params):
+    return _wait_image(ctx, params) is not None
+
+
+@handler('input_text')
+def _input_text(ctx, params):
+    if params.get('clear_first'):
+        ctx.input.hotkey("ctrl", "a")
+    # 使用剪贴板方式输入，支持中文
+    ctx.input.copy(str(params['text']))
+    ctx.input.hotkey("ctrl", "v")
+    ctx.sleep(0.2)
+
+
+@handler('wait_time')
+def _wait_time(ctx, params):
+    ctx.sleep(params['seconds'])
+
+
+@handler('open_url')
+def _open_url(ctx, params):
+    ctx.input.open_url(params['url'])
+    ctx.sleep(3)
+
+
+@handler('long_press')
+def _long_press(ctx, params):
+    x, y = int(params['x']), int(params['y'])
+    if x == 0 and y == 0:
+        x, y = ctx.input.position()
+    ctx.input.mouse_down(x, y)
+    try:
+        ctx.sleep(params['duration'])
+    finally:
+        ctx.input.mouse_up()
+
+
+@handler('paste')
+def _paste(ctx, params):
+    ctx.input.hotkey("ctrl", "v")
+    ctx.sleep(0.3)
+
+
+@handler('open_app')
+def _open_app(ctx, params):
+    app_path = params['app_path']
+    if os.path.exists(app_path):
+        ctx.input.open_app(app_path)
+        print(f"  [√] 已启动: {app_path}")
+        ctx.sleep(2)
+    else:
+        print(f"  [!] 程序不存在: {app_path}")
+
+
+@handler('clipboard_set')
+def _clipboard_set(ctx, params):
+    ctx.input.copy(str(params['content']))
+
+
+@handler('ocr_region')
+def _ocr_region(ctx, params, idx=0):
+    x1, y1, x2, y2 = (int(params[k]) for k in ('x1', 'y1', 'x2', 'y2'))
+    var_name = params['var_name']
+    retry_count = int(params['retry_count'])
+    retry_interval = params['retry_interval']
+
+    for attempt in range(retry_count):
+        ctx.check()
+        with span('capture', 'vision', region=[x1, y1, x2, y2]):
+            screenshot = ctx.screen.grab(bbox=(x1, y1, x2, y2))
+        get_clock().charge('capture')
+        # 保存截图用于调试（模拟运行时不覆盖）
+        if not get_clock().simulated:
+            debug_dir = os.path.join(PROJECT_DIR, "images")
+            os.makedirs(debug_dir, exist_ok=True)
+            screenshot.save(os.path.join(debug_dir, f"_ocr_debug_{idx}.png"))
+        print(f"  [OCR] 第 {attempt + 1}/{retry_count} 次尝试, 截图区域: ({x1},{y1}) - ({x2},{y2})")
+
+        # 调用 OCR 引擎（默认 Umi-OCR HTTP API）
+        get_clock().charge('ocr')
+        try:
+            result_text = ctx.ocr.recognize(screenshot)
+            if result_text:
+                ctx.variables[var_name] = result_text
+                print(f"  [OCR] 识别成功: {result_text}")
+                ctx.emit('ocr', text=result_text, attempt=attempt + 1)
+                return result_text
+            print(f"  [OCR] 识别结果为空，等待 {retry_interval} 秒后重试...")
+        except OcrError as e:
+            print(f"  [OCR] 识别失败: {e}，等待 {retry_interval} 秒后重试...")
+        except Exception as e:
+            print(f"  [OCR] 请求失败: {e}")
+            print("  [OCR] 请确保Umi-OCR已启动并开启HTTP服务(端口1224)")
+
+        if attempt < retry_count - 1:
+            ctx.sleep(retry_interval)
+
+    ctx.variables[var_name] = ""
+    print(f"  [OCR] 重试 {retry_count} 次后仍然失败!")
+    return ""
+
+
+@handler('press_key')
+def _press_key(ctx, params):
+    mods = str(params.get('modifiers', '')).strip()
+    key = str(params.get('key', 'enter'))
+    if mods:
+        # 支持逗号分隔的修饰键
+        mod_list = [m.strip() for m in mods.replace('+', ',').split(',') if m.strip()]
+        key_list = [k.strip() for k in key.split(',') if k.strip()]
+        ctx.input.hotkey(*(mod_list + key_list))
+    else:
+        ctx.input.press(key)
+
+
+@handler('wx_push')
+def _wx_push(ctx, params):
+    from auto_signin import WxPush
+    config = {'enabled': True, 'url': WX_PUSH_URL, 'token': params['token']}
+    # 支持变量引用，如 {result} 会被替换为变量值
+    title = substitute_vars(str(params['title']), ctx.variables)
+    content = substitute_vars(str(params['content']), ctx.variables)
+    return WxPush.send_async(title, content, config)
+
+
+@handler('mouse_drag')
+def _mouse_drag(ctx, params):
+    start_x, start_y = int(params['start_x']), int(params['start_y'])
+    end_x, end_y = int(params['end_x']), int(params['end_y'])
+    ctx.input.move_to(start_x, start_y)
+    ctx.sleep(0.1)
+    ctx.input.drag(end_x - start_x, end_y - start_y, duration=float(params['duration']))
+
+
+@handler('close_app')
+def _close_app(ctx, params):
+    process_name = params['process_name']
+    try:
+        ctx.input.kill_process(process_name)
+        print(f"  [√] 已关闭: {process_name}")
+    except Exception as e:
+        print(f"  [!] 关闭失败: {e}")
+
+
+BROWSER_PROCESSES = {
+    'chrome': ['chrome.exe', 'chromedriver.exe'],
+    'edge': ['msedge.exe', 'msedgedriver.exe'],
+    'firefox': ['firefox.exe', 'geckodriver.exe'],
+    'all': ['chrome.exe', 'msedge.exe', 'firefox.exe', 'chromedriver.exe', 'msedgedriver.exe', 'geckodriver.exe']
+}
+
+
+@handler('close_browser')
+def _close_browser(ctx, params):
+    browser_type = params['browser_type']
+    for proc in BROWSER_PROCESSES.get(browser_type, BROWSER_PROCESSES['all']):
+        try:
+            ctx.input.kill_process(proc)
+        except Exception:
+            pass
+    print(f"  [√] 已关闭浏览器: {browser_type}")
+
+
+def probe_images(ctx, paths, confidence, timeout):
+    """在同一帧截图上依次匹配多个模板，返回第一个匹配的 (序号, 坐标)，都未匹配返回 (None, None)"""
+    resolved = [ctx.resolve_path(p) if p else p for p in paths]
+    ctx.check()
+    return ctx.finder.probe(resolved, confidence=confidence, timeout=float(timeout), sleep=ctx.sleep)
+
+
+# ==================== 执行器 ====================
+
+class TaskRunner:
+    """任务执行器"""
+
+    def __init__(self, config: TaskConfig, on_event=None, resume=None, checkpoint=None):
+        """resume: 是否从断点继续，None 时取 settings 中的 auto_resume"""
+        self.config = config
+        self.on_event = on_event
+        self.ctx = RunContext(config.settings)
+        self.ctx.on_event = on_event
+        self.checkpoint = checkpoint or task_checkpoint(config)
+        self.blocks = find_blocks(config.step_manager.steps)
+        self.from_checkpoint = config.settings.get('auto_resume', False) if resume is None else resume
+
+    def _emit(self, event, **data):
+        self.ctx.emit(event, **data)
+
+    def cancel(self):
+        self.ctx._cancel.set()
+        self.ctx._resume.set()
+
+    def pause(self):
+        self.ctx._resume.clear()
+
+    def resume(self):
+        self.ctx._resume.set()
+
+    def _params(self, step):
+        """补充缺失的默认参数（兼容旧配置文件）"""
+        params = dict(step.params)
+        for name in STEP_TYPES.get(step.step_type, {}).get('params', []):
+            if name not in params:
+                params[name] = PARAM_DEFAULTS.get(name, '')
+        return params
+
+    def _error_push_config(self):
+        """错误通知使用第一个推送步骤的令牌"""
+        for step in self.config.step_manager.steps:
+            if step.enabled and step.step_type == 'wx_push':
+                return {'enabled': True, 'url': WX_PUSH_URL, 'token': step.params.get('token', '')}
+        return None
+
+    def _retry_policy(self, step):
+        return RetryPolicy.from_settings(self.ctx.settings.get('retry'), step.params.get('retry'))
+
+    def _attempt_step(self, idx, step):
+        """按重试策略执行步骤，返回 (结果, 错误信息)；策略要求终止时抛出 StepFailed"""
+        policy = self._retry_policy(step)
+        result, error = None, None
+        for attempt in range(1, policy.attempts + 1):
+            try:
+                result, error = self.run_step(idx, step), None
+            except StepTimeout:
+                result, error = None, '步骤超时'
+                print(f"  [!] 步骤{idx} 超时")
+            except (TaskCancelled, StepFailed):
+                raise
+            except Exception as e:
+                if attempt >= policy.attempts:
+                    raise
+                result, error = None, f"{type(e).__name__}: {e}"
+                print(f"  [!] 步骤{idx} 出错: {error}")
+            if error is None and result is not False:
+                return result, None
+            if attempt < policy.attempts:
+                delay = policy.delay_for(attempt)
+                print(f"  [重试] {delay:.1f}秒后第 {attempt + 1}/{policy.attempts} 次尝试")
+                self.ctx.sleep(delay)
+        if policy.abort:
+            raise StepFailed(idx, error or '执行结果为失败')
+        return result, error
+
+    def run_step(self, idx, step):
+        """执行单个步骤，返回处理函数的结果"""
+        func = HANDLERS.get(step.step_type)
+        if func is None:
+            print(f"  [!] 不支持的步骤类型: {step.step_type}")
+            return False
+        params = self._params(step)
+        step_timeout = self.ctx.settings.get('step_timeout')
+        self.ctx.step_deadline = get_clock().time() + float(step_timeout) if step_timeout else None
+        try:
+            if step.step_type == 'ocr_region':
+                return func(self.ctx, params, idx=idx)
+            return func(self.ctx, params)
+        finally:
+            self.ctx.step_deadline = None
+
+    def run(self):
+        """执行所有步骤，返回是否完成（按设置开启追踪时结束后导出追踪文件）"""
+        target = trace.trace_target(self.ctx.settings)
+        own_trace = target is not None and not trace.enabled()
+        if own_trace:
+            trace.enable()
+        try:
+            with span('task', 'task', task=self.config.name):
+                return self._run()
+        finally:
+            if own_trace:
+                self._save_trace(trace.disable(), target)
+
+    def _save_trace(self, tracer, target):
+        """导出追踪文件并打印耗时最多的步骤"""
+        name = re.sub(r'[\\/:*?"<>|\s]+', '_', self.config.name) or 'task'
+        try:
+            files = trace.save(tracer, target, name=name)
+        except OSError as e:
+            print(f"  [追踪] 导出失败: {e}")
+            return
+        print("\n[追踪] 耗时最多的步骤:")
+        for step_name, count, total in tracer.summary('step')[:5]:
+            print(f"  {step_name}: {total / 1000:.2f}秒" + (f" ({count}次)" if count > 1 else ""))
+        for path in files:
+            print(f"[追踪] 已导出: {path}")
+
+    def _run(self):
+        from auto_signin import WxPush
+        steps = self.config.step_manager.steps
+        settings = self.ctx.settings
+        digest = bool(settings.get('push_digest'))
+        if digest:
+            WxPush.begin_digest(settings.get('digest_title', '任务汇总'),
+                                max_items=settings.get('digest_max_items', 10),
+                                max_wait=settings.get('digest_max_wait', 600))
+
+        print("=" * 50)
+        print(f"开始执行自动化任务: {self.config.name}")
+        print("=" * 50)
+        self._emit('task_start', name=self.config.name, total=len(steps))
+        task_start = get_clock().time()
+
+        loop_stack = []  # [{'start': 循环开始下标, 'count': 次数, 'iter': 当前轮次}]
+        pc = 0
+        current = 0
+        if self.from_checkpoint:
+            state = self.checkpoint.load()
+            if state:
+                pc = current = state['pc']
+                loop_stack = state.get('loop_stack', [])
+                self.ctx.variables.update(state.get('variables', {}))
+                print(f"[断点] 从步骤{pc + 1} 继续（断点时间 {state['updated']}）")
+                self._emit('resume', index=pc + 1)
+        ok = False
+        try:
+            while pc < len(steps) or loop_stack:
+                if pc >= len(steps):
+                    # 未闭合的循环：到末尾视为循环结束
+                    frame = loop_stack[-1]
+                    frame['iter'] += 1
+                    if frame['iter'] < frame['count']:
+                        print(f"  第 {frame['iter'] + 1}/{frame['count']} 次循环")
+                        pc = frame['start'] + 1
+                    else:
+                        loop_stack.pop()
+                    continue
+
+                step = steps[pc]
+                idx = pc + 1
+                current = pc
+                pc += 1
+                if not step.enabled:
+                    continue
+                self.ctx.check()
+
+                if step.step_type == 'loop_start':
+                    count = int(step.params.get('loop_count', 3))
+                    print(f"步骤{idx}: 循环开始 ({count}次)")
+                    if count <= 0:
+                        pc = self._skip_loop(pc)
+                        continue
+                    loop_stack.append({'start': idx - 1, 'count': count, 'iter': 0})
+                    print(f"  第 1/{count} 次循环")
+                    continue
+                if step.step_type in ('if_image', 'else', 'end_if', 'first_match', 'case', 'end_match'):
+                    pc = self._branch(idx, step, pc)
+                    continue
+                if step.step_type == 'loop_end':
+                    if loop_stack:
+                        frame = loop_stack[-1]
+                        frame['iter'] += 1
+                        if frame['iter'] < frame['count']:
+                            print(f"  第 {frame['iter'] + 1}/{frame['count']} 次循环")
+                            pc = frame['start'] + 1
+                            continue
+                        loop_stack.pop()
+                    print(f"步骤{idx}: 循环结束")
+                    continue
+
+                name = STEP_TYPES.get(step.step_type, {}).get('name', step.step_type)
+                print(f"步骤{idx}: {name}")
+                self._emit('step_start', index=idx, step_id=step.id, step_type=step.step_type)
+                start = get_clock().time()
+                result, error = None, None
+                try:
+                    with span(f"步骤{idx} {name}", 'step', index=idx, step_type=step.step_type) as sp:
+                        result, error = self._attempt_step(idx, step)
+                        sp.set(result=result)
+                except StepFailed as e:
+                    error = e.reason
+                    raise
+                finally:
+                    self._emit('step_end', index=idx, step_id=step.id, step_type=step.step_type,
+                               duration=get_clock().time() - start, result=result, error=error)
+                self._save_checkpoint(pc, loop_stack)
+
+            ok = True
+            self.checkpoint.clear()
+            print("=" * 50)
+            print("任务执行完成")
+            print("=" * 50)
+        except TaskCancelled:
+            print("\n[中断] 任务已取消")
+            self._save_checkpoint(current, loop_stack, failed=True)
+        except KeyboardInterrupt:
+            print("\n[中断] 用户取消操作")
+            self._save_checkpoint(current, loop_stack, failed=True)
+        except Exception as e:
+            print(f"\n[错误] {e}")
+            if not isinstance(e, StepFailed):
+                import traceback
+                traceback.print_exc()
+            self._save_checkpoint(current, loop_stack, failed=True, error=str(e))
+            error_config = self._error_push_config() if digest else None
+            if error_config:
+                WxPush.send_async("任务失败", f"错误: {e}", error_config, urgent=True)
+        finally:
+            if digest:
+                WxPush.end_digest()
+            self._emit('task_end', ok=ok, duration=get_clock().time() - task_start)
+        return ok
+
+    def _branch(self, idx, step, pc):
+        """处理条件/匹配步骤，返回下一个执行位置"""
+        steps = self.config.step_manager.steps
+        block = self.blocks.get(idx - 1)
+        t = step.step_type
+        if block is None or t in ('end_if', 'end_match'):
+            # 结束步骤或不成对的控制步骤：直接往下执行
+            return pc
+        if t in ('else', 'case'):
+            # 执行完上一个分支，跳到块结束之后
+            return block['end'] + 1
+
+        params = self._params(step)
+        if t == 'if_image':
+            name = os.path.basename(str(params['image_path']))
+            with span(f"步骤{idx} 如果图片存在", 'step', index=idx, step_type=t) as sp:
+                _, pos = probe_images(self.ctx, [params['image_path']],
+                                      float(params['confidence']), params['probe_timeout'])
+                sp.set(result=pos is not None)
+            print(f"步骤{idx}: 如果图片存在 {name} -> {'是' if pos else '否'}")
+            self._emit('match', index=idx, image=name, found=pos is not None)
+            if pos:
+                if params.get('click_match'):
+                    self.ctx.mouse.click(pos[0], pos[1])
+                return pc
+            return (block['else'] if block['else'] is not None else block['end']) + 1
+
+        # first_match：所有分支的模板在同一帧截图上按顺序匹配，执行第一个匹配的分支
+        cases = block['cases']
+        if block['skipped']:
+            print(f"  [!] 步骤{'、'.join(str(j + 1) for j in block['skipped'])} "
+                  f"位于多图匹配和第一个匹配分支之间，不会执行")
+        case_params = [self._params(steps[c]) for c in cases]
+        with span(f"步骤{idx} 多图匹配", 'step', index=idx, step_type=t) as sp:
+            matched, pos = None, None
+            paths = [p['image_path'] for p in case_params]
+            if any(paths):
+                matched, pos = probe_images(self.ctx, paths, [float(p['confidence']) for p in case_params],
+                                            params['probe_timeout'])
+            sp.set(result=matched)
+        self._emit('match', index=idx, found=matched is not None,
+                   image=os.path.basename(str(paths[matched])) if matched is not None else '')
+        if matched is None:
+            # 没有匹配时执行图片路径为空的默认分支（如果有）
+            default = [c for c, p in zip(cases, case_params) if not p['image_path']]
+            if default:
+                print(f"步骤{idx}: 多图匹配 -> 默认分支 (步骤{default[0] + 1})")
+                return default[0] + 1
+            print(f"步骤{idx}: 多图匹配 -> 无匹配")
+            return block['end'] + 1
+        case_index = cases[matched]
+        print(f"步骤{idx}: 多图匹配 -> 步骤{case_index + 1} "
+              f"{os.path.basename(str(case_params[matched]['image_path']))}")
+        self.ctx.variables['match'] = os.path.splitext(os.path.basename(str(paths[matched])))[0]
+        if case_params[matched].get('click_match') and pos:
+            self.ctx.mouse.click(pos[0], pos[1])
+        return case_index + 1
+
+    def _save_checkpoint(self, pc, loop_stack, failed=False, error=None):
+        """保存断点：pc 为下次继续执行的步骤下标"""
+        try:
+            self.checkpoint.save(pc=pc, loop_stack=[dict(f) for f in loop_stack],
+                                 variables=self.ctx.variables, failed=failed, error=error)
+        except OSError as e:
+            print(f"  [断点] 保存失败: {e}")
+        if failed:
+            print(f"[断点] 已保存，可从步骤{pc + 1} 继续: 运行时加 --resume")
+
+    def _skip_loop(self, pc):
+        """跳过循环体，返回匹配的循环结束之后的位置"""
+        steps = self.config.step_manager.steps
+        depth = 1
+        while pc < len(steps):
+            step = steps[pc]
+            pc += 1
+            if not step.enabled:
+                continue
+            if step.step_type == 'loop_start':
+                depth += 1
+            elif step.step_type == 'loop_end':
+                depth -= 1
+                if depth == 0:
+                    break
+        return pc
+
+
+def run_task_file(task_file, on_event=None, codegen=False, resume=None):
+    """加载任务文件并执行
+
+    codegen=True 时改为执行生成的脚本代码（编译结果按任务内容哈希缓存）
+    resume=True 时从上次失败的步骤继续（断点按任务文件名保存）
+    """
+    if codegen:
+        from autotask.cache import run_cached
+        return _recorded(task_file, lambda: run_cached(task_file))
+    runner = load_runner(task_file, on_event=on_event, resume=resume)
+    return _recorded(task_file, runner.run)
+
+
+def _recorded(task_file, run):
+    """执行并把结果和耗时记录到任务库"""
+    from autotask.library import record_run
+    start = time.monotonic()
+    ok = False
+    try:
+        ok = bool(run())
+        return ok
+    finally:
+        record_run(task_file, ok, time.monotonic() - start)
+
+
+def load_runner(task_file, on_event=None, resume=None):
+    """加载任务文件，返回执行器（断点按任务文件名保存）"""
+    config = TaskConfig()
+    config.load(task_file)
+    checkpoint = task_checkpoint(config, name=os.path.splitext(os.path.basename(task_file))[0])
+    return TaskRunner(config, on_event=on_event, resume=resume, checkpoint=checkpoint)
+
+
+def run_target(target, on_event=None, resume=None):
+    """执行任务 JSON，或 'signin' 表示 auto_signin 的签到流程"""
+    if target == 'signin':
+        from auto_signin import AutoSignIn, CONFIG
+        return AutoSignIn(CONFIG, on_event=on_event).run(resume=bool(resume))
+    return run_task_file(target, on_event=on_event, resume=resume)
+
+
+def main(argv=None):
+    """命令行入口"""
+    import argparse
+    parser = argparse.ArgumentParser(description="执行自动化任务")
+    parser.add_argument("task_file", help="任务文件 (.json)")
+    parser.add_argument("--pause", action="store_true", help="执行结束后等待按回车再退出")
+    parser.add_argument("--codegen", action="store_true", help="执行生成的脚本代码（使用编译缓存）")
+    parser.add_argument("--resume", action="store_true", help="从上次失败的步骤继续")
+    parser.add_argument("--events", action="store_true", help="把执行事件以 JSON 行输出（供运行监视读取）")
+    parser.add_argument("--control", action="store_true", help="从标准输入读取 pause/resume/cancel 命令")
+    args = parser.parse_args(argv)
+
+    if args.events or args.control:
+        from autotask.monitor import EventWriter, serve_control
+        runner = load_runner(args.task_file, on_event=EventWriter() if args.events else None,
+                             resume=args.resume or None)
+        if args.control:
+            serve_control(runner)
+        success = _recorded(args.task_file, runner.run)
+    else:
+        success = run_task_file(args.task_file, codegen=args.codegen, resume=args.resume or None)
+    if args.pause:
+        input("\n按回车键退出...")
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+屏幕来源
+所有截图都通过 get_screen().grab(bbox) 获取，返回 PIL RGB 图像（与 ImageGrab.grab 相同）。
+默认使用真实屏幕；录制/回放时替换为 RecordingScreen / ReplayScreen，
+使任务可以在没有桌面的环境中（如 Linux 服务器）离线运行。
+"""
+
+import contextlib
+
+from autotask.lazy import lazy_import
+
+ImageGrab = lazy_import('PIL.ImageGrab')
+
+
+class ScreenSource:
+    """屏幕来源接口"""
+
+    def grab(self, bbox=None):
+        """截取屏幕（bbox 为 (左, 上, 右, 下)），返回 PIL RGB 图像"""
+        raise NotImplementedError
+
+    def size(self):
+        """屏幕尺寸 (宽, 高)"""
+        return self.grab().size
+
+
+class LiveScreen(ScreenSource):
+    """真实屏幕"""
+
+    def grab(self, bbox=None):
+        image = ImageGrab.grab(bbox=bbox)
+        return image.convert('RGB') if image.mode != 'RGB' else image
+
+
+class StaticScreen(ScreenSource):
+    """固定画面（模拟运行或测试用），未提供图像时为纯色画面"""
+
+    def __init__(self, image=None, size=(1920, 1080), color=(255, 255, 255)):
+        if image is None:
+            from PIL import Image
+            image = Image.new('RGB', size, color)
+        self.image = image.convert('RGB')
+
+    def grab(self, bbox=None):
+        # 整屏截图返回同一个图像对象，图像识别可复用上一次的匹配结果；调用方不应修改它
+        return self.image.crop(bbox) if bbox else self.image
+
+
+_screen = None
+
+
+def get_screen():
+    """当前屏幕来源（默认真实屏幕）"""
+    global _screen
+    if _screen is None:
+        _screen = LiveScreen()
+    return _screen
+
+
+def set_screen(source):
+    """替换屏幕来源，返回原来源"""
+    global _screen
+    previous, _screen = _screen, source
+    return previous
+
+
+@contextlib.contextmanager
+def use_screen(source):
+    """在 with 代码块内临时使用指定屏幕来源"""
+    previous = set_screen(source)
+    try:
+        yield source
+    finally:
+        set_screen(previous)
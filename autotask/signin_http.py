@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+协议签到（快速通道）
+浏览器流程是打开页面、识别按钮、等待转盘，实际只对应几次 HTTP 请求：
+转盘抽奖拿到兑换码，再到充值接口兑换。这里直接发送这些请求，几百毫秒完成签到；
+任何一步失败（未登录、Cookie 过期、遇到 Cloudflare 验证、接口变化）都由调用方回退到浏览器流程。
+
+- 复用 keep-alive 连接池
+- Cookie 保存在 tasks/.cookies/<名称>.json，服务器刷新的 Cookie 下次继续使用；
+  首次使用时从 CONFIG['http']['cookies'] 读取（登录后从浏览器开发者工具复制）
+- 接口地址可配置，离线测试时指向 autotask.mocksite 启动的本地替身服务器
+"""
+
+import json
+import os
+
+from autotask.paths import TASKS_DIR
+from autotask.trace import span
+
+COOKIE_DIR = os.path.join(TASKS_DIR, ".cookies")
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/124.0 Safari/537.36')
+
+
+class SignInApiError(Exception):
+    """协议签到失败，需要回退到浏览器流程"""
+
+
+def parse_cookie_string(text):
+    """解析浏览器复制的 'a=1; b=2' 格式 Cookie"""
+    cookies = {}
+    for part in (text or '').split(';'):
+        name, sep, value = part.strip().partition('=')
+        if sep and name:
+            cookies[name] = value
+    return cookies
+
+
+class SignInClient:
+    """签到接口客户端"""
+
+    def __init__(self, http_config, name='signin', session=None, cookie_dir=COOKIE_DIR):
+        """http_config: CONFIG['http']，需要 spin_url、redeem_url，可选 cookies、user_id、timeout"""
+        self.config = http_config
+        self.timeout = http_config.get('timeout', 10)
+        self.cookie_path = os.path.join(cookie_dir, f"{name}.json") if cookie_dir else None
+        self._session = session
+
+    @property
+    def session(self):
+        """懒加载 keep-alive 会话，首次使用时载入 Cookie"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+            self._session.headers['User-Agent'] = USER_AGENT
+            if self.config.get('user_id'):
+                # new-api 系站点的接口需要同时带上用户 ID
+                self._session.headers['New-Api-User'] = str(self.config['user_id'])
+            self.load_cookies()
+        return self._session
+
+    def load_cookies(self):
+        """优先读取上次保存的 Cookie，没有时使用配置中的 Cookie"""
+        jar = self._session.cookies
+        if self.cookie_path and os.path.exists(self.cookie_path):
+            try:
+                with open(self.cookie_path, 'r', encoding='utf-8') as f:
+                    for c in json.load(f):
+                        jar.set(c['name'], c['value'], domain=c.get('domain', ''), path=c.get('path', '/'))
+                return
+            except (OSError, ValueError, KeyError) as e:
+                print(f"  [协议] Cookie 文件无效，改用配置中的 Cookie: {e}")
+        cookies = self.config.get('cookies') or {}
+        if isinstance(cookies, str):
+            cookies = parse_cookie_string(cookies)
+        for name, value in cookies.items():
+            jar.set(name, value)
+
+    def save_cookies(self):
+        """原子写入当前 Cookie（服务器可能在响应中刷新了会话）"""
+        if not self.cookie_path or self._session is None:
+            return
+        data = [{'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path}
+                for c in self._session.cookies]
+        os.makedirs(os.path.dirname(self.cookie_path), exist_ok=True)
+        tmp = self.cookie_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.cookie_path)
+
+    def _drop_shadowed_cookies(self):
+        """配置中的 Cookie 没有域名，服务器下发同名 Cookie 后删除旧的，避免同时发送新旧两个值"""
+        jar = self._session.cookies
+        scoped = {c.name for c in jar if c.domain}
+        for c in [c for c in jar if not c.domain and c.name in scoped]:
+            jar.clear(c.domain, c.path, c.name)
+
+    def _post(self, url, payload=None, name='request'):
+        """发送 POST 请求，返回响应 JSON；非 JSON、HTTP 错误或 success=false 时抛出 SignInApiError"""
+        import requests
+        try:
+            with span(f'http_{name}', 'http') as sp:
+                response = self.session.post(url, json=payload or {}, timeout=self.timeout)
+                sp.set(status=response.status_code)
+        except requests.RequestException as e:
+            raise SignInApiError(f"请求失败: {e}")
+        self._drop_shadowed_cookies()
+        try:
+            body = response.json()
+        except ValueError:
+            hint = '，可能遇到了 Cloudflare 验证' if 'cloudflare' in response.text[:2000].lower() else ''
+            raise SignInApiError(f"状态码 {response.status_code}，返回的不是 JSON{hint}")
+        if response.status_code in (401, 403):
+            raise SignInApiError(f"未登录或 Cookie 已过期: {body.get('message', response.status_code)}")
+        if response.status_code != 200 or not body.get('success'):
+            raise SignInApiError(body.get('message') or f"状态码 {response.status_code}")
+        return body
+
+    def spin(self):
+        """转盘抽奖，返回兑换码"""
+        body = self._post(self.config['spin_url'], name='spin')
+        data = body.get('data')
+        code = data.get('code') if isinstance(data, dict) else data
+        if not code:
+            raise SignInApiError("抽奖成功但没有返回兑换码")
+        return str(code).strip()
+
+    def redeem(self, code):
+        """兑换，返回结果消息"""
+        body = self._post(self.config['redeem_url'], {'key': code}, name='redeem')
+        message = body.get('message') or '兑换成功'
+        if body.get('data') not in (None, ''):
+            message = f"{message} (额度: {body['data']})"
+        return message
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
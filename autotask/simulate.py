@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+模拟运行（dry-run）
+用虚拟时钟执行任务：所有等待立即返回并推进虚拟时间，截图/匹配/OCR 按估计耗时计时，
+屏幕换成录制回放或固定图片，鼠标键盘换成假设备，推送只打印不发送，也不读写断点。
+几分钟的任务几毫秒跑完，输出每个步骤的预计开始时间和耗时，用于调整步骤顺序和等待时间。
+
+用法:
+    python -m autotask.simulate tasks/Telegram.json
+    python -m autotask.simulate tasks/Telegram.json --replay recordings/telegram   # 用录制的画面
+    python -m autotask.simulate tasks/Telegram.json --screen images/page.png       # 固定画面
+    python -m autotask.simulate signin --clipboard ABC123 --cost ocr=1.5
+"""
+
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from autotask.clock import SimClock, use_clock
+from autotask.screen import StaticScreen, use_screen
+from autotask.inputs import FakeInput, use_input
+from autotask.ocr import StaticOcr, use_ocr
+from autotask.push import DryRunDispatcher, use_dispatcher
+from autotask.checkpoint import NullCheckpoint
+
+
+@dataclass
+class StepTiming:
+    """一个步骤的预计时间（虚拟秒，start 为相对任务开始的偏移）"""
+    index: int
+    name: str
+    start: float = 0.0
+    duration: float = 0.0
+    result: object = None
+    error: Optional[str] = None
+
+
+@dataclass
+class Simulation:
+    """一次模拟运行的结果"""
+    target: str
+    ok: bool = False
+    steps: List[StepTiming] = field(default_factory=list)
+    total: float = 0.0          # 预计总耗时（虚拟秒）
+    slept: float = 0.0          # 其中等待（sleep）的时间
+    real: float = 0.0           # 模拟实际花费的时间（秒）
+    inputs: list = field(default_factory=list)
+    pushes: list = field(default_factory=list)
+
+
+def _build(target, on_event):
+    """创建执行器，断点不落盘"""
+    if target == 'signin':
+        from auto_signin import AutoSignIn, CONFIG
+        runner = AutoSignIn(CONFIG, on_event=on_event)
+        runner.checkpoint = NullCheckpoint()
+        return runner
+    from autotask.models import TaskConfig
+    from autotask.runner import TaskRunner
+    config = TaskConfig()
+    config.load(target)
+    return TaskRunner(config, on_event=on_event, resume=False, checkpoint=NullCheckpoint())
+
+
+def simulate(target, screen=None, ocr=None, clipboard=None, costs=None, seed=0):
+    """用虚拟时钟执行任务，返回 Simulation
+
+    screen: 屏幕来源（默认纯白画面，只会走"未找到图片"的分支）
+    ocr: OCR 引擎（默认返回空文本）
+    clipboard: 读取剪贴板时依次返回的内容（如兑换码）
+    costs: 覆盖截图/匹配/OCR 的估计耗时，如 {'ocr': 1.5}
+    """
+    from autotask.models import STEP_TYPES
+
+    clock = SimClock(costs=costs)
+    fake = FakeInput(clipboard_values=clipboard)
+    dispatcher = DryRunDispatcher()
+    sim = Simulation(target=target)
+    running = {}
+
+    def on_event(event, data):
+        if event == 'step_start':
+            step_type = data.get('step_type', '')
+            name = STEP_TYPES.get(step_type, {}).get('name', step_type)
+            running[data['index']] = StepTiming(data['index'], name, start=clock.elapsed)
+        elif event == 'step_end' and data['index'] in running:
+            timing = running.pop(data['index'])
+            timing.duration = data.get('duration', 0.0)
+            timing.result = data.get('result')
+            timing.error = data.get('error')
+            sim.steps.append(timing)
+
+    random.seed(seed)  # 鼠标轨迹等随机量固定下来，多次模拟结果一致
+    real_start = time.perf_counter()
+    with use_clock(clock), use_screen(screen or StaticScreen()), use_input(fake), \
+            use_ocr(ocr or StaticOcr()), use_dispatcher(dispatcher):
+        sim.ok = bool(_build(target, on_event).run())
+    sim.real = time.perf_counter() - real_start
+    sim.total = clock.elapsed
+    sim.slept = clock.slept
+    sim.inputs = fake.events
+    sim.pushes = dispatcher.sent
+    return sim
+
+
+def print_timeline(sim):
+    """打印每个步骤的预计时间线"""
+    print("\n" + "=" * 64)
+    print(f"{'步骤':<6}{'名称':<28}{'开始':>10}{'耗时':>10}  结果")
+    print("-" * 64)
+    for s in sim.steps:
+        status = '超时/出错' if s.error else ('失败' if s.result is False else '完成')
+        print(f"{s.index:<6}{s.name[:26]:<28}{s.start:>9.1f}s{s.duration:>9.1f}s  {status}")
+    print("-" * 64)
+    print(f"预计总耗时 {sim.total:.1f}秒（其中等待 {sim.slept:.1f}秒），"
+          f"输入操作 {len(sim.inputs)} 个，推送 {len(sim.pushes)} 条")
+    print(f"模拟用时 {sim.real * 1000:.0f}毫秒，结果: {'完成' if sim.ok else '未完成'}")
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="用虚拟时钟模拟执行任务，估算每个步骤的耗时")
+    parser.add_argument('target', help="任务文件 (.json) 或 signin")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--replay', metavar='DIR', help="使用录制目录中的画面和 OCR 结果")
+    source.add_argument('--screen', metavar='IMAGE', help="使用固定图片作为屏幕画面")
+    parser.add_argument('--ocr-text', default='', help="OCR 识别结果（未使用 --replay 时）")
+    parser.add_argument('--clipboard', action='append', default=[], help="读取剪贴板时返回的内容，可重复")
+    parser.add_argument('--cost', action='append', default=[], metavar='KIND=SECONDS',
+                        help="操作估计耗时，如 ocr=1.5、capture=0.1、match=0.02")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    args = parser.parse_args(argv)
+
+    costs = {}
+    for item in args.cost:
+        kind, _, value = item.partition('=')
+        try:
+            costs[kind.strip()] = float(value)
+        except ValueError:
+            parser.error(f"无效的耗时设置: {item}")
+
+    screen, ocr, clipboard = None, StaticOcr(args.ocr_text), list(args.clipboard)
+    if args.replay:
+        from autotask.recording import Recording, ReplayScreen, ReplayOcr
+        recording = Recording(args.replay)
+        screen, ocr = ReplayScreen(recording), ReplayOcr(recording)
+        clipboard = clipboard or [e.get('text', '') for e in recording.events_of('paste')]
+    elif args.screen:
+        from PIL import Image
+        if not os.path.exists(args.screen):
+            parser.error(f"图片不存在: {args.screen}")
+        screen = StaticScreen(Image.open(args.screen))
+    if args.target == 'signin' and not clipboard:
+        # 签到流程先记下剪贴板原有内容，再等待新复制的兑换码，模拟时给一个占位兑换码
+        clipboard = ['', 'SIMULATED-CODE']
+
+    sim = simulate(args.target, screen=screen, ocr=ocr, clipboard=clipboard, costs=costs, seed=args.seed)
+    print_timeline(sim)
+    return 0 if sim.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+模板库（按内容寻址）
+模板图片按像素内容的哈希保存在 images/store/<哈希>.png，任务 JSON 中用「哈希 + 名称」引用:
+    "image_path": "tpl:3f2a9c1b7e4d5a60/sousuo.png"
+
+- 内容相同的截图（即使文件名不同、编码不同）只保存一份，只解码和缓存一次
+- 引用与所在电脑的目录无关，任务文件和 images/store 一起复制到其它电脑即可运行，不需要改路径
+- 名称只用于显示（日志、{match} 变量），匹配只看哈希
+- 仍然支持普通路径；其它电脑上保存的绝对路径（如 C:/Users/.../images/telegram/a.png）
+  找不到时按其中的 images/ 部分定位到本项目的 images 目录
+
+用法:
+    python -m autotask.templates import tasks/Telegram.json     # 把任务中的图片导入模板库并改为引用
+    python -m autotask.templates add images/button.png           # 导入图片，输出引用
+    python -m autotask.templates dupes [images]                  # 查找内容相同的图片
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+
+from autotask.lazy import lazy_import
+from autotask.paths import PROJECT_DIR, IMAGES_DIR
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+STORE_DIR = os.path.join(IMAGES_DIR, "store")
+REF_PREFIX = 'tpl:'
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp')
+_DIGEST = re.compile(r'[0-9a-f]{16}')
+
+
+def parse_ref(value):
+    """解析模板引用，返回 (哈希, 名称)；不是引用返回 None"""
+    if not isinstance(value, str) or not value.startswith(REF_PREFIX):
+        return None
+    digest, _, name = value[len(REF_PREFIX):].partition('/')
+    return (digest, name) if _DIGEST.fullmatch(digest) else None
+
+
+def make_ref(digest, name=''):
+    return f"{REF_PREFIX}{digest}/{name}"
+
+
+def image_digest(image):
+    """图像内容哈希（尺寸 + BGR 像素），与文件名和编码无关"""
+    image = np.ascontiguousarray(image)
+    h = hashlib.sha256()
+    h.update(repr(image.shape).encode())
+    h.update(image.tobytes())
+    return h.hexdigest()[:16]
+
+
+def read_image(path):
+    """读取图片为 BGR 数组（支持中文路径），无法读取返回 None"""
+    try:
+        data = np.fromfile(path, dtype=np.uint8)
+    except OSError:
+        return None
+    return cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
+
+
+def relocate(path):
+    """普通路径定位到实际文件，找不到时原样返回
+
+    相对路径优先按当前目录查找，其次按项目目录；其它电脑上的绝对路径按最后一个 images/ 之后的部分
+    在本项目的 images 目录中查找
+    """
+    if not path or os.path.exists(path):
+        return path
+    if not os.path.isabs(path):
+        candidate = os.path.join(PROJECT_DIR, path)
+        if os.path.exists(candidate):
+            return candidate
+    parts = re.split(r'[\\/]+', path)
+    for i in range(len(parts) - 2, -1, -1):
+        if parts[i].lower() == 'images':
+            candidate = os.path.join(IMAGES_DIR, *parts[i + 1:])
+            if os.path.exists(candidate):
+                return candidate
+            break
+    return path
+
+
+def resolve_path(value):
+    """执行器使用：模板引用原样返回（由 ImageFinder 从模板库读取），普通路径定位到实际文件"""
+    if parse_ref(value):
+        return value
+    return relocate(value)
+
+
+class TemplateStore:
+    """模板库目录"""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+
+    def path(self, digest):
+        return os.path.join(self.root, f"{digest}.png")
+
+    def __contains__(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def file_for(self, value):
+        """模板引用或路径对应的图片文件"""
+        ref = parse_ref(value)
+        return self.path(ref[0]) if ref else relocate(value)
+
+    def add_image(self, image):
+        """保存 BGR 图像（已有相同内容时不重复保存），返回哈希"""
+        digest = image_digest(image)
+        path = self.path(digest)
+        if not os.path.exists(path):
+            ok, data = cv2.imencode('.png', image)
+            if not ok:
+                raise ValueError("图片编码失败")
+            os.makedirs(self.root, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            data.tofile(tmp)
+            os.replace(tmp, path)
+        return digest
+
+    def add_file(self, path, name=None):
+        """导入图片文件，返回引用；已经是引用时原样返回；无法读取时抛出 ValueError"""
+        if parse_ref(path):
+            return path
+        image = read_image(relocate(path))
+        if image is None:
+            raise ValueError(f"图片不存在或无法读取: {path}")
+        return make_ref(self.add_image(image), name or os.path.basename(path.replace('\\', '/')))
+
+
+DEFAULT_STORE = TemplateStore()
+
+
+def template_file(value):
+    """模板引用或路径对应的图片文件（默认模板库）"""
+    return DEFAULT_STORE.file_for(value)
+
+
+def exists(value):
+    return bool(value) and os.path.exists(template_file(value))
+
+
+# ==================== 命令行 ====================
+
+def import_task(task_file, store=DEFAULT_STORE):
+    """把任务中引用的图片导入模板库并改为引用，返回 (导入数, 找不到的路径列表)"""
+    with open(task_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    imported, missing, digests = 0, [], {}
+    for step in data.get('steps', []):
+        params = step.get('params') or {}
+        value = params.get('image_path')
+        if not value or parse_ref(value):
+            continue
+        try:
+            ref = store.add_file(value)
+        except ValueError:
+            missing.append(value)
+            continue
+        params['image_path'] = ref
+        digests.setdefault(parse_ref(ref)[0], set()).add(os.path.basename(value.replace('\\', '/')))
+        imported += 1
+    if imported:
+        tmp = f"{task_file}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, task_file)
+    for digest, names in digests.items():
+        if len(names) > 1:
+            print(f"  [模板] 内容相同: {', '.join(sorted(names))} -> {digest}")
+    return imported, missing
+
+
+def find_duplicates(directory=IMAGES_DIR):
+    """查找内容相同的图片，返回 [[路径...]]（模板库目录除外）"""
+    groups = {}
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != STORE_DIR]
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTS):
+                path = os.path.join(root, name)
+                image = read_image(path)
+                if image is not None:
+                    groups.setdefault(image_digest(image), []).append(path)
+    return [paths for paths in groups.values() if len(paths) > 1]
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="模板库（按内容寻址）")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('import', help="把任务中的图片导入模板库并改为引用")
+    p.add_argument('task_files', nargs='+')
+    p = sub.add_parser('add', help="导入图片，输出引用")
+    p.add_argument('images', nargs='+')
+    p = sub.add_parser('dupes', help="查找内容相同的图片")
+    p.add_argument('directory', nargs='?', default=IMAGES_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        failed = False
+        for task_file in args.task_files:
+            imported, missing = import_task(task_file)
+            print(f"[模板] {task_file}: 导入 {imported} 张图片")
+            for path in missing:
+                print(f"  [!] 找不到图片，保留原路径: {path}")
+            failed = failed or bool(missing)
+        return 1 if failed else 0
+    if args.command == 'add':
+        for path in args.images:
+            try:
+                print(DEFAULT_STORE.add_file(path))
+            except ValueError as e:
+                print(f"[!] {e}")
+        return 0
+    groups = find_duplicates(args.directory)
+    for paths in groups:
+        print("[模板] 内容相同:\n    " + "\n    ".join(paths))
+    print(f"共 {len(groups)} 组重复图片")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
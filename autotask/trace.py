@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+运行追踪
+记录嵌套的耗时区间（单调时钟），可导出为 Chrome trace_event JSON
+（chrome://tracing 或 https://ui.perfetto.dev 打开）和 JSONL。
+
+开启方式：
+- 环境变量 AUTOTASK_TRACE=1（输出到 tasks/.traces）或 AUTOTASK_TRACE=路径(.json/.jsonl)
+- 任务 settings 中 "trace": true 或 "trace": "路径"
+未开启时 span() 返回共享的空对象，几乎没有开销。
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+
+from autotask.paths import TASKS_DIR
+
+TRACE_DIR = os.path.join(TASKS_DIR, ".traces")
+
+
+class _NullSpan:
+    """未开启追踪时使用的空区间"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """一个耗时区间"""
+
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start', 'id', 'parent')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.parent = stack[-1].id if stack else None
+        self.id = self.tracer._next_id()
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer._record(self, end)
+        return False
+
+    def set(self, **args):
+        """补充区间参数（如匹配度、识别文本）"""
+        self.args.update(args)
+
+
+class Tracer:
+    """追踪记录器"""
+
+    def __init__(self):
+        self.events = []
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = 0
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _next_id(self):
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def _record(self, span, end):
+        event = {
+            'id': span.id,
+            'parent': span.parent,
+            'name': span.name,
+            'cat': span.cat,
+            'start_us': (span.start - self.origin) / 1000,
+            'dur_us': (end - span.start) / 1000,
+            'tid': threading.get_ident(),
+            'thread': threading.current_thread().name,
+            'args': span.args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def span(self, name, cat='', **args):
+        return Span(self, name, cat, args)
+
+    def to_chrome(self):
+        """转换为 Chrome trace_event 格式"""
+        with self._lock:
+            events = list(self.events)
+        trace_events = []
+        threads = {}
+        for e in events:
+            threads[e['tid']] = e['thread']
+            trace_events.append({
+                'name': e['name'], 'cat': e['cat'] or 'default', 'ph': 'X',
+                'ts': e['start_us'], 'dur': e['dur_us'],
+                'pid': self.pid, 'tid': e['tid'], 'args': e['args'],
+            })
+        for tid, name in threads.items():
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid,
+                                 'tid': tid, 'args': {'name': name}})
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome(), f, ensure_ascii=False, default=str)
+
+    def export_jsonl(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e['start_us'])
+        with open(path, 'w', encoding='utf-8') as f:
+            for e in events:
+                f.write(json.dumps(e, ensure_ascii=False, default=str) + '\n')
+
+    def summary(self, cat=None):
+        """按区间名称汇总总耗时（毫秒），按耗时降序"""
+        totals = {}
+        with self._lock:
+            for e in self.events:
+                if cat is None or e['cat'] == cat:
+                    count, total = totals.get(e['name'], (0, 0.0))
+                    totals[e['name']] = (count + 1, total + e['dur_us'] / 1000)
+        return sorted(((name, c, t) for name, (c, t) in totals.items()), key=lambda x: -x[2])
+
+
+_tracer = None
+
+
+def span(name, cat='', **args):
+    """开始一个追踪区间（配合 with 使用），未开启追踪时为空操作"""
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, cat, args)
+
+
+def traced(name, cat=''):
+    """装饰器：把整个函数调用记录为一个区间"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, name, cat, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enabled():
+    return _tracer is not None
+
+
+def get_tracer():
+    return _tracer
+
+
+def enable():
+    """开启追踪（已开启时返回当前记录器）"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def disable():
+    """关闭追踪，返回关闭前的记录器"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def trace_target(settings=None):
+    """根据环境变量和任务设置确定追踪输出；未开启返回 None，开启返回路径或 ''（默认位置）"""
+    value = os.environ.get('AUTOTASK_TRACE', '').strip()
+    if value and value.lower() not in ('0', 'false', 'no'):
+        return '' if value.lower() in ('1', 'true', 'yes') else value
+    value = (settings or {}).get('trace')
+    if value:
+        return value if isinstance(value, str) else ''
+    return None
+
+
+def save(tracer, target, name='trace'):
+    """导出追踪结果，返回写出的文件列表
+
+    target 以 .jsonl 结尾只导出 JSONL，以 .json 结尾只导出 Chrome 格式，
+    为空时在 tasks/.traces 下同时导出两种格式。
+    """
+    if target.endswith('.jsonl'):
+        tracer.export_jsonl(target)
+        return [target]
+    if target.endswith('.json'):
+        tracer.export_chrome(target)
+        return [target]
+    base = os.path.join(target or TRACE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}")
+    tracer.export_chrome(base + '.json')
+    tracer.export_jsonl(base + '.jsonl')
+    return [base + '.json', base + '.jsonl']
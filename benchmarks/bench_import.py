@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+导入耗时基准
+在全新的 Python 进程中分别导入各入口模块，统计冷启动耗时（取多次运行的最小值）
+
+用法: python benchmarks/bench_import.py [-n 次数]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ('空解释器', 'pass'),
+    ('核心包 autotask', 'import autotask'),
+    ('核心包 + auto_signin', 'import autotask, auto_signin'),
+    ('执行器加载任务', 'from autotask import TaskConfig; TaskConfig().load("tasks/Telegram.json")'),
+    ('GUI 入口 auto_task_gui', 'import auto_task_gui'),
+    ('重量级依赖 cv2/numpy/requests/PIL', 'import cv2, numpy, requests; from PIL import ImageGrab'),
+]
+
+
+def measure(stmt, runs):
+    """返回多次冷启动中的最短耗时（秒），导入失败返回 None"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', stmt], cwd=PROJECT_DIR,
+                                capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入耗时基准")
+    parser.add_argument('-n', '--runs', type=int, default=5, help="每项运行次数")
+    args = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]}")
+    for name, stmt in CASES:
+        best = measure(stmt, args.runs)
+        value = '导入失败' if best is None else f"{best * 1000:.0f} ms"
+        print(f"  {name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
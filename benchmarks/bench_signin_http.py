@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+协议签到基准
+启动本地替身服务器（autotask.mocksite），反复执行"抽奖 + 兑换"，
+对比复用连接（同一个客户端）和每次新建连接的耗时；--delay 模拟网络往返延迟。
+
+用法: python benchmarks/bench_signin_http.py [-n 次数] [--delay 0.05]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from autotask.mocksite import MockSite
+from autotask.signin_http import SignInClient
+
+
+def one_run(client, site):
+    site.reset_day()
+    start = time.perf_counter()
+    client.redeem(client.spin())
+    return time.perf_counter() - start
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    print(f"  {name}: 中位数 {statistics.median(samples) * 1000:.1f} ms, "
+          f"最快 {samples[0] * 1000:.1f} ms, 最慢 {samples[-1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="协议签到基准")
+    parser.add_argument('-n', '--runs', type=int, default=50, help="运行次数")
+    parser.add_argument('--delay', type=float, default=0.0, help="替身服务器每个请求的延迟（秒）")
+    args = parser.parse_args()
+
+    with MockSite(delay=args.delay) as site, tempfile.TemporaryDirectory() as cookie_dir:
+        config = site.http_config()
+        print(f"替身服务器 {site.url}，每次签到 2 个请求，请求延迟 {args.delay * 1000:.0f} ms")
+
+        # 复用连接：同一个客户端，Cookie 保存在会话中
+        client = SignInClient(config, name='pooled', cookie_dir=cookie_dir)
+        report("复用连接", [one_run(client, site) for _ in range(args.runs)])
+        client.save_cookies()
+        client.close()
+
+        # 每次新建客户端：重新建立连接，Cookie 从文件读取
+        samples = []
+        for _ in range(args.runs):
+            client = SignInClient(config, name='pooled', cookie_dir=cookie_dir)
+            samples.append(one_run(client, site))
+            client.save_cookies()
+            client.close()
+        report("每次新建连接", samples)
+
+
+if __name__ == "__main__":
+    main()
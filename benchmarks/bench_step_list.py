@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+步骤列表刷新基准
+在隐藏的窗口中创建步骤列表面板（auto_task_gui.StepListPanel），分别对 100 / 1000 / 5000 个步骤测量:
+首次构建、修改一个步骤参数、选中一个步骤、把最后一步移到最前、删除一步、滚动到中间、键盘下移，
+以及创建的行控件数量（虚拟列表只创建可见的行，与步骤数无关）。需要图形界面（Linux 上可用 xvfb-run 运行）。
+
+用法: python benchmarks/bench_step_list.py [--sizes 100 1000 5000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from autotask import STEP_TYPES, StepManager
+
+
+def make_steps(manager, count):
+    """按步骤类型轮流添加 count 个步骤（不触发刷新）"""
+    types = list(STEP_TYPES)
+    on_change, manager._on_change = manager._on_change, None
+    for i in range(count):
+        manager.add_step(types[i % len(types)])
+    manager._on_change = on_change
+
+
+def timed(panel, action):
+    """执行操作并等待布局完成，返回耗时（秒）"""
+    start = time.perf_counter()
+    action()
+    panel.update_idletasks()
+    return time.perf_counter() - start
+
+
+def bench(root, count):
+    from auto_task_gui import StepListPanel
+
+    manager = StepManager()
+    panel = StepListPanel(root, manager, on_select=lambda step: None, height=600)
+    panel.pack(fill="both", expand=True)
+    root.update_idletasks()
+    make_steps(manager, count)
+
+    steps = manager.steps
+    middle = steps[count // 2]
+    key = next(iter(middle.params), None)
+    results = [
+        ('首次构建', timed(panel, panel.refresh)),
+        ('修改一个步骤', timed(panel, lambda: manager.update_step(middle.id, {key: 'changed'} if key else {}))),
+        ('选中一个步骤', timed(panel, lambda: panel._select(middle))),
+        ('最后一步移到最前', timed(panel, lambda: manager.move_step_to(steps[-1].id, 1))),
+        ('删除一步', timed(panel, lambda: manager.remove_step(middle.id))),
+        ('滚动到中间', timed(panel, lambda: panel.scroll_to(count // 2 * panel.ROW_HEIGHT))),
+        ('键盘下移', timed(panel, lambda: panel._on_key('Down'))),
+    ]
+    rows = len(panel._rows)
+    panel.destroy()
+    return results, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="步骤列表刷新基准")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000], help="步骤数")
+    args = parser.parse_args()
+
+    import tkinter
+    try:
+        import customtkinter as ctk
+        root = ctk.CTk()
+    except tkinter.TclError as e:
+        print(f"[!] 需要图形界面: {e}")
+        return 2
+    root.withdraw()
+
+    for count in args.sizes:
+        print(f"{count} 个步骤:")
+        results, rows = bench(root, count)
+        for name, elapsed in results:
+            print(f"  {name}: {elapsed * 1000:.1f} ms")
+        print(f"  行控件: {rows} 个")
+    root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
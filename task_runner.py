@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+任务执行器命令行入口（实现位于 autotask.runner）
+用法: python task_runner.py tasks/example.json
+"""
+
+import sys
+
+from autotask.runner import main, run_task_file
+
+if __name__ == "__main__":
+    sys.exit(main())
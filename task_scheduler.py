@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 """
 定时任务管理器
-支持添加、删除、查看定时任务
+支持添加、删除、查看定时任务（Windows 任务计划）
+跨平台的常驻调度见 autotask/daemon.py（python -m autotask.daemon）
 """
 
 import os
@@ -34,15 +35,10 @@ def create_windows_task(task_name, task_file, run_time, script_dir):
     with open(runner_script, 'w', encoding='utf-8') as f:
         f.write(f'''# -*- coding: utf-8 -*-
 import sys
-import json
 sys.path.insert(0, r"{script_dir}")
-from auto_task_gui import TaskConfig, CodeGenerator
+from autotask import run_task_file
 
-config = TaskConfig()
-config.load(r"{task_file}")
-generator = CodeGenerator()
-code = generator.generate(config.step_manager)
-exec(code.split("if __name__")[0] + "main()")
+run_task_file(r"{task_file}")
 ''')
     
     # 使用 schtasks 创建计划任务
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""代码生成器：生成的脚本必须能编译"""
+
+import pytest
+
+from autotask.codegen import CodeGenerator
+from autotask.models import StepManager
+
+
+def _manager(*steps):
+    manager = StepManager()
+    for step_type, params in steps:
+        step = manager.add_step(step_type)
+        step.params.update(params)
+    return manager
+
+
+@pytest.mark.parametrize('path', [
+    'C:\\imgs\\a.png',
+    'images/it\'s "quoted".png',
+    'tpl:0123456789abcdef/按钮.png',
+])
+def test_first_match_case_paths_compile(path):
+    manager = _manager(
+        ('first_match', {}),
+        ('case', {'image_path': path}),
+        ('wait_time', {'seconds': 1}),
+        ('case', {'image_path': ''}),
+        ('end_match', {}),
+    )
+    code = CodeGenerator().generate(manager)
+    compile(code, '<generated>', 'exec')
+    assert repr([path, '']) in code
+
+
+def test_digest_title_is_escaped():
+    manager = _manager(('wait_time', {'seconds': 1}))
+    settings = {'push_digest': True, 'digest_title': 'a"b\\c\n'}
+    code = CodeGenerator().generate(manager, settings)
+    compile(code, '<generated>', 'exec')
+    assert repr(settings['digest_title']) in code
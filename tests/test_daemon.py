@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""定时任务守护进程：cron 触发规则、错过执行的补执行、入队和执行"""
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from autotask import daemon
+from autotask.daemon import CronTrigger, IntervalTrigger, SchedulerDaemon, TriggerError, parse_trigger
+
+
+def _next(expr, after):
+    return CronTrigger(expr).next_after(datetime.fromisoformat(after))
+
+
+# ---------- CronTrigger ----------
+
+def test_day_and_weekday_both_restricted_match_either():
+    # 日和周都有限制时满足其一即可：2026-12-13 是周日，不是周五
+    assert _next("0 8 13 * 5", "2026-12-12 09:00") == datetime(2026, 12, 13, 8, 0)
+    # 之后最近的是周五 12-18
+    assert _next("0 8 13 * 5", "2026-12-13 09:00") == datetime(2026, 12, 18, 8, 0)
+
+
+def test_only_one_of_day_and_weekday_restricted():
+    assert _next("0 8 * * 5", "2026-12-12 09:00") == datetime(2026, 12, 18, 8, 0)
+    assert _next("0 8 13 * *", "2026-12-14 09:00") == datetime(2027, 1, 13, 8, 0)
+
+
+@pytest.mark.parametrize('weekday, expected', [
+    ('0', {0}), ('7', {0}), ('6-7', {6, 0}), ('5-7/2', {5, 0}), ('0,7', {0}),
+])
+def test_sunday_is_0_or_7(weekday, expected):
+    assert CronTrigger(f"30 6 * * {weekday}").weekdays == expected
+
+
+def test_weekday_7_fires_on_sunday():
+    # 2026-10-19 是周一，下一个周日是 10-25
+    assert _next("30 6 * * 7", "2026-10-19 12:00") == datetime(2026, 10, 25, 6, 30)
+    assert _next("30 6 * * 0", "2026-10-19 12:00") == datetime(2026, 10, 25, 6, 30)
+
+
+def test_ranges_steps_and_lists():
+    trigger = CronTrigger("*/30 9-18 * * 1-5")
+    assert trigger.minutes == {0, 30}
+    assert trigger.hours == set(range(9, 19))
+    # 周五 18:30 之后跳到下周一 09:00
+    assert trigger.next_after(datetime(2026, 10, 23, 18, 30)) == datetime(2026, 10, 26, 9, 0)
+    assert CronTrigger("5,10/20 * * * *").minutes == {5, 10, 30, 50}
+
+
+def test_next_after_is_strictly_later_and_minute_aligned():
+    assert _next("* * * * *", "2026-10-19 08:00:30") == datetime(2026, 10, 19, 8, 1)
+    assert _next("0 8 * * *", "2026-10-19 08:00:00") == datetime(2026, 10, 20, 8, 0)
+
+
+@pytest.mark.parametrize('expr', ["* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *",
+                                  "*/0 * * * *", "5-1 * * * *", "a * * * *", "0 0 31 2 *"])
+def test_invalid_cron(expr):
+    with pytest.raises(TriggerError):
+        CronTrigger(expr).next_after(datetime(2026, 1, 1))
+
+
+def test_parse_trigger():
+    assert parse_trigger({'time': '08:05'}).expr == "5 8 * * *"
+    assert parse_trigger({'interval': '30m'}).seconds == 1800
+    assert IntervalTrigger.parse('1.5h') == 5400
+    with pytest.raises(TriggerError):
+        parse_trigger({'interval': 'abc'})
+
+
+# ---------- SchedulerDaemon ----------
+
+def _write_state(path, **next_runs):
+    jobs = [{'name': name, 'target': 'signin', 'trigger': {'interval': 3600}, 'enabled': True,
+             'priority': 0, 'resources': [], 'max_delay': None,
+             'next_run': daemon._fmt(when), 'run_count': 0}
+            for name, when in next_runs.items()]
+    path.write_text(json.dumps({'jobs': jobs}), encoding='utf-8')
+
+
+def test_misfire_within_grace_runs_once_beyond_grace_is_skipped(tmp_path):
+    state = tmp_path / 'state.json'
+    now = datetime.now()
+    _write_state(state,
+                 recent=now - timedelta(seconds=daemon.MISFIRE_GRACE - 600),
+                 stale=now - timedelta(seconds=daemon.MISFIRE_GRACE + 600))
+    d = SchedulerDaemon(state_path=str(state), run_func=lambda target: True)
+
+    # 宽限时间内错过的保留原计划（立即到期），超过的改到下一次触发时间
+    assert daemon._parse_time(d.jobs['recent']['next_run']) < now
+    assert daemon._parse_time(d.jobs['stale']['next_run']) > now
+
+    d.run_pending(block=False)
+    assert [j['name'] for j in d.queue.snapshot()['pending']] == ['recent']
+    # 补执行一次后按触发器安排下一次
+    assert daemon._parse_time(d.jobs['recent']['next_run']) > now
+
+
+def test_workers_run_queued_jobs_with_injected_run_func(tmp_path):
+    ran = []
+    finished = threading.Event()
+
+    def run_func(target):
+        ran.append(target)
+        finished.set()
+        return True
+
+    d = SchedulerDaemon(state_path=str(tmp_path / 'state.json'), run_func=run_func, workers=1)
+    d.add_job('signin', {'interval': 3600}, name='签到', resources=[])
+    d.start_workers()
+    try:
+        assert d.run_now('签到') is True
+        assert finished.wait(5)
+    finally:
+        d.stop()
+    for _ in range(100):
+        if d.jobs['签到']['run_count']:
+            break
+        time.sleep(0.01)
+    assert ran == ['signin']
+    assert d.jobs['签到']['last_result'] == 'success'
+    saved = json.loads((tmp_path / 'state.json').read_text(encoding='utf-8'))
+    assert saved['jobs'][0]['run_count'] == 1
+
+
+def test_handle_command_reports_errors(tmp_path):
+    d = SchedulerDaemon(state_path=str(tmp_path / 'state.json'), run_func=lambda target: True)
+    assert d.handle_command({'cmd': 'remove', 'name': 'missing'})['ok'] is False
+    assert d.handle_command({'cmd': 'add', 'target': 'signin', 'trigger': {'cron': '* *'}})['ok'] is False
+    assert d.handle_command({'cmd': 'nope'}) == {'ok': False, 'error': "未知命令: nope"}
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""任务队列：去重、截止时间、优先级和资源锁"""
+
+import json
+
+import pytest
+
+from autotask import jobs
+from autotask.jobs import CLIPBOARD, SCREEN, JobQueue, infer_resources
+
+
+@pytest.fixture
+def now(monkeypatch):
+    """可控的当前时间"""
+    current = [1000.0]
+
+    class FakeTime:
+        @staticmethod
+        def time():
+            return current[0]
+
+    monkeypatch.setattr(jobs, 'time', FakeTime)
+    return current
+
+
+def test_duplicate_submit_keeps_one_job_and_raises_priority(now):
+    queue = JobQueue()
+    first, added = queue.submit('a', 'signin', priority=1, resources=set())
+    again, added_again = queue.submit('a', 'signin', priority=5, resources=set())
+    lower, _ = queue.submit('a', 'signin', priority=0, resources=set())
+    assert added and not added_again
+    assert first is again is lower
+    assert first.priority == 5
+    assert len(queue.snapshot()['pending']) == 1
+
+
+def test_higher_priority_first_then_fifo(now):
+    queue = JobQueue()
+    for name, priority in (('low', 0), ('high1', 5), ('high2', 5), ('mid', 3)):
+        queue.submit(name, 'signin', priority=priority, resources=set())
+    order = []
+    while True:
+        job = queue.take(timeout=0)
+        if job is None:
+            break
+        order.append(job.name)
+    assert order == ['high1', 'high2', 'mid', 'low']
+
+
+def test_expired_job_is_dropped_before_start(now):
+    queue = JobQueue()
+    queue.submit('late', 'signin', resources=set(), max_delay=10)
+    queue.submit('any', 'signin', resources=set())
+    now[0] += 11
+    assert queue.take(timeout=0).name == 'any'
+    assert queue.take(timeout=0) is None
+    expired = queue.snapshot()['history'][0]
+    assert (expired['name'], expired['status']) == ('late', 'expired')
+
+
+def test_resource_lock_serializes_conflicting_jobs(now):
+    queue = JobQueue()
+    queue.submit('screen-high', 'signin', priority=9, resources={SCREEN})
+    queue.submit('screen-low', 'signin', priority=1, resources={SCREEN, CLIPBOARD})
+    queue.submit('push', 'signin', priority=0, resources=set())
+    queue.submit('clip', 'signin', priority=0, resources={CLIPBOARD})
+
+    first = queue.take(timeout=0)
+    assert first.name == 'screen-high'
+    # 屏幕被占用：跳过 screen-low，执行不冲突的任务
+    assert queue.take(timeout=0).name == 'push'
+    clip = queue.take(timeout=0)
+    assert clip.name == 'clip'
+    assert queue.take(timeout=0) is None
+    assert queue.snapshot()['held'] == [CLIPBOARD, SCREEN]
+
+    queue.done(first, True)
+    assert queue.take(timeout=0) is None      # 剪贴板仍被占用
+    queue.done(clip, True)
+    assert queue.take(timeout=0).name == 'screen-low'
+
+
+def test_close_wakes_waiting_take():
+    queue = JobQueue()
+    queue.close()
+    assert queue.take() is None
+
+
+def test_infer_resources(tmp_path):
+    task = tmp_path / 'task.json'
+    task.write_text(json.dumps({'steps': [
+        {'step_type': 'click_image', 'params': {}},
+        {'step_type': 'input_text', 'params': {}, 'enabled': False},
+        {'step_type': 'open_app', 'params': {'app_path': 'C:/Apps/Telegram.exe'}},
+        {'step_type': 'close_app', 'params': {'process_name': 'Chrome.exe'}},
+    ]}), encoding='utf-8')
+    assert infer_resources(str(task)) == {SCREEN, 'app:telegram.exe', 'app:chrome.exe'}
+    assert infer_resources(str(tmp_path / 'missing.json')) == {SCREEN, CLIPBOARD}
+    assert infer_resources('signin') == {SCREEN, CLIPBOARD, 'app:browser'}
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""步骤管理器索引"""
+
+from autotask.models import Step, StepManager
+
+
+def _manager(count):
+    manager = StepManager()
+    for _ in range(count):
+        manager.add_step('wait_time')
+    return manager
+
+
+def test_index_of_after_replacing_step_in_place():
+    manager = _manager(3)
+    old = manager.steps[0]
+    new = Step(step_type='wait_time')
+    manager.steps[0] = new
+    assert manager.index_of(new.id) == 0
+    assert manager.index_of(old.id) == -1
+
+
+def test_index_of_after_direct_list_edits():
+    manager = _manager(3)
+    first, second, third = manager.steps
+    del manager.steps[0]
+    manager.steps.append(first)
+    assert [manager.index_of(s.id) for s in (second, third, first)] == [0, 1, 2]
+    assert manager.index_of('missing') == -1
+
+
+def test_move_and_remove_keep_index():
+    manager = _manager(4)
+    ids = [s.id for s in manager.steps]
+    manager.move_steps_to([ids[3]], 1)
+    manager.remove_step(ids[1])
+    assert [s.id for s in manager.steps] == [ids[3], ids[0], ids[2]]
+    assert all(manager.index_of(s.id) == i for i, s in enumerate(manager.steps))